@@ -0,0 +1,161 @@
+# circuit_cache.py
+import contextlib
+import hashlib
+import os
+import pickle
+from collections import OrderedDict
+
+
+class CircuitCache:
+    """
+    Bounded LRU cache for results computed from a circuit, keyed by the circuit fingerprint
+    (see QuditCircuit.fingerprint()) plus the input state and the kind of result.
+
+    Entries are kept in memory; if a directory is given they are also pickled to disk, so that the cache can be
+    shared by several processes and survive between jobs. Both levels evict the least recently used entries
+    once they hold more than `maxsize` items.
+
+    Attributes:
+        maxsize (int): Maximum number of entries per level.
+        directory (str | None): Directory used for the on-disk level, or None for a memory-only cache.
+        hits (int): Number of lookups answered by the cache.
+        misses (int): Number of lookups that had to be computed.
+
+    Example:
+        cache = CircuitCache(maxsize=256)
+        out = cache.get_or_compute(qc, qc.get_output, input_state=(1, 2, 0))
+    """
+
+    def __init__(self, maxsize: int = 1024, directory=None):
+        """
+        Args:
+            maxsize (int): Maximum number of entries kept in memory (and on disk).
+            directory (str, optional): Directory for the on-disk level. Created if missing.
+        """
+        if maxsize < 1:
+            raise ValueError("maxsize must be >= 1")
+        self.maxsize = maxsize
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+        self.__entries = OrderedDict()
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(qc, input_state=None, kind: str = "output") -> str:
+        """
+        Cache key of a result.
+
+        Args:
+            qc (QuditCircuit): The circuit the result is computed from.
+            input_state (Iterable[int], optional): Input basis state, if the result depends on it.
+            kind (str): Kind of result (e.g. "output", "statevector", "drawing").
+
+        Returns:
+            str: The key.
+        """
+        state = "-" if input_state is None else ",".join(str(int(v)) for v in input_state)
+        return f"{kind}:{qc.fingerprint()}:{state}"
+
+    def __len__(self):
+        return len(self.__entries)
+
+    def __contains__(self, key):
+        return key in self.__entries or (self.directory is not None and os.path.exists(self.__path(key)))
+
+    @property
+    def hit_rate(self) -> float:
+        """Fraction of lookups answered by the cache."""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def get(self, key, default=None):
+        """
+        Look up a key, refreshing its LRU position.
+
+        Returns:
+            The cached value, or `default` if the key is not cached.
+        """
+        if key in self.__entries:
+            self.__entries.move_to_end(key)
+            self.hits += 1
+            return self.__entries[key]
+        if self.directory is not None:
+            path = self.__path(key)
+            try:
+                with open(path, "rb") as f:
+                    value = pickle.load(f)
+            except (OSError, pickle.UnpicklingError, EOFError):
+                pass
+            else:
+                # The file may have been evicted meanwhile by another cache on the same directory
+                with contextlib.suppress(OSError):
+                    os.utime(path)
+                self.__store_memory(key, value)
+                self.hits += 1
+                return value
+        self.misses += 1
+        return default
+
+    def put(self, key, value) -> None:
+        """Store a value, evicting the least recently used entries if needed."""
+        self.__store_memory(key, value)
+        if self.directory is not None:
+            tmp = self.__path(key) + f".{os.getpid()}.tmp"
+            with open(tmp, "wb") as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, self.__path(key))
+            self.__evict_disk()
+
+    def get_or_compute(self, qc, compute, input_state=None, kind: str = "output"):
+        """
+        Return the cached result for (qc, input_state, kind), computing and storing it on a miss.
+
+        Args:
+            qc (QuditCircuit): The circuit.
+            compute (Callable): Called as compute(input_state) (or compute() if input_state is None) on a miss.
+            input_state (Iterable[int], optional): Input basis state.
+            kind (str): Kind of result.
+
+        Returns:
+            The cached or freshly computed result.
+        """
+        key = self.key(qc, input_state, kind)
+        missing = object()
+        value = self.get(key, missing)
+        if value is missing:
+            value = compute() if input_state is None else compute(input_state)
+            self.put(key, value)
+        return value
+
+    def clear(self) -> None:
+        """Drop every entry (memory and disk) and reset the counters."""
+        self.__entries.clear()
+        self.hits = 0
+        self.misses = 0
+        if self.directory is not None:
+            for name in os.listdir(self.directory):
+                if name.endswith(".pkl"):
+                    os.remove(os.path.join(self.directory, name))
+
+    def __store_memory(self, key, value):
+        self.__entries[key] = value
+        self.__entries.move_to_end(key)
+        while len(self.__entries) > self.maxsize:
+            self.__entries.popitem(last=False)
+
+    def __path(self, key):
+        # Keys contain ':' and ',' which are not portable in file names
+        return os.path.join(self.directory, hashlib.blake2b(key.encode(), digest_size=16).hexdigest() + ".pkl")
+
+    def __evict_disk(self):
+        files = [os.path.join(self.directory, name) for name in os.listdir(self.directory) if name.endswith(".pkl")]
+        if len(files) <= self.maxsize:
+            return
+        files.sort(key=lambda p: os.stat(p).st_mtime)
+        for path in files[:len(files) - self.maxsize]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
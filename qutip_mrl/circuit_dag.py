@@ -0,0 +1,188 @@
+# circuit_dag.py
+import numpy as np
+
+
+def is_diagonal(gate) -> bool:
+    """
+    Check whether a single-qudit matrix is diagonal in the computational basis.
+
+    Args:
+        gate (np.ndarray): The matrix to check.
+
+    Returns:
+        bool: True if all off-diagonal entries are zero.
+    """
+    M = np.asarray(gate)
+    return not np.any(M - np.diag(np.diagonal(M)))
+
+
+class CircuitDAG:
+    """
+    Dependency graph of the gates of a circuit, built in a single pass over the instruction table.
+
+    Each gate is a node identified by its index in the instruction table (barriers are not nodes, they do not
+    affect the simulation). Dependencies are tracked per wire, distinguishing gates that only *read* a qudit
+    (controls, or a target whose matrix is diagonal) from gates that *write* it. Readers of the same qudit commute,
+    so they do not depend on each other and can share a layer; a writer depends on the last writer and on every
+    reader since then.
+
+    The graph is append-only: adding a gate never changes the layer of the previous ones, so it can be maintained
+    incrementally while gates are inserted in the circuit (see QuditCircuit.dag()).
+
+    Attributes:
+        num_qudit (int): Number of qudits of the circuit.
+        nodes (list): Instruction indices of the nodes, in insertion order.
+    """
+
+    def __init__(self, num_qudit: int):
+        """
+        Create an empty graph.
+
+        Args:
+            num_qudit (int): Number of qudits of the circuit.
+        """
+        self.num_qudit = num_qudit
+        self.nodes = []
+        self.__node_of = {}  # instruction index -> node id
+        self.__preds = []
+        self.__succs = []
+        self.__layer = []
+        self.__longest_pred = []  # predecessor on a longest path, used for the critical path
+        self.__layers = []
+        self.__last_write = [None] * num_qudit
+        self.__reads = [[] for _ in range(num_qudit)]
+        self.__chains = [[] for _ in range(num_qudit)]
+
+    @classmethod
+    def from_instructions(cls, num_qudit: int, instructions):
+        """
+        Build the graph of a whole instruction table.
+
+        Args:
+            num_qudit (int): Number of qudits of the circuit.
+            instructions (Iterable): (name, matrix, controls, control_values, target) entries.
+
+        Returns:
+            CircuitDAG: The dependency graph.
+        """
+        dag = cls(num_qudit)
+        for index, instruction in enumerate(instructions):
+            dag.add(index, instruction)
+        return dag
+
+    def add(self, index: int, instruction):
+        """
+        Append a gate to the graph.
+
+        Args:
+            index (int): Index of the instruction in the instruction table.
+            instruction (tuple): (name, matrix, controls, control_values, target).
+
+        Returns:
+            int | None: The layer of the new node, or None for barriers.
+        """
+        _, gate, controls, _, target = instruction
+        if gate is None:
+            return None
+
+        node = len(self.nodes)
+        reads = list(controls)
+        writes = []
+        if is_diagonal(gate):
+            reads.append(target)
+        else:
+            writes.append(target)
+
+        preds = set()
+        for q in reads:
+            if self.__last_write[q] is not None:
+                preds.add(self.__last_write[q])
+        for q in writes:
+            if self.__last_write[q] is not None:
+                preds.add(self.__last_write[q])
+            preds.update(self.__reads[q])
+
+        preds = sorted(preds)
+        layer = 0
+        longest = None
+        for p in preds:
+            self.__succs[p].append(node)
+            if self.__layer[p] + 1 > layer or longest is None:
+                layer = self.__layer[p] + 1
+                longest = p
+
+        for q in reads:
+            self.__reads[q].append(node)
+        for q in writes:
+            self.__last_write[q] = node
+            self.__reads[q] = []
+        for q in set(reads + writes):
+            self.__chains[q].append(index)
+
+        self.nodes.append(index)
+        self.__node_of[index] = node
+        self.__preds.append(preds)
+        self.__succs.append([])
+        self.__layer.append(layer)
+        self.__longest_pred.append(longest)
+        if layer == len(self.__layers):
+            self.__layers.append([])
+        self.__layers[layer].append(index)
+        return layer
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def predecessors(self, index: int):
+        """Instruction indices of the gates that must run before gate `index`."""
+        return [self.nodes[p] for p in self.__preds[self.__node_of[index]]]
+
+    def successors(self, index: int):
+        """Instruction indices of the gates that directly depend on gate `index`."""
+        return [self.nodes[s] for s in self.__succs[self.__node_of[index]]]
+
+    def layer(self, index: int) -> int:
+        """ASAP layer (0-based) of gate `index`."""
+        return self.__layer[self.__node_of[index]]
+
+    def layers(self):
+        """
+        ASAP layers of the circuit. Gates in the same layer pairwise commute and can be applied together.
+
+        Returns:
+            list: One list of instruction indices per layer.
+        """
+        return [list(layer) for layer in self.__layers]
+
+    def depth(self) -> int:
+        """Number of layers of the circuit."""
+        return len(self.__layers)
+
+    def critical_path(self):
+        """
+        A longest dependency chain of the circuit.
+
+        Returns:
+            list: Instruction indices of the chain, from first to last gate (its length equals depth()).
+        """
+        if not self.nodes:
+            return []
+        node = self.__layer.index(len(self.__layers) - 1)
+        path = []
+        while node is not None:
+            path.append(self.nodes[node])
+            node = self.__longest_pred[node]
+        path.reverse()
+        return path
+
+    def qudit_chain(self, qudit: int):
+        """
+        Gates acting on a qudit, either as control or as target, in circuit order.
+
+        Args:
+            qudit (int): Index of the qudit.
+
+        Returns:
+            list: Instruction indices of the gates.
+        """
+        return list(self.__chains[qudit])
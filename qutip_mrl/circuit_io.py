@@ -0,0 +1,409 @@
+# circuit_io.py
+import json
+import shlex
+import struct
+
+import numpy as np
+
+from qutip_mrl.qudit_circuit import QuditCircuit
+
+"""
+Storage of QuditCircuit instances, in a compact binary format and in a line-oriented text format.
+
+The binary format is the one used by QuditCircuit.save()/load().
+
+File layout (little endian):
+- 8-byte magic b"QMRLCIRC", uint32 format version, uint32 header length;
+- UTF-8 JSON header with the circuit geometry, the gate name table and the position of every array;
+- the arrays below, each one starting on a 64-byte boundary so that it can be memory-mapped:
+    name_id    int32[n]         index of the gate name in the header name table
+    matrix_id  int32[n]         index of the gate matrix in `matrices` (-1 for barriers)
+    target     int32[n]         target qudit (-1 for barriers)
+    ctrl_ptr   int64[n + 1]     CSR offsets of the controls of each gate in ctrl_qudit/ctrl_value
+    ctrl_qudit int32[m]         control qudits
+    ctrl_value int32[m]         control values
+    matrices   complex128[k,d,d] deduplicated gate matrices
+"""
+
+MAGIC = b"QMRLCIRC"
+FORMAT_VERSION = 1
+_PREAMBLE = struct.Struct("<II")
+_ALIGN = 64
+
+
+def _aligned(offset: int) -> int:
+    return (offset + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+def circuit_to_arrays(qc: QuditCircuit):
+    """
+    Convert the instruction table of a circuit into the columnar arrays used by the binary format.
+    Identical gate matrices (by content) are stored only once.
+
+    Args:
+        qc (QuditCircuit): The circuit to convert.
+
+    Returns:
+        tuple: (names, arrays) where names is the gate name table and arrays a dict of numpy arrays.
+    """
+    d = qc.num_states
+    instructions = qc.instructions
+    n = len(instructions)
+
+    name_index = {}
+    matrix_index = {}
+    matrices = []
+    name_id = np.empty(n, dtype=np.int32)
+    matrix_id = np.empty(n, dtype=np.int32)
+    target = np.empty(n, dtype=np.int32)
+    ctrl_ptr = np.zeros(n + 1, dtype=np.int64)
+    ctrl_qudit = []
+    ctrl_value = []
+
+    for i, (name, gate, controls, values, tgt) in enumerate(instructions):
+        name_id[i] = name_index.setdefault(name, len(name_index))
+        if gate is None:
+            matrix_id[i] = -1
+            target[i] = -1
+        else:
+            M = np.asarray(gate, dtype=np.complex128)
+            key = M.tobytes()
+            mid = matrix_index.get(key)
+            if mid is None:
+                mid = matrix_index[key] = len(matrices)
+                matrices.append(M)
+            matrix_id[i] = mid
+            target[i] = tgt
+        ctrl_qudit.extend(controls)
+        ctrl_value.extend(values)
+        ctrl_ptr[i + 1] = len(ctrl_qudit)
+
+    arrays = {
+        "name_id": name_id,
+        "matrix_id": matrix_id,
+        "target": target,
+        "ctrl_ptr": ctrl_ptr,
+        "ctrl_qudit": np.asarray(ctrl_qudit, dtype=np.int32),
+        "ctrl_value": np.asarray(ctrl_value, dtype=np.int32),
+        "matrices": np.asarray(matrices, dtype=np.complex128).reshape(len(matrices), d, d),
+    }
+    return list(name_index), arrays
+
+
+def circuit_from_arrays(num_qudit: int, num_states: int, names, arrays) -> QuditCircuit:
+    """
+    Build a QuditCircuit from the columnar arrays produced by circuit_to_arrays().
+    Gates sharing a matrix id share the same matrix object (a view on `arrays["matrices"]`).
+
+    Args:
+        num_qudit (int): Number of qudits of the circuit.
+        num_states (int): Number of basis states per qudit.
+        names (list): Gate name table.
+        arrays (dict): Columnar arrays, possibly memory-mapped.
+
+    Returns:
+        QuditCircuit: The rebuilt circuit.
+    """
+    qc = QuditCircuit(num_qudit, num_states)
+    matrices = arrays["matrices"]
+    unique = [matrices[k] for k in range(len(matrices))]
+    name_id = arrays["name_id"].tolist()
+    matrix_id = arrays["matrix_id"].tolist()
+    target = arrays["target"].tolist()
+    ctrl_ptr = arrays["ctrl_ptr"].tolist()
+    ctrl_qudit = arrays["ctrl_qudit"].tolist()
+    ctrl_value = arrays["ctrl_value"].tolist()
+
+    for i in range(len(name_id)):
+        lo, hi = ctrl_ptr[i], ctrl_ptr[i + 1]
+        mid = matrix_id[i]
+        if mid < 0:
+            qc._append_instruction(("barrier", None, (), (), None))
+            continue
+        qc._append_instruction((
+            names[name_id[i]],
+            unique[mid],
+            tuple(ctrl_qudit[lo:hi]),
+            tuple(ctrl_value[lo:hi]),
+            target[i],
+        ))
+    return qc
+
+
+def save_circuit(qc: QuditCircuit, path) -> None:
+    """
+    Write a circuit to `path` using the binary format described in this module.
+
+    Args:
+        qc (QuditCircuit): The circuit to save.
+        path (str): Destination file path.
+    """
+    names, arrays = circuit_to_arrays(qc)
+
+    layout = {}
+    offset = 0
+    for key, arr in arrays.items():
+        offset = _aligned(offset)
+        layout[key] = {"dtype": arr.dtype.str, "shape": list(arr.shape), "offset": offset}
+        offset += arr.nbytes
+
+    header = json.dumps({
+        "num_qudit": qc.num_qudit,
+        "num_states": qc.num_states,
+        "names": names,
+        "arrays": layout,
+    }).encode("utf-8")
+    data_start = _aligned(len(MAGIC) + _PREAMBLE.size + len(header))
+
+    with open(path, "wb") as f:
+        f.write(MAGIC)
+        f.write(_PREAMBLE.pack(FORMAT_VERSION, len(header)))
+        f.write(header)
+        for key, arr in arrays.items():
+            f.write(b"\0" * (data_start + layout[key]["offset"] - f.tell()))
+            f.write(np.ascontiguousarray(arr).tobytes())
+
+
+def load_circuit_arrays(path, mmap: bool = False):
+    """
+    Read the header and the columnar arrays of a circuit file without building the circuit.
+    Useful for worker processes that only need the raw instruction stream.
+
+    Args:
+        path (str): Source file path.
+        mmap (bool): If True, arrays are read-only memory maps of the file.
+
+    Returns:
+        tuple: (header, arrays) where header is the decoded JSON header.
+
+    Raises:
+        ValueError: If the file is not a circuit file or has an unsupported version.
+    """
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a QuTiP-MRL circuit file")
+        version, header_len = _PREAMBLE.unpack(f.read(_PREAMBLE.size))
+        if version != FORMAT_VERSION:
+            raise ValueError(f"Unsupported circuit file version: {version}")
+        header = json.loads(f.read(header_len).decode("utf-8"))
+        data_start = _aligned(len(MAGIC) + _PREAMBLE.size + header_len)
+
+        arrays = {}
+        for key, info in header["arrays"].items():
+            dtype = np.dtype(info["dtype"])
+            shape = tuple(info["shape"])
+            count = int(np.prod(shape))
+            if mmap and count > 0:
+                arrays[key] = np.memmap(path, dtype=dtype, mode="r", offset=data_start + info["offset"], shape=shape)
+            else:
+                f.seek(data_start + info["offset"])
+                arrays[key] = np.fromfile(f, dtype=dtype, count=count).reshape(shape)
+    return header, arrays
+
+
+def load_circuit(path, mmap: bool = False) -> QuditCircuit:
+    """
+    Load a circuit written by save_circuit().
+
+    Args:
+        path (str): Source file path.
+        mmap (bool): If True, the gate matrices are memory-mapped from the file.
+
+    Returns:
+        QuditCircuit: The loaded circuit.
+    """
+    header, arrays = load_circuit_arrays(path, mmap=mmap)
+    return circuit_from_arrays(header["num_qudit"], header["num_states"], header["names"], arrays)
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+# Text format
+#
+# One statement per line, tokens separated by blanks, '#' starts a comment. Names containing blanks, '"', '#' or '='
+# are double-quoted, with '"' and backslashes escaped by a backslash.
+#   qudits <num_qudit> <num_states>               must precede any gate
+#   matrix <id> <d*d complex entries, row-major>  defines a custom matrix
+#   shift <label> <t>                             QuditCircuit.shift(label, t)
+#   ms <label> <c> <t> <v>                        QuditCircuit.ms(label, c, t, [v])
+#   toffoli <label> <c1> <c2> <t> <v1> <v2>       QuditCircuit.toffoli(label, c1, c2, t, [v1, v2])
+#   gate <id> <name> <t> [<c>=<v> ...]            custom matrix <id> drawn as <name>, with any value controls
+#   barrier
+# ---------------------------------------------------------------------------------------------------------------------
+
+TEXT_HEADER = "# QuTiP-MRL circuit v1"
+
+
+def _format_entry(z: complex) -> str:
+    if z.imag == 0:
+        return format(z.real, ".17g")
+    return f"{z.real:.17g}{z.imag:+.17g}j"
+
+
+def _quote(name: str) -> str:
+    # Inside the quotes, '"' and the backslash are escaped with a backslash (undone by shlex.split when reading)
+    if not name or any(ch.isspace() or ch in '"#=' for ch in name):
+        return '"' + name.replace("\\", "\\\\").replace('"', '\\"') + '"'
+    return name
+
+
+def iter_text_lines(qc: QuditCircuit):
+    """
+    Stream the text representation of a circuit, one line (without newline) at a time.
+    Gates whose matrix matches their label use the shift/ms/toffoli statements, everything else is written
+    as a `gate` statement referring to a `matrix` definition emitted on first use.
+
+    Args:
+        qc (QuditCircuit): The circuit to serialize.
+
+    Yields:
+        str: The lines of the text representation.
+    """
+    d = qc.num_states
+    scratch = QuditCircuit(1, d)
+    label_matrices = {}
+    matrix_ids = {}
+
+    def label_matches(label, M):
+        if label not in label_matrices:
+            try:
+                label_matrices[label] = scratch._label_to_matrix(label)
+            except ValueError:
+                label_matrices[label] = None
+        L = label_matrices[label]
+        return L is not None and np.array_equal(L, M)
+
+    yield TEXT_HEADER
+    yield f"qudits {qc.num_qudit} {d}"
+    for name, gate, controls, values, target in qc.instructions:
+        if gate is None:
+            yield "barrier"
+            continue
+        M = np.asarray(gate)
+        if " " not in name and "#" not in name and len(controls) <= 2 and label_matches(name, M):
+            if not controls:
+                yield f"shift {name} {target}"
+            elif len(controls) == 1:
+                yield f"ms {name} {controls[0]} {target} {values[0]}"
+            else:
+                yield f"toffoli {name} {controls[0]} {controls[1]} {target} {values[0]} {values[1]}"
+            continue
+
+        key = np.asarray(M, dtype=np.complex128).tobytes()
+        mid = matrix_ids.get(key)
+        if mid is None:
+            mid = matrix_ids[key] = f"m{len(matrix_ids)}"
+            entries = " ".join(_format_entry(complex(z)) for z in np.asarray(M, dtype=np.complex128).ravel())
+            yield f"matrix {mid} {entries}"
+        ctrl = "".join(f" {c}={v}" for c, v in zip(controls, values))
+        yield f"gate {mid} {_quote(name)} {target}{ctrl}"
+
+
+def write_text(qc: QuditCircuit, path_or_file) -> None:
+    """
+    Write a circuit in the text format, streaming line by line.
+
+    Args:
+        qc (QuditCircuit): The circuit to write.
+        path_or_file: A file path or an open text file.
+    """
+    if hasattr(path_or_file, "write"):
+        for line in iter_text_lines(qc):
+            path_or_file.write(line + "\n")
+        return
+    with open(path_or_file, "w", encoding="utf-8") as f:
+        write_text(qc, f)
+
+
+def iter_text_instructions(lines):
+    """
+    Streaming parser of the text format: consumes lines one at a time and yields the circuit geometry
+    followed by instruction table entries. Nothing but the matrix definitions is kept in memory.
+
+    Args:
+        lines (Iterable[str]): The lines to parse (e.g. an open file).
+
+    Yields:
+        tuple: First (num_qudit, num_states), then (name, matrix, controls, control_values, target) entries.
+
+    Raises:
+        ValueError: On malformed statements, reporting the offending line number.
+    """
+    d = None
+    scratch = None
+    labels = {}
+    matrices = {}
+
+    for lineno, line in enumerate(lines, 1):
+        if '"' in line:
+            tokens = shlex.split(line, comments=True)
+        else:
+            hash_pos = line.find("#")
+            tokens = (line if hash_pos < 0 else line[:hash_pos]).split()
+        if not tokens:
+            continue
+        op = tokens[0]
+        try:
+            if op == "qudits":
+                if d is not None:
+                    raise ValueError("duplicated 'qudits' statement")
+                n, d = int(tokens[1]), int(tokens[2])
+                scratch = QuditCircuit(1, d)
+                yield n, d
+                continue
+            if d is None:
+                raise ValueError("'qudits' statement expected before any gate")
+
+            if op in ("shift", "ms", "toffoli"):
+                label = tokens[1]
+                U = labels.get(label)
+                if U is None:
+                    U = labels[label] = scratch._label_to_matrix(label)
+                if op == "shift":
+                    yield label, U, (), (), int(tokens[2])
+                elif op == "ms":
+                    yield label, U, (int(tokens[2]),), (int(tokens[4]),), int(tokens[3])
+                else:
+                    yield label, U, (int(tokens[2]), int(tokens[3])), (int(tokens[5]), int(tokens[6])), int(tokens[4])
+            elif op == "gate":
+                controls = []
+                values = []
+                for tok in tokens[4:]:
+                    c, v = tok.split("=")
+                    controls.append(int(c))
+                    values.append(int(v))
+                yield tokens[2], matrices[tokens[1]], tuple(controls), tuple(values), int(tokens[3])
+            elif op == "matrix":
+                entries = [complex(z) for z in tokens[2:]]
+                if len(entries) != d * d:
+                    raise ValueError(f"matrix '{tokens[1]}' must have {d * d} entries")
+                matrices[tokens[1]] = np.array(entries, dtype=np.complex128).reshape(d, d)
+            elif op == "barrier":
+                yield "barrier", None, (), (), None
+            else:
+                raise ValueError(f"unknown statement '{op}'")
+        except (IndexError, KeyError, ValueError) as e:
+            raise ValueError(f"line {lineno}: {e}") from e
+
+
+def read_text(path_or_file) -> QuditCircuit:
+    """
+    Build a QuditCircuit incrementally from the text format.
+
+    Args:
+        path_or_file: A file path or an iterable of lines (e.g. an open text file).
+
+    Returns:
+        QuditCircuit: The parsed circuit.
+    """
+    if isinstance(path_or_file, str):
+        with open(path_or_file, "r", encoding="utf-8") as f:
+            return read_text(f)
+
+    stream = iter_text_instructions(path_or_file)
+    geometry = next(stream, None)
+    if geometry is None:
+        raise ValueError("Empty circuit description")
+    qc = QuditCircuit(*geometry)
+    for instruction in stream:
+        qc._append_instruction(instruction)
+    return qc
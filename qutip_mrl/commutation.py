@@ -0,0 +1,248 @@
+# commutation.py
+import numpy as np
+
+from qutip_mrl.qudit_circuit import QuditCircuit, _GateLookup, _permutation_matrix, _permutation_of
+
+
+class _Gate:
+    """Gate of the circuit being optimized, with the properties used by the commutation rules."""
+
+    __slots__ = ("name", "matrix", "controls", "values", "target", "qudits", "perm", "diagonal", "alive")
+
+    def __init__(self, name, matrix, controls, values, target):
+        self.name = name
+        self.matrix = None if matrix is None else np.asarray(matrix, dtype=complex)
+        self.controls = tuple(controls)
+        self.values = tuple(values)
+        self.target = target
+        self.alive = True
+        if matrix is None:  # barrier
+            self.qudits = ()
+            self.perm = None
+            self.diagonal = False
+            return
+        self.qudits = self.controls + (target,)
+        self.perm = _permutation_of(self.matrix)
+        self.diagonal = not np.any(self.matrix - np.diag(np.diagonal(self.matrix)))
+
+    @property
+    def key(self):
+        return self.controls, self.values, self.target
+
+    def instruction(self):
+        return self.name, self.matrix, self.controls, self.values, self.target
+
+
+def _close(A, B, tol):
+    return np.array_equal(A, B) if tol == 0.0 else np.allclose(A, B, atol=tol, rtol=0.0)
+
+
+def _targets_commute(a: _Gate, b: _Gate, tol: float) -> bool:
+    if a.diagonal and b.diagonal:
+        return True
+    if a.perm is not None and b.perm is not None:
+        return all(a.perm[b.perm[j]] == b.perm[a.perm[j]] for j in range(len(a.perm)))
+    return _close(a.matrix @ b.matrix, b.matrix @ a.matrix, tol)
+
+
+def _fixes_value(gate: _Gate, value: int, tol: float) -> bool:
+    # The target matrix commutes with the projector |value><value| of a control on the same qudit
+    if gate.diagonal:
+        return True
+    if gate.perm is not None:
+        return gate.perm[value] == value
+    column = np.delete(gate.matrix[:, value], value)
+    row = np.delete(gate.matrix[value, :], value)
+    return _close(column, np.zeros_like(column), tol) and _close(row, np.zeros_like(row), tol)
+
+
+def commutes(a, b, tol: float = 0.0) -> bool:
+    """
+    Sufficient test for two gates of the instruction table to commute.
+
+    A controlled gate is a sum of tensor products of a projector |v><v| on each control and of the gate matrix (or
+    the identity) on the target, so two gates commute if on every shared qudit their local operators commute:
+    - gates with disjoint supports commute;
+    - controls commute with controls, so value-controlled gates that only share controls commute;
+    - a control on value v commutes with a target matrix that maps |v⟩ to itself, diagonal matrices included;
+    - two target matrices on the same qudit must commute with each other.
+    Moreover, gates that share a control with different control values are never active together and always
+    commute. Barriers commute with nothing.
+
+    Args:
+        a, b (tuple): Instruction table entries (name, matrix, controls, control_values, target).
+        tol (float): Absolute tolerance of the matrix comparisons (0 for exact comparisons).
+
+    Returns:
+        bool: True if the gates are known to commute.
+    """
+    return _commutes(a if isinstance(a, _Gate) else _Gate(*a), b if isinstance(b, _Gate) else _Gate(*b), tol)
+
+
+def _commutes(a: _Gate, b: _Gate, tol: float) -> bool:
+    if a.matrix is None or b.matrix is None:
+        return False
+    shared = set(a.qudits).intersection(b.qudits)
+    if not shared:
+        return True
+    a_values = dict(zip(a.controls, a.values))
+    b_values = dict(zip(b.controls, b.values))
+    for q in shared:
+        if q in a_values and q in b_values and a_values[q] != b_values[q]:
+            return True
+    for q in shared:
+        if q in a_values and q in b_values:
+            continue
+        if q in a_values:
+            if not _fixes_value(b, a_values[q], tol):
+                return False
+        elif q in b_values:
+            if not _fixes_value(a, b_values[q], tol):
+                return False
+        elif not _targets_commute(a, b, tol):
+            return False
+    return True
+
+
+def _merged_matrix(later: _Gate, earlier: _Gate):
+    if later.perm is not None and earlier.perm is not None:
+        return tuple(later.perm[j] for j in earlier.perm)
+    return later.matrix @ earlier.matrix
+
+
+def _cancel_round(instructions, num_qudit, lookup, tol, window, fuse_name, fused):
+    """
+    One pass of commutative cancellation. Returns the surviving gates and the number of removed gates.
+    Merged gates named after fuse_name are added to `fused` (name -> matrix).
+    """
+    gates = []
+    wires = [[] for _ in range(num_qudit)]  # per qudit: indices in `gates` of the gates acting on it
+    removed = 0
+
+    for instruction in instructions:
+        gate = _Gate(*instruction)
+        if gate.matrix is None:
+            index = len(gates)
+            gates.append(gate)
+            for chain in wires:
+                chain.append(index)
+            continue
+        d = gate.matrix.shape[0]
+        if _is_identity(gate, tol):
+            removed += 1
+            continue
+
+        # Walk back through the gates on the qudits of `gate`, most recent first, while they commute with it
+        pointers = {q: len(wires[q]) - 1 for q in gate.qudits}
+        examined = 0
+        merged = False
+        while window is None or examined < window:
+            q_best, best = None, -1
+            for q, p in pointers.items():
+                chain = wires[q]
+                while p >= 0 and not gates[chain[p]].alive:
+                    p -= 1
+                pointers[q] = p
+                if p >= 0 and chain[p] > best:
+                    q_best, best = q, chain[p]
+            if q_best is None:
+                break
+            for q, p in pointers.items():
+                if p >= 0 and wires[q][p] == best:
+                    pointers[q] = p - 1
+            other = gates[best]
+            examined += 1
+            if other.matrix is None:
+                break
+            if other.key == gate.key:
+                product = _merged_matrix(gate, other)
+                identity = product == tuple(range(d)) if isinstance(product, tuple) else _close(product, np.eye(d), tol)
+                if identity:
+                    other.alive = False
+                    removed += 2
+                    merged = True
+                    break
+                name = lookup.name_of(product)
+                matrix = _permutation_matrix(product) if isinstance(product, tuple) else product
+                if name is None and fuse_name is not None:
+                    name = lookup.add_fused(fuse_name, matrix)
+                    fused[name] = matrix
+                if name is not None:
+                    # Same qudits, so the chains keep pointing to the merged gate
+                    gates[best] = _Gate(name, matrix, other.controls, other.values, other.target)
+                    removed += 1
+                    merged = True
+                    break
+            if not _commutes(gate, other, tol):
+                break
+
+        if merged:
+            continue
+        index = len(gates)
+        gates.append(gate)
+        for q in gate.qudits:
+            wires[q].append(index)
+
+    return [g for g in gates if g.alive], removed
+
+
+def _is_identity(gate: _Gate, tol: float) -> bool:
+    if gate.perm is not None:
+        return gate.perm == tuple(range(len(gate.perm)))
+    return _close(gate.matrix, np.eye(gate.matrix.shape[0]), tol)
+
+
+def commutative_cancellation(qc, gate_dict=None, tol: float = 0.0, window: int | None = 64, max_rounds: int | None = None,
+                             fuse_name: str | None = None):
+    """
+    Cancel and merge gates across commuting neighbourhoods.
+
+    Every gate is moved back, through the gates it commutes with (see commutes()), to the closest earlier gate with
+    the same controls, control values and target. If the product of the two is the identity both are removed;
+    if the product has a name in gate_dict (or fuse_name is given) the two become a single gate. Gates whose matrix
+    is the identity are dropped. Passes are repeated until the circuit stops shrinking.
+
+    The walk back only visits the gates on the qudits of the moving gate (their chains in the dependency graph),
+    at most `window` of them, so a pass is linear in the number of gates.
+
+    Args:
+        qc (QuditCircuit): The circuit to optimize (not modified).
+        gate_dict (dict, optional): Names of the matrices that merged gates may be given. Defaults to the shift
+            ("+k"), swap ("ab") and identity ("0") gates of the circuit base, as in merged_custom_copy.
+        tol (float): Absolute tolerance of the matrix comparisons (0 for exact comparisons).
+        window (int | None): Maximum number of gates visited by each walk back (None for no limit).
+        max_rounds (int | None): Maximum number of passes (None to run until the fixpoint).
+        fuse_name (str, optional): Prefix (1 to 3 characters) of the names given to merged gates whose matrix is
+            not in gate_dict (F0, F1, ... for "F", with a base-36 counter), which are registered in the gate table of the result. If None (default),
+            such gates are not merged. Labels of the circuit gate table missing from gate_dict are also used.
+
+    Returns:
+        QuditCircuit: The optimized circuit.
+
+    Raises:
+        ValueError: If fuse_name is not a prefix of 1 to 3 characters.
+    """
+    if fuse_name is not None:
+        _GateLookup.check_fuse_name(fuse_name)
+    if gate_dict is None:
+        gate_dict = qc._default_gate_dict()
+    table = dict(qc.gate_table or {})
+    lookup = _GateLookup(gate_dict, tol)
+    for name, matrix in table.items():
+        lookup.add(name, matrix)
+
+    instructions = list(qc.instructions)
+    rounds = 0
+    while max_rounds is None or rounds < max_rounds:
+        rounds += 1
+        gates, removed = _cancel_round(instructions, qc.num_qudit, lookup, tol, window, fuse_name, table)
+        instructions = [g.instruction() for g in gates]
+        if not removed:
+            break
+
+    out = QuditCircuit(qc.num_qudit, qc.num_states)
+    for instruction in instructions:
+        out._append_instruction(instruction)
+    if table:
+        out.set_gate_table(table)
+    return out
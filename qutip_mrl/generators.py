@@ -0,0 +1,328 @@
+# generators.py
+from qutip_mrl.qudit_circuit import QuditCircuit
+
+
+def _check_base(base: int):
+    if base < 2:
+        raise ValueError("base must be >= 2")
+
+
+def _controlled_add(qc, control, source, target):
+    """
+    target += source (mod d) when control is |d-1⟩, source unchanged.
+
+    In base 3 this is the controlled Feynman gate (c_feynman_2), made of four two-qudit gates; in other bases it
+    is one value-controlled Toffoli per non-zero value of the source.
+    """
+    d = qc.num_states
+    if d == 3:
+        qc.c_feynman_2(control, source, target)
+        return
+    for v in range(1, d):
+        qc.toffoli(f"+{v}", control, source, target, [d - 1, v])
+
+
+def _add(qc, source, target):
+    """target += source (mod d), source unchanged."""
+    for v in range(1, qc.num_states):
+        qc.ms(f"+{v}", source, target, [v])
+
+
+def _add_with_carry(qc, source, target, carry):
+    """
+    target += source (mod d) and carry += 1 if the sum overflows, source unchanged.
+
+    In base 3 this is the seven gates block of the qutrit full adder (examples/5_qutrit_full_adder.py), which only
+    uses one and two-qudit gates; in other bases the carry is computed first with one value-controlled Toffoli per
+    overflowing pair of values.
+    """
+    d = qc.num_states
+    if d == 3:
+        qc.c_plus2(source, target)
+        qc.c_one_two(target, source)
+        qc.c_plus1(source, carry)
+        qc.c_one_two(target, source)
+        qc.plus1(source)
+        qc.c_plus1(source, target)
+        qc.plus2(source)
+        return
+    for v in range(1, d):
+        for u in range(d - v, d):
+            qc.toffoli("+1", source, target, carry, [v, u])
+    _add(qc, source, target)
+
+
+def _rotate_select(qc, select):
+    qc.shift("+1", select)
+
+
+def multiplexer(select_qudits: int = 1, base: int = 3, optimized: bool = True, return_layout: bool = False):
+    """
+    Build a base^k-to-1 multiplexer, k = select_qudits.
+
+    The multiplexer is a tree of 1-digit multiplexers: the leaves are selected by the last select qudit and the
+    root by the first one, so data qudit number i (in layout order) is routed to the output when the select
+    qudits spell i in base `base`, most significant digit first. Every node of the tree adds the selected child
+    to an ancilla (initially |0⟩) which is a data input of its parent; the root ancilla is the output.
+
+    In base 3 the construction is the one of examples/7-9: each select qudit is rotated with +1 gates and the
+    child is copied by a controlled Feynman gate when the rotated select is |2⟩; after base rotations the select
+    is back to its value. In other bases every child is copied by value-controlled Toffoli gates.
+
+    The qudits are laid out as in examples/8: the select qudits first, then every subtree followed by its output
+    (so the circuit output is the last qudit).
+
+    Args:
+        select_qudits (int): Number of select qudits k (>= 1).
+        base (int): Number of basis states of the qudits.
+        optimized (bool): If True (default), all the nodes of a level share the rotations of their select qudit
+            (examples/9); if False every node rotates the select base times on its own (examples/8).
+        return_layout (bool): If True, also return the layout of the circuit.
+
+    Returns:
+        QuditCircuit | tuple: The circuit, or (circuit, layout) where layout is a dict with keys "select"
+            (list of select qudits), "data" (list of data qudits, in selection order) and "output" (int).
+
+    Raises:
+        ValueError: If select_qudits < 1 or base < 2.
+    """
+    if select_qudits < 1:
+        raise ValueError("select_qudits must be >= 1")
+    _check_base(base)
+
+    k = select_qudits
+    select = list(range(k))
+    data = []
+    levels = [[] for _ in range(k)]  # levels[j]: (children, output) of the nodes driven by select j
+    next_qudit = k
+
+    def build(level):
+        nonlocal next_qudit
+        if level == k:
+            data.append(next_qudit)
+            next_qudit += 1
+            return data[-1]
+        children = [build(level + 1) for _ in range(base)]
+        output = next_qudit
+        next_qudit += 1
+        levels[level].append((children, output))
+        return output
+
+    output = build(0)
+    qc = QuditCircuit(next_qudit, base)
+
+    for level in reversed(range(k)):
+        sel = select[level]
+        nodes = levels[level]
+        if base != 3:
+            for children, out in nodes:
+                for s, child in enumerate(children):
+                    for v in range(1, base):
+                        qc.toffoli(f"+{v}", sel, child, out, [s, v])
+            continue
+        # After `step` rotations the select is |2⟩ when it was (2 - step) mod 3
+        groups = [nodes] if optimized else [[node] for node in nodes]
+        for group in groups:
+            for step in range(1, base + 1):
+                _rotate_select(qc, sel)
+                for children, out in group:
+                    _controlled_add(qc, sel, children[(base - 1 - step) % base], out)
+
+    if return_layout:
+        return qc, {"select": select, "data": data, "output": output}
+    return qc
+
+
+def demultiplexer(select_qudits: int = 1, base: int = 3, optimized: bool = True, return_layout: bool = False):
+    """
+    Build a 1-to-base^k demultiplexer, k = select_qudits.
+
+    The input is copied (added) to output number i (in layout order) when the select qudits spell i in base
+    `base`, most significant digit first; the other outputs stay |0⟩. The demultiplexer is a tree of 1-digit
+    demultiplexers: the root is driven by the first select qudit and the leaves by the last one. The
+    intermediate levels are ancillas (initially |0⟩) and hold a copy of the input along the selected path.
+
+    In base 3 the construction is the one of examples/10-12 (select rotations and controlled Feynman gates); in
+    other bases the input is copied by value-controlled Toffoli gates.
+
+    The qudits are laid out as in examples/11: the select qudits, the input, then every level of the tree from
+    the root to the leaves (the outputs are the last base^k qudits).
+
+    Args:
+        select_qudits (int): Number of select qudits k (>= 1).
+        base (int): Number of basis states of the qudits.
+        optimized (bool): If True (default), all the nodes of a level share the rotations of their select qudit
+            (examples/12); if False every node rotates the select base times on its own (examples/11).
+        return_layout (bool): If True, also return the layout of the circuit.
+
+    Returns:
+        QuditCircuit | tuple: The circuit, or (circuit, layout) where layout is a dict with keys "select"
+            (list of select qudits), "input" (int) and "outputs" (list of output qudits, in selection order).
+
+    Raises:
+        ValueError: If select_qudits < 1 or base < 2.
+    """
+    if select_qudits < 1:
+        raise ValueError("select_qudits must be >= 1")
+    _check_base(base)
+
+    k = select_qudits
+    select = list(range(k))
+    source = k
+    tree = [[source]]
+    next_qudit = k + 1
+    for _ in range(k):
+        size = len(tree[-1]) * base
+        tree.append(list(range(next_qudit, next_qudit + size)))
+        next_qudit += size
+
+    qc = QuditCircuit(next_qudit, base)
+    for level in range(k):
+        sel = select[level]
+        nodes = [(parent, tree[level + 1][j * base:(j + 1) * base]) for j, parent in enumerate(tree[level])]
+        if base != 3:
+            for parent, children in nodes:
+                for s, child in enumerate(children):
+                    for v in range(1, base):
+                        qc.toffoli(f"+{v}", sel, parent, child, [s, v])
+            continue
+        groups = [nodes] if optimized else [[node] for node in nodes]
+        for group in groups:
+            for step in range(1, base + 1):
+                _rotate_select(qc, sel)
+                for parent, children in group:
+                    _controlled_add(qc, sel, parent, children[(base - 1 - step) % base])
+
+    if return_layout:
+        return qc, {"select": select, "input": source, "outputs": tree[-1]}
+    return qc
+
+
+def ripple_adder(width: int, base: int = 3, carry_in: bool = False, return_layout: bool = False):
+    """
+    Build a ripple-carry adder of two width-digit numbers A and B, computing B := A + B in place.
+
+    Digit i is computed by adding a_i and then the carry of digit i-1 into b_i, each addition incrementing the
+    carry qudit of digit i on overflow. The carries are ancillas (initially |0⟩) and are not uncomputed: the last
+    one is the carry out of the sum, the other ones are left holding the intermediate carries.
+
+    In base 3 every addition is the seven gates block of the qutrit full adder (examples/5); in other bases the
+    carry is computed by value-controlled Toffoli gates and the sum by value-controlled MS gates.
+
+    The qudits are laid out digit by digit, least significant first: (a_i, b_i, carry_i) for every digit,
+    preceded by the carry in qudit if carry_in is True.
+
+    Args:
+        width (int): Number of digits of A and B (>= 1).
+        base (int): Number of basis states of the qudits.
+        carry_in (bool): If True, add a carry in qudit (full adder chain).
+        return_layout (bool): If True, also return the layout of the circuit.
+
+    Returns:
+        QuditCircuit | tuple: The circuit, or (circuit, layout) where layout is a dict with keys "a", "b"
+            and "carry" (lists of qudits, least significant digit first), "carry_in" (int or None) and
+            "carry_out" (int).
+
+    Raises:
+        ValueError: If width < 1 or base < 2.
+    """
+    if width < 1:
+        raise ValueError("width must be >= 1")
+    _check_base(base)
+
+    offset = 1 if carry_in else 0
+    a = [offset + 3 * i for i in range(width)]
+    b = [offset + 3 * i + 1 for i in range(width)]
+    carry = [offset + 3 * i + 2 for i in range(width)]
+    qc = QuditCircuit(offset + 3 * width, base)
+
+    previous = 0 if carry_in else None
+    for i in range(width):
+        _add_with_carry(qc, a[i], b[i], carry[i])
+        if previous is not None:
+            _add_with_carry(qc, previous, b[i], carry[i])
+        previous = carry[i]
+
+    if return_layout:
+        layout = {"a": a, "b": b, "carry": carry, "carry_in": 0 if carry_in else None, "carry_out": carry[-1]}
+        return qc, layout
+    return qc
+
+
+def half_adder(base: int = 3, return_layout: bool = False):
+    """
+    Build a half adder (a, b, carry) -> (a, a + b mod base, carry + overflow).
+
+    Shortcut for ripple_adder(1, base).
+    """
+    return ripple_adder(1, base, return_layout=return_layout)
+
+
+def full_adder(base: int = 3, return_layout: bool = False):
+    """
+    Build a full adder (carry_in, a, b, carry) -> (carry_in, a, a + b + carry_in mod base, carry + overflow).
+
+    Shortcut for ripple_adder(1, base, carry_in=True).
+    """
+    return ripple_adder(1, base, carry_in=True, return_layout=return_layout)
+
+
+def equality_comparator(width: int = 1, base: int = 3, return_layout: bool = False):
+    """
+    Build an equality comparator of two width-digit numbers A and B.
+
+    The flag qudit is incremented by 1 if A == B. Every b_i is replaced by b_i - a_i (zero iff the digits are
+    equal), the zero tests are chained with value-controlled Toffoli gates through width-2 ancillas into the flag,
+    and then the ancillas and the B digits are restored, so only the flag changes.
+
+    The qudits are laid out as (a_i, b_i) for every digit, then the ancillas, then the flag.
+
+    Args:
+        width (int): Number of digits of A and B (>= 1).
+        base (int): Number of basis states of the qudits.
+        return_layout (bool): If True, also return the layout of the circuit.
+
+    Returns:
+        QuditCircuit | tuple: The circuit, or (circuit, layout) where layout is a dict with keys "a", "b",
+            "ancillas" (lists of qudits) and "flag" (int).
+
+    Raises:
+        ValueError: If width < 1 or base < 2.
+    """
+    if width < 1:
+        raise ValueError("width must be >= 1")
+    _check_base(base)
+
+    a = [2 * i for i in range(width)]
+    b = [2 * i + 1 for i in range(width)]
+    ancillas = list(range(2 * width, 2 * width + max(width - 2, 0)))
+    flag = 2 * width + len(ancillas)
+    qc = QuditCircuit(flag + 1, base)
+
+    def subtract(sign):
+        for i in range(width):
+            for v in range(1, base):
+                qc.ms(f"+{(sign * v) % base}", a[i], b[i], [v])
+
+    # chain[j] is incremented if b_0 .. b_(j+1) are all zero
+    chain = ancillas + [flag]
+
+    def chain_step(j, label):
+        if j == 0:
+            qc.toffoli(label, b[0], b[1], chain[0], [0, 0])
+        else:
+            qc.toffoli(label, chain[j - 1], b[j + 1], chain[j], [1, 0])
+
+    subtract(-1)
+    if width == 1:
+        qc.ms("+1", b[0], flag, [0])
+    else:
+        for j in range(width - 1):
+            chain_step(j, "+1")
+        for j in reversed(range(width - 2)):
+            chain_step(j, f"+{base - 1}")
+    subtract(1)
+
+    if return_layout:
+        return qc, {"a": a, "b": b, "ancillas": ancillas, "flag": flag}
+    return qc
@@ -1,11 +1,12 @@
 import random
+import numpy as np
 from jmetal.operator.crossover import Crossover
 from .circuitsolution import CircuitSolution
 from .config import *
 
 class CircuitCrossover(Crossover):
     """
-    Implements a single-point crossover for quantum circuits represented as lists of gates.
+    Implements a single-point crossover for quantum circuits represented as integer-coded genomes (see util.Genome).
     The crossover combines two parent circuits to produce two child circuits by cutting each parent at a random point 
     and swapping the tails.
     The resulting child circuits are truncated to a maximum length defined by MAX_GENES to ensure they do not exceed 
@@ -41,8 +42,8 @@ class CircuitCrossover(Crossover):
             cut1 = random.randint(1, len(circuit1))
             cut2 = random.randint(1, len(circuit2))
 
-            child1_circuit = circuit1[:cut1] + circuit2[cut2:]
-            child2_circuit = circuit2[:cut2] + circuit1[cut1:]
+            child1_circuit = np.concatenate([circuit1[:cut1], circuit2[cut2:]])
+            child2_circuit = np.concatenate([circuit2[:cut2], circuit1[cut1:]])
 
             # Ensure length constraints
             if len(child1_circuit) > MAX_GENES:
@@ -52,6 +53,9 @@ class CircuitCrossover(Crossover):
 
             child1 = CircuitSolution(child1_circuit)
             child2 = CircuitSolution(child2_circuit)
+            # Each child starts with a prefix of one parent, whose simulation checkpoints it can reuse
+            child1.inherit_checkpoints(parent1, cut1)
+            child2.inherit_checkpoints(parent2, cut2)
 
             return [child1, child2]
 
@@ -4,7 +4,8 @@ from copy import deepcopy
 class CircuitSolution(Solution):
     """
     Represents a solution in the genetic algorithm for quantum circuit synthesis.
-    Each solution encapsulates a quantum circuit (as a list of gates) and its associated fitness value.
+    Each solution encapsulates a quantum circuit (as an integer-coded genome, see util.Genome) and its associated
+    fitness value.
     The class provides methods for copying the solution, which is essential for genetic operations like crossover
     """
         
@@ -52,5 +53,26 @@ class CircuitSolution(Solution):
     def copy(self):
         return self.__copy__()
 
+    def inherit_checkpoints(self, parent, shared: int):
+        """
+        Reuses the simulation checkpoints of a parent solution (see QuantumCircuitProblem.evaluate_batch) whose first
+        genes this solution shares, so that only the genes after them are simulated again.
+        :param parent: The solution this one was derived from.
+        :param shared: The number of leading genes both circuits have in common.
+        """
+        checkpoints = parent.attributes.get("checkpoints")
+        if checkpoints is None:
+            return
+        self.attributes["checkpoints"] = checkpoints
+        self.attributes["valid_prefix"] = min(shared, parent.attributes.get("valid_prefix", 0))
+
+    def invalidate_from(self, position: int):
+        """
+        Marks the genes from `position` on as changed since the checkpoints were recorded.
+        :param position: The index of the first changed gene.
+        """
+        if "valid_prefix" in self.attributes:
+            self.attributes["valid_prefix"] = min(position, self.attributes["valid_prefix"])
+
     def __str__(self):
         return f"Circuit: {self._variables}, Fitness: {self.objectives[0]}"
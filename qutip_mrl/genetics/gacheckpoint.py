@@ -0,0 +1,150 @@
+# gacheckpoint.py
+from __future__ import annotations
+
+import json
+import os
+import random
+import time
+
+import numpy as np
+
+from . import util
+from .circuitsolution import CircuitSolution
+
+"""
+Checkpoints of ElitistGeneticAlgorithm runs, from which a run continues exactly where it stopped.
+
+A checkpoint is a numpy .npz archive (written atomically: to a temporary file, then renamed) holding:
+- meta        uint8[]       UTF-8 JSON header: format version, gate table geometry (base, number of qudit lines),
+                            generation/stagnation counters, best fitness seen, evaluations, elapsed time, state of the
+                            Python random generator, progress of the termination criteria, fitness cache counters;
+- genes       uint8[K, 3]   genomes of the population, concatenated (population order: elites first);
+- lengths     int64[P]      number of genes of every genome;
+- fitness     float64[P]    fitness of every solution (NaN when not evaluated);
+- history     float64[G]    best fitness of every generation;
+- np_state    uint32[624]   key of the numpy MT19937 generator (its position is in the header);
+- cache_keys  uint8[]       fitness cache keys, concatenated in LRU order (least recently used first);
+- cache_sizes int64[C]      length of every key;
+- cache_acc   float64[C]    cached accuracy of every key.
+The per-solution simulation checkpoints (see QuantumCircuitProblem.evaluate_batch) are not stored: they only
+speed up the evaluation and are rebuilt as the run goes on.
+
+Only the progress of the termination criteria is stored (the attributes named in their progress_fields, e.g. the
+elapsed seconds of TerminationByTime), not their settings: a resumed run stops according to the arguments of the
+resuming call, e.g. a larger time limit.
+"""
+
+FORMAT_VERSION = 2
+
+
+def _criterion_state(criterion):
+    # Class name and progress attributes of a termination criterion, recursively for combined criteria
+    state = {"type": type(criterion).__name__,
+             "progress": {key: getattr(criterion, key) for key in getattr(criterion, "progress_fields", ())}}
+    if hasattr(criterion, "criteria"):
+        state["criteria"] = [_criterion_state(c) for c in criterion.criteria]
+    return state
+
+
+def _restore_criterion(criterion, state) -> None:
+    if state["type"] != type(criterion).__name__:
+        raise ValueError(f"The checkpoint was written with termination criterion {state['type']}, "
+                         f"not {type(criterion).__name__}")
+    if "criteria" in state:
+        if len(state["criteria"]) != len(criterion.criteria):
+            raise ValueError("The checkpoint was written with different termination criteria")
+        for c, s in zip(criterion.criteria, state["criteria"]):
+            _restore_criterion(c, s)
+    for key, value in state["progress"].items():
+        setattr(criterion, key, value)
+
+
+def save_checkpoint(algorithm, path) -> None:
+    """
+    Write the state of an ElitistGeneticAlgorithm run to a checkpoint file.
+    :param algorithm: The algorithm, between two generations.
+    :param path: The destination file path.
+    """
+    solutions = algorithm.solutions
+    genomes = [np.asarray(s.variables[0], dtype=np.uint8).reshape(-1, 3) for s in solutions]
+    fitness = [np.nan if s.objectives[0] is None else s.objectives[0] for s in solutions]
+    np_state = np.random.get_state()
+    version, internal, gauss = random.getstate()
+    cache = getattr(algorithm.problem, "fitness_cache", None)
+    entries = cache.items() if cache is not None else []
+
+    meta = {
+        "version": FORMAT_VERSION,
+        "base": util.QUBASE,
+        "num_qulines": util.NUM_QULINES,
+        "generation_count": algorithm.generation_count,
+        "stagnation_count": algorithm.stagnation_count,
+        "best_seen": algorithm.best_seen,
+        "evaluations": algorithm.evaluations,
+        "elapsed": time.time() - algorithm.start_computing_time,
+        "random_state": [version, list(internal), gauss],
+        "np_state": [np_state[0], int(np_state[2]), int(np_state[3]), float(np_state[4])],
+        "termination": _criterion_state(algorithm.termination_criterion),
+        "cache": None if cache is None else {"hits": cache.hits, "misses": cache.misses, "evictions": cache.evictions},
+    }
+    arrays = {
+        "meta": np.frombuffer(json.dumps(meta).encode("utf-8"), dtype=np.uint8),
+        "genes": np.concatenate(genomes) if genomes else np.zeros((0, 3), dtype=np.uint8),
+        "lengths": np.array([len(g) for g in genomes], dtype=np.int64),
+        "fitness": np.array(fitness, dtype=np.float64),
+        "history": np.array(algorithm.best_fitness_history, dtype=np.float64),
+        "np_state": np.asarray(np_state[1], dtype=np.uint32),
+        "cache_keys": np.frombuffer(b"".join(key for key, _ in entries), dtype=np.uint8),
+        "cache_sizes": np.array([len(key) for key, _ in entries], dtype=np.int64),
+        "cache_acc": np.array([acc for _, acc in entries], dtype=np.float64),
+    }
+
+    temporary = f"{path}.tmp"
+    with open(temporary, "wb") as file:
+        np.savez_compressed(file, **arrays)
+    os.replace(temporary, path)
+
+
+def load_checkpoint(algorithm, path) -> None:
+    """
+    Restore the state of a run written by save_checkpoint into an algorithm set up as for the original run
+    (same problem, operators and termination criteria). The gate tables must already be built (rebuild_tables).
+    :param algorithm: The algorithm to restore, not run yet.
+    :param path: The checkpoint file path.
+    :raises ValueError: If the checkpoint has another format version, another base or number of qudit lines, or
+        other termination criteria (other classes, or another number of them).
+    """
+    with np.load(path) as data:
+        arrays = {key: data[key] for key in data.files}
+    meta = json.loads(arrays["meta"].tobytes().decode("utf-8"))
+    if meta["version"] != FORMAT_VERSION:
+        raise ValueError(f"Unsupported checkpoint format version {meta['version']}")
+    if (meta["base"], meta["num_qulines"]) != (util.QUBASE, util.NUM_QULINES):
+        raise ValueError(f"The checkpoint is for base {meta['base']} and {meta['num_qulines']} qudit lines, "
+                         f"the gate tables are built for base {util.QUBASE} and {util.NUM_QULINES} qudit lines")
+
+    bounds = np.cumsum(arrays["lengths"])[:-1]
+    solutions = []
+    for genome, fit in zip(np.split(arrays["genes"], bounds), arrays["fitness"]):
+        solution = CircuitSolution(genome.copy())
+        solution.objectives = [None if np.isnan(fit) else float(fit)]
+        solutions.append(solution)
+    algorithm.solutions = solutions
+    algorithm.generation_count = meta["generation_count"]
+    algorithm.stagnation_count = meta["stagnation_count"]
+    algorithm.best_seen = meta["best_seen"]
+    algorithm.best_fitness_history = arrays["history"].tolist()
+    algorithm.evaluations = meta["evaluations"]
+    algorithm.start_computing_time = time.time() - meta["elapsed"]
+    _restore_criterion(algorithm.termination_criterion, meta["termination"])
+
+    version, internal, gauss = meta["random_state"]
+    random.setstate((version, tuple(internal), gauss))
+    name, pos, has_gauss, cached_gaussian = meta["np_state"]
+    np.random.set_state((name, arrays["np_state"], pos, has_gauss, cached_gaussian))
+
+    cache = getattr(algorithm.problem, "fitness_cache", None)
+    if cache is not None and meta["cache"] is not None:
+        keys = np.split(arrays["cache_keys"], np.cumsum(arrays["cache_sizes"])[:-1]) if len(arrays["cache_sizes"]) else []
+        cache.load(((key.tobytes(), acc) for key, acc in zip(keys, arrays["cache_acc"].tolist())),
+                   hits=meta["cache"]["hits"], misses=meta["cache"]["misses"], evictions=meta["cache"]["evictions"])
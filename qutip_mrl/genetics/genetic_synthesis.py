@@ -1,4 +1,5 @@
 from __future__ import annotations
+import os
 from typing import Dict, Tuple, List, Optional, Union, Literal, Iterable
 from jmetal.operator.selection import BinaryTournamentSelection
 from jmetal.util.termination_criterion import TerminationCriterion
@@ -7,7 +8,10 @@ from .quantumcircuitproblem import QuantumCircuitProblem
 from .safemutation import CircuitMutation
 from .circuitcrossover import CircuitCrossover
 from .geneticalgorithm import ElitistGeneticAlgorithm
+from .parallelevaluator import ParallelEvaluator
+from .telemetry import Telemetry
 from .util import *
+from . import util
 import numpy as np
 
 """
@@ -33,7 +37,10 @@ class TerminationByEvaluations(TerminationCriterion):
     runtime of the genetic algorithm, especially when the evaluation of solutions is computationally expensive. The class 
     keeps track of the number of evaluations and provides a method to update this count as the algorithm progresses.
     """
-    
+
+    # Attributes holding the progress of the run (the other ones are settings), see gacheckpoint
+    progress_fields = ("evaluations",)
+
     def __init__(self, max_evaluations: int):
         super().__init__()
         self.max_evaluations = max_evaluations
@@ -47,6 +54,111 @@ class TerminationByEvaluations(TerminationCriterion):
         self.evaluations = kwargs.get("EVALUATIONS", self.evaluations)
 
 
+class TerminationByConvergence(TerminationCriterion):
+    """
+    Termination criterion met once the best solution is a correct circuit and has not become shorter for `patience`
+    generations. The fitness of a correct circuit is 1 + 1/length, so a shorter correct circuit is a fitness
+    improvement; the criterion counts the progress updates of the algorithm (one per generation) since the last one.
+    """
+
+    progress_fields = ("best", "stalled")
+
+    def __init__(self, patience: int):
+        super().__init__()
+        self.patience = patience
+        self.best = float("-inf")
+        self.stalled = 0
+
+    @property
+    def is_met(self):
+        return self.best > 1.0 and self.stalled >= self.patience
+
+    def update(self, *args, **kwargs):
+        solution = kwargs.get("SOLUTIONS")
+        fitness = solution.objectives[0] if solution is not None and solution.objectives[0] is not None else float("-inf")
+        if fitness > self.best:
+            self.best = fitness
+            self.stalled = 0
+        else:
+            self.stalled += 1
+
+
+class TerminationByTime(TerminationCriterion):
+    """
+    Termination criterion met once the algorithm has run for `max_seconds` seconds of wall-clock time (the
+    COMPUTING_TIME reported by jMetal).
+    """
+
+    progress_fields = ("seconds",)
+
+    def __init__(self, max_seconds: float):
+        super().__init__()
+        self.max_seconds = max_seconds
+        self.seconds = 0.0
+
+    @property
+    def is_met(self):
+        return self.seconds >= self.max_seconds
+
+    def update(self, *args, **kwargs):
+        self.seconds = kwargs.get("COMPUTING_TIME", self.seconds)
+
+
+class TerminationByGateCount(TerminationCriterion):
+    """
+    Termination criterion met once the best solution is a correct circuit of at most `max_gates` genes.
+    """
+
+    progress_fields = ("met",)
+
+    def __init__(self, max_gates: int):
+        super().__init__()
+        self.max_gates = max_gates
+        self.met = False
+
+    @property
+    def is_met(self):
+        return self.met
+
+    def update(self, *args, **kwargs):
+        solution = kwargs.get("SOLUTIONS")
+        if solution is not None and solution.objectives[0] is not None and solution.objectives[0] > 1.0:
+            self.met = self.met or len(solution.variables[0]) <= self.max_gates
+
+
+class AnyTermination(TerminationCriterion):
+    """
+    Combination of termination criteria, met as soon as one of them is met. The progress updates of the algorithm
+    are forwarded to all of them.
+    """
+
+    def __init__(self, *criteria: TerminationCriterion):
+        super().__init__()
+        self.criteria = list(criteria)
+
+    @property
+    def is_met(self):
+        return any(criterion.is_met for criterion in self.criteria)
+
+    def update(self, *args, **kwargs):
+        for criterion in self.criteria:
+            criterion.update(*args, **kwargs)
+
+
+def _termination(*, pop_size: int, generations: int, patience: Optional[int] = None,
+                 time_limit: Optional[float] = None, target_length: Optional[int] = None) -> TerminationCriterion:
+    """
+    Termination criterion of genetic_synthesize: the evaluation budget, combined with the optional criteria.
+    """
+    criteria = [TerminationByEvaluations(pop_size * generations)]
+    if patience is not None:
+        criteria.append(TerminationByConvergence(patience))
+    if time_limit is not None:
+        criteria.append(TerminationByTime(time_limit))
+    if target_length is not None:
+        criteria.append(TerminationByGateCount(target_length))
+    return criteria[0] if len(criteria) == 1 else AnyTermination(*criteria)
+
 def _get_algorithm_result(algorithm):
     """
     Retrieve the best solution from a jMetal algorithm instance after it has finished running. The function checks for 
@@ -93,7 +205,7 @@ def _register_gate_table(qc: QuditCircuit):
         mapping gate labels (strings) to their corresponding permutation matrices (numpy arrays), which define 
         the behavior of the gates in the circuit.    
     """
-    table = {k: _perm_to_matrix(v) for k, v in QSG_TABLE.items()}
+    table = {k: _perm_to_matrix(v) for k, v in util.QSG_TABLE.items()}
     qc.set_gate_table(table)
 
 
@@ -104,7 +216,8 @@ def ga_circuit_to_qudit_circuit(ga_circuit: List[Gate], *, num_qudits: int, base
     and constructing the circuit according to the specified control and target qudit indices. The function also handles the
     control fire value, which determines when controlled gates are activated based on the state of the control qudits.
     :param ga_circuit: A list of Gate tuples representing the circuit in the genetic algorithm
-        format, where each tuple consists of a control qudit index, target qudit index, and gate type as a string.
+        format, where each tuple consists of a control qudit index, target qudit index, and gate type as a string,
+        or an integer-coded genome (see util.encode_circuit).
     :param num_qudits: The total number of qudits in the circuit, which is needed to initialize the QuditCircuit 
         and interpret the gate parameters correctly.
     :param base: The base of the qudits (e.g., 3 for ternary), which is necessary for understanding the gate types 
@@ -119,6 +232,8 @@ def ga_circuit_to_qudit_circuit(ga_circuit: List[Gate], *, num_qudits: int, base
     """
     if control_fire_value is None:
         control_fire_value = base - 1
+    if isinstance(ga_circuit, np.ndarray):
+        ga_circuit = decode_circuit(ga_circuit)
 
     qc = QuditCircuit(num_qudits, base)
     _register_gate_table(qc)
@@ -147,7 +262,7 @@ def ga_to_shift_ms_ops(ga_circuit: List[Gate], *, base: int, control_fire_value:
     the sequence of gates in a more detailed way. The function also handles the control fire value for controlled gates, 
     allowing for flexibility in how the operations are defined based on the state of the control qudits.
     :param ga_circuit: A list of Gate tuples representing the circuit in the genetic algorithm format, where each tuple 
-    consists of a control qudit index, target qudit index, and gate type as a string.
+    consists of a control qudit index, target qudit index, and gate type as a string, or an integer-coded genome.
     :param base: The base of the qudits (e.g., 3 for ternary), which is necessary for understanding the gate types and their 
     effects on the qudits, as well as for determining the control fire value if it is not provided.
     :param control_fire_value: An optional integer specifying the value of the control qudit that triggers the controlled gates. 
@@ -161,6 +276,8 @@ def ga_to_shift_ms_ops(ga_circuit: List[Gate], *, base: int, control_fire_value:
     """
     if control_fire_value is None:
         control_fire_value = base - 1
+    if isinstance(ga_circuit, np.ndarray):
+        ga_circuit = decode_circuit(ga_circuit)
 
     control_prefix = f"C{base-1}Z"
     ops: List[Op] = []
@@ -224,6 +341,15 @@ def genetic_synthesize(
     elite_size: int = 10,
     restoring: bool = False,
     return_ga: bool = False,
+    cache_size: int = 100_000,
+    workers: int = 1,
+    patience: Optional[int] = None,
+    time_limit: Optional[float] = None,
+    target_length: Optional[int] = None,
+    checkpoint_file: Optional[str] = None,
+    checkpoint_interval: int = 100,
+    resume: bool = False,
+    telemetry: Optional[Telemetry] = None,
 ):
     """
     Synthesize a quantum circuit that implements the functionality defined by the given truth table using a genetic algorithm.
@@ -263,31 +389,97 @@ def genetic_synthesize(
             where the circuit needs to be in a particular format for execution or further processing.
         return_ga: A boolean flag indicating whether to return the raw output from the genetic algorithm (a list of 
             Gate tuples) instead of converting it to a QuditCircuit. This can be useful for users who want to see
+        cache_size: The maximum number of genomes whose accuracy is memoized during the run (0 to disable it). The
+            cache is shared by the evaluation, the mutation operator and the local search; its counters are in
+            problem.fitness_cache.
+        workers: The number of processes evaluating the offspring (see ParallelEvaluator; None for one per CPU). With
+            the default 1, everything runs in this process.
+        patience: If given, stop once the best circuit is correct and has not become shorter for this many
+            generations (TerminationByConvergence).
+        time_limit: If given, stop after this many seconds (TerminationByTime).
+        target_length: If given, stop as soon as a correct circuit of at most this many gates is found
+            (TerminationByGateCount). The run always stops after `generations` generations; the first criterion
+            met ends it.
+        checkpoint_file: If given, the state of the run is saved to this file every checkpoint_interval generations
+            and at the end (see ElitistGeneticAlgorithm.save_checkpoint).
+        checkpoint_interval: The number of generations between two checkpoints.
+        resume: If True and checkpoint_file exists, continue the run saved in it instead of starting a new one. The
+            other arguments must be the ones of the saved run, except the limits generations, patience, time_limit
+            and target_length, whose new values apply to the rest of the run (the same ones must be given, though).
+        telemetry: A Telemetry (or a single sink) receiving the progress records of the run, see
+            telemetry.Telemetry; e.g. Telemetry([PrintSink()]) prints the progress. By default the run is silent.
     """
     rebuild_tables(base=base, num_qulines=num_qudits)
 
-    problem = QuantumCircuitProblem(truth_table, output_indices=output_indices)
+    problem = QuantumCircuitProblem(truth_table, output_indices=output_indices, cache_size=cache_size)
+    algorithm = _build_algorithm(
+        problem,
+        pop_size=pop_size,
+        generations=generations,
+        mutation_rate=mutation_rate,
+        crossover_rate=crossover_rate,
+        elite_size=elite_size,
+        workers=workers,
+        patience=patience,
+        time_limit=time_limit,
+        target_length=target_length,
+        checkpoint_file=checkpoint_file,
+        checkpoint_interval=checkpoint_interval,
+        telemetry=telemetry,
+    )
+    if resume and checkpoint_file is not None and os.path.exists(checkpoint_file):
+        algorithm.load_checkpoint(checkpoint_file)
+
+    try:
+        algorithm.run()
+    finally:
+        if workers != 1:
+            algorithm.population_evaluator.close()
+    result = _get_algorithm_result(algorithm)
+    return _finish_genome(result.variables[0], num_qudits=num_qudits, base=base, output_indices=output_indices,
+                          restoring=restoring, return_ga=return_ga)
 
-    algorithm = ElitistGeneticAlgorithm(
+
+def _build_algorithm(problem: QuantumCircuitProblem, *, pop_size: int, generations: int, mutation_rate: float,
+                     crossover_rate: float, elite_size: int, workers: int = 1, checkpoint_file: Optional[str] = None,
+                     checkpoint_interval: int = 100, telemetry: Optional[Telemetry] = None,
+                     **termination) -> ElitistGeneticAlgorithm:
+    """
+    Set up the elitist GA of a problem with the operators of genetic_synthesize (the mutation shares the problem's
+    fitness cache). The gate tables must already be built for the base and width of the problem (rebuild_tables).
+    The termination options (patience, time_limit, target_length) are the ones of genetic_synthesize.
+    """
+    return ElitistGeneticAlgorithm(
         problem=problem,
         population_size=pop_size,
         offspring_population_size=pop_size,
-        mutation=CircuitMutation(mutation_rate, truth_table, output_indices=output_indices),
+        mutation=CircuitMutation(mutation_rate, problem.truth_table, output_indices=problem.output_indices,
+                                 fitness_cache=problem.fitness_cache),
         crossover=CircuitCrossover(crossover_rate),
-        termination_criterion=TerminationByEvaluations(pop_size * generations),
+        termination_criterion=_termination(pop_size=pop_size, generations=generations, **termination),
         elite_size=elite_size,
         selection=BinaryTournamentSelection(),
+        population_evaluator=ParallelEvaluator(workers) if workers != 1 else None,
+        checkpoint_file=checkpoint_file,
+        checkpoint_interval=checkpoint_interval,
+        telemetry=telemetry,
     )
 
-    algorithm.run()
-    result = _get_algorithm_result(algorithm)
-    ga_circuit = result.variables[0]
 
-    ga_circuit = simplify_circuit(ga_circuit)
+def _finish_genome(genome, *, num_qudits: int, base: int, output_indices: Iterable[int], restoring: bool,
+                   return_ga: bool):
+    """
+    Turn the best genome of a GA run into the result of genetic_synthesize: simplified, optionally made restoring,
+    then decoded into a list of Gate tuples (return_ga) or converted into a QuditCircuit.
+    """
+    genome = simplify_genome(genome)
 
     if restoring:
-        ga_circuit = make_restoring_circuit(ga_circuit, protected_indices=output_indices)
-        ga_circuit = simplify_circuit(ga_circuit)
+        genome = make_restoring_genome(genome, protected_indices=output_indices)
+        genome = simplify_genome(genome)
+
+    # The GA works on integer-coded genomes, the string form is only produced here
+    ga_circuit = decode_circuit(genome)
 
     if return_ga:
         return ga_circuit
@@ -298,7 +490,6 @@ def genetic_synthesize(
         base=base,
     )
 
-
 def synthesize_ops_from_truth_table(
     truth_table: TruthTable,
     *,
@@ -311,6 +502,14 @@ def synthesize_ops_from_truth_table(
     crossover_rate: float = 0.7,
     elite_size: int = 10,
     restoring: bool = True,
+    workers: int = 1,
+    patience: Optional[int] = None,
+    time_limit: Optional[float] = None,
+    target_length: Optional[int] = None,
+    checkpoint_file: Optional[str] = None,
+    checkpoint_interval: int = 100,
+    resume: bool = False,
+    telemetry: Optional[Telemetry] = None,
 ) -> List[Op]:
     """
     Synthesize a quantum circuit that implements the functionality defined by the given truth table using a genetic algorithm, and return the resulting circuit as a list of operations (Op) that can be executed to construct the same circuit. This function is similar to `genetic_synthesize`, but instead of returning a QuditCircuit instance, it returns a list of operations that represent the gates in the synthesized circuit. The operations are explicitly defined as either shift or MS operations, along with their parameters, allowing for a more detailed understanding of the sequence of gates in the synthesized circuit. The function also includes options for restoring the circuit to a specific form and controlling various parameters of the genetic algorithm.
@@ -327,6 +526,10 @@ def synthesize_ops_from_truth_table(
     - crossover_rate: The rate at which crossover is applied between candidate circuits in the genetic algorithm, which allows for the combination of features from different circuits to create new candidate solutions. A higher crossover rate can promote diversity in the population but may also lead to less stable convergence.
     - elite_size: The number of top-performing circuits to retain as elites in each generation of the genetic algorithm, which ensures that the best solutions are preserved and can contribute to the next generation. A larger elite size can help maintain good solutions but may reduce diversity in the population.
     - restoring: A boolean flag indicating whether to apply a restoring transformation to the resulting circuit, which can help ensure that the circuit has a specific form or structure. This is useful for certain applications where the circuit needs to be in a particular format for execution or further processing.
+    - workers: The number of processes evaluating the offspring (None for one per CPU, see genetic_synthesize).
+    - patience, time_limit, target_length: Optional termination criteria, see genetic_synthesize.
+    - checkpoint_file, checkpoint_interval, resume: Periodic saving of the run and resumption, see genetic_synthesize.
+    - telemetry: The receiver of the progress records of the run (silent by default), see genetic_synthesize.
     """
     ga_circuit = genetic_synthesize(
         truth_table,
@@ -340,5 +543,13 @@ def synthesize_ops_from_truth_table(
         elite_size=elite_size,
         restoring=restoring,
         return_ga=True,
+        workers=workers,
+        patience=patience,
+        time_limit=time_limit,
+        target_length=target_length,
+        checkpoint_file=checkpoint_file,
+        checkpoint_interval=checkpoint_interval,
+        resume=resume,
+        telemetry=telemetry,
     )
     return ga_to_shift_ms_ops(ga_circuit, base=base)
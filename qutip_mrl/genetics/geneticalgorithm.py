@@ -1,6 +1,11 @@
 import random
+import time
+import numpy as np
 from jmetal.algorithm.singleobjective.genetic_algorithm import GeneticAlgorithm
 from .quantumcircuitproblem import QuantumCircuitProblem
+from .populationevaluator import PopulationEvaluator
+from . import gacheckpoint
+from .telemetry import Telemetry, as_telemetry
 from .util import *
 from .config import MIN_GENES, MAX_GENES, STAGNATION_LIMIT
 
@@ -17,7 +22,8 @@ class ElitistGeneticAlgorithm(GeneticAlgorithm):
     """
     
     def __init__(self, problem, population_size, offspring_population_size, 
-                 mutation, crossover, termination_criterion, selection, elite_size=5):
+                 mutation, crossover, termination_criterion, selection, elite_size=5, population_evaluator=None,
+                 checkpoint_file=None, checkpoint_interval=100, telemetry=None):
         """
         Initializes the ElitistGeneticAlgorithm with the given parameters.
         :param problem: The problem instance to solve, which should be a QuantumCircuitProblem.
@@ -28,14 +34,69 @@ class ElitistGeneticAlgorithm(GeneticAlgorithm):
         :param termination_criterion: The criterion to determine when to stop the algorithm.
         :param selection: The selection operator to choose parent solutions for reproduction.
         :param elite_size: The number of top solutions to retain as elites in each generation.
+        :param population_evaluator: The jMetal evaluator of the populations. Defaults to a PopulationEvaluator,
+            which scores a whole population in one vectorized sweep.
+        :param checkpoint_file: If given, the state of the run is written to this file (see gacheckpoint) every
+            checkpoint_interval generations and when the run ends; load_checkpoint() resumes a run from it.
+        :param checkpoint_interval: The number of generations between two checkpoints.
+        :param telemetry: A Telemetry (or a single sink, see telemetry) receiving the progress records of the run:
+            generation statistics, new best fitness values, local search results and diversity injections. Without
+            it the run reports nothing and computes no statistics.
         """
+        if population_evaluator is None:
+            population_evaluator = PopulationEvaluator()
         super().__init__(problem, population_size, offspring_population_size,
-                        mutation, crossover, selection, termination_criterion)
+                        mutation, crossover, selection, termination_criterion,
+                        population_evaluator=population_evaluator)
         self.elite_size = elite_size
         self.best_fitness_history = []
         self.generation_count = 0
         self.stagnation_count = 0
         self.best_seen = 0.0
+        self.checkpoint_file = checkpoint_file
+        self.checkpoint_interval = checkpoint_interval
+        self.resumed = False
+        self.telemetry: Telemetry = as_telemetry(telemetry) or Telemetry()
+        self._telemetry_mark = None
+
+    def run(self):
+        """
+        Runs the algorithm, from the initial population or, after load_checkpoint(), from the restored state.
+        """
+        if not self.resumed:
+            super().run()
+        else:
+            while not self.stopping_condition_is_met():
+                self.step()
+                self.update_progress()
+            self.total_computing_time = time.time() - self.start_computing_time
+        if self.checkpoint_file is not None:
+            self.save_checkpoint(self.checkpoint_file)
+
+    def update_progress(self):
+        super().update_progress()
+        if self.telemetry.enabled and self.generation_count % self.telemetry.interval == 0:
+            self._emit_generation()
+        if (self.checkpoint_file is not None and self.checkpoint_interval > 0
+                and self.generation_count % self.checkpoint_interval == 0):
+            self.save_checkpoint(self.checkpoint_file)
+
+    def save_checkpoint(self, path):
+        """
+        Writes the state of the run (population, counters, random generators, termination criteria and fitness
+        cache) to a checkpoint file, see gacheckpoint.
+        :param path: The destination file path.
+        """
+        gacheckpoint.save_checkpoint(self, path)
+
+    def load_checkpoint(self, path):
+        """
+        Restores the state written by save_checkpoint(), so that run() continues the checkpointed run exactly where
+        it stopped. The algorithm must be set up as for the original run.
+        :param path: The checkpoint file path.
+        """
+        gacheckpoint.load_checkpoint(self, path)
+        self.resumed = True
 
     def replacement(self, population, offspring_population):
         """
@@ -60,15 +121,16 @@ class ElitistGeneticAlgorithm(GeneticAlgorithm):
         else:
             self.best_seen = current_best
             self.stagnation_count = 0
-            print(f"NEW BEST FITNESS: {current_best:.6f} at generation {self.generation_count}")
+            self.telemetry.emit("new_best", generation=self.generation_count, best_fitness=current_best)
 
             # Apply local search to new best solutions
             if current_best > 0.8:  # Only for high-fitness solutions
-                print("Applying local search to best solution...")
                 improved = self.local_search(all_solutions[0])
                 if improved.objectives[0] > current_best:
                     all_solutions[0] = improved
-                    print(f"Local search improvement: {improved.objectives[0]:.6f}")
+                self.telemetry.emit("local_search", generation=self.generation_count,
+                                    improved=improved.objectives[0] > current_best,
+                                    fitness=max(improved.objectives[0], current_best))
 
         # Diversity injection if stagnated
         if self.stagnation_count > STAGNATION_LIMIT and current_best > 0.8:
@@ -77,30 +139,32 @@ class ElitistGeneticAlgorithm(GeneticAlgorithm):
             # Replace 50% with diverse solutions when close to optimum
             diverse_solutions = []
             for _ in range(int(self.population_size * 0.8)):
-                new_solution = self.problem.create_solution()
-                self.problem.evaluate(new_solution)
-                diverse_solutions.append(new_solution)
+                diverse_solutions.append(self.problem.create_solution())
+            self.evaluate(diverse_solutions)
 
             remaining_needed = self.population_size - len(elite_solutions) - len(diverse_solutions)
             remaining_solutions = all_solutions[self.elite_size:self.elite_size + remaining_needed]
 
             new_population = elite_solutions + diverse_solutions + remaining_solutions
             self.stagnation_count = 0
+            self.telemetry.emit("diversity_injection", generation=self.generation_count,
+                                injected=len(diverse_solutions))
         elif self.stagnation_count > STAGNATION_LIMIT:
             # Keep elite but replace 30% with new random solutions
             elite_solutions = all_solutions[:self.elite_size]
             diverse_solutions = []
 
             for _ in range(int(self.population_size * 0.3)):
-                new_solution = self.problem.create_solution()
-                self.problem.evaluate(new_solution)
-                diverse_solutions.append(new_solution)
+                diverse_solutions.append(self.problem.create_solution())
+            self.evaluate(diverse_solutions)
 
             remaining_needed = self.population_size - len(elite_solutions) - len(diverse_solutions)
             remaining_solutions = all_solutions[self.elite_size:self.elite_size + remaining_needed]
 
             new_population = elite_solutions + diverse_solutions + remaining_solutions
             self.stagnation_count = 0
+            self.telemetry.emit("diversity_injection", generation=self.generation_count,
+                                injected=len(diverse_solutions))
         else:
             # Standard elitist selection
             new_population = all_solutions[:self.population_size]
@@ -108,13 +172,36 @@ class ElitistGeneticAlgorithm(GeneticAlgorithm):
         # Track fitness
         self.best_fitness_history.append(current_best)
 
-        # Progress reporting
-        if self.generation_count % 50 == 0:
-            avg_fitness = sum(sol.objectives[0] for sol in new_population[:10] if sol.objectives[0] is not None) / 10
-            diversity = self.calculate_diversity(new_population[:20])
-            print(f"Gen {self.generation_count:3d}: Best={current_best:.4f}, Avg={avg_fitness:.4f}, Diversity={diversity:.3f}")
-
         return new_population
+
+    def _emit_generation(self):
+        """
+        Sends the "generation" telemetry record of the current population (see telemetry.Telemetry). The rates are
+        measured since the previous record, or since the start of the run for the first one.
+        """
+        now = time.perf_counter()
+        if self._telemetry_mark is None:
+            self._telemetry_mark = (now - (time.time() - self.start_computing_time), 0, 0)
+        since, evaluations, generation = self._telemetry_mark
+        elapsed = max(now - since, 1e-9)
+        self._telemetry_mark = (now, self.evaluations, self.generation_count)
+
+        fitness = np.array([s.objectives[0] if s.objectives[0] is not None else 0.0 for s in self.solutions])
+        lengths = np.bincount([len(s.variables[0]) for s in self.solutions])
+        cache = getattr(self.problem, "fitness_cache", None)
+        self.telemetry.emit(
+            "generation",
+            generation=self.generation_count,
+            evaluations=self.evaluations,
+            evals_per_sec=(self.evaluations - evaluations) / elapsed,
+            generation_time=elapsed / max(1, self.generation_count - generation),
+            best_fitness=float(fitness.max(initial=0.0)),
+            avg_fitness=float(fitness.mean()) if len(fitness) else 0.0,
+            diversity=self.calculate_diversity(self.solutions[:20]),
+            length_histogram={int(n): int(c) for n, c in enumerate(lengths) if c},
+            cache_hit_rate=cache.hit_rate if cache is not None and cache.maxsize > 0 else None,
+            cache_size=len(cache) if cache is not None else 0,
+        )
     
     def local_search(self, solution):
         """
@@ -138,16 +225,20 @@ class ElitistGeneticAlgorithm(GeneticAlgorithm):
 
             if mod_type == 'change' and len(circuit) > 0:
                 idx = random.randint(0, len(circuit) - 1)
-                circuit[idx] = random_gate()
+                circuit[idx] = random_gene()
+                neighbor.invalidate_from(idx)
             elif mod_type == 'add' and len(circuit) < MAX_GENES:
                 pos = random.randint(0, len(circuit))
-                circuit.insert(pos, random_gate())
+                neighbor.variables[0] = np.insert(circuit, pos, random_gene(), axis=0)
+                neighbor.invalidate_from(pos)
             elif mod_type == 'remove' and len(circuit) > MIN_GENES:
                 idx = random.randint(0, len(circuit) - 1)
-                del circuit[idx]
+                neighbor.variables[0] = np.delete(circuit, idx, axis=0)
+                neighbor.invalidate_from(idx)
             elif mod_type == 'swap' and len(circuit) > 1:
                 i, j = random.sample(range(len(circuit)), 2)
-                circuit[i], circuit[j] = circuit[j], circuit[i]
+                circuit[[i, j]] = circuit[[j, i]]
+                neighbor.invalidate_from(min(i, j))
 
             # Evaluate neighbor
             self.problem.evaluate(neighbor)
@@ -0,0 +1,285 @@
+# islandmodel.py
+from __future__ import annotations
+
+import contextlib
+import multiprocessing
+import queue
+import random
+import time
+from typing import Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from . import util
+from .circuitsolution import CircuitSolution
+from .genetic_synthesis import TruthTable, _build_algorithm, _finish_genome
+from .quantumcircuitproblem import QuantumCircuitProblem
+from .telemetry import PrintSink, Telemetry
+
+
+def _target_fitness(target_length: Optional[int]) -> float:
+    # Correct circuits score 1 + 1/length, all the others less than 1
+    if target_length is None:
+        return 1.0 + 1e-12
+    return 1.0 + 1.0 / max(1, target_length) - 1e-12
+
+
+def _best(solutions: List[CircuitSolution]) -> CircuitSolution:
+    return max(solutions, key=lambda s: s.objectives[0] if s.objectives[0] is not None else float("-inf"))
+
+
+def _migrate(algorithm, outbox, inbox, migrants: int) -> None:
+    """
+    Sends copies of the best genomes of an island to the next one on the ring, and replaces the worst solutions by
+    the genomes received from the previous one (when they are better). The evaluations of the immigrants count
+    towards the evaluation budget of the island.
+    """
+    population = algorithm.solutions
+    ranked = sorted(range(len(population)), reverse=True,
+                    key=lambda i: population[i].objectives[0] if population[i].objectives[0] is not None else float("-inf"))
+    outbox.put([population[i].variables[0] for i in ranked[:migrants]])
+
+    arrivals = []
+    with contextlib.suppress(queue.Empty):
+        while True:
+            arrivals.extend(inbox.get_nowait())
+    if not arrivals:
+        return
+    immigrants = algorithm.evaluate([CircuitSolution(genome) for genome in arrivals[-migrants:]])
+    algorithm.evaluations += len(immigrants)
+    for i, immigrant in zip(reversed(ranked), immigrants):
+        if population[i].objectives[0] is None or immigrant.objectives[0] > population[i].objectives[0]:
+            population[i] = immigrant
+    population.sort(key=lambda s: s.objectives[0] if s.objectives[0] is not None else float("-inf"), reverse=True)
+
+
+class _Rivalry:
+    """
+    Early cancellation of the islands once one of them holds a correct circuit of `best_length` gates (a shared
+    value, 0 while there is none, lowered every time an island holds a shorter one): every island, the one holding
+    the circuit included, is given grace_generations more generations to hold a shorter correct circuit, counted
+    from the last change of best_length, and stops right away if no shorter genome is allowed.
+    """
+
+    def __init__(self, best_length, grace_generations: Optional[int], min_genes: int):
+        self.best_length = best_length
+        self.grace_generations = grace_generations
+        self.min_genes = min_genes
+        self.known = 0
+        self.waited = 0
+
+    def beaten(self, best: CircuitSolution) -> bool:
+        """Whether the island should stop, its best solution being `best` (called once per generation)."""
+        if self.grace_generations is None:
+            return False
+        length = self.best_length.value
+        if not length:
+            return False
+        if length != self.known:
+            self.known, self.waited = length, 0
+        if length <= self.min_genes:
+            return True
+        if best.objectives[0] > 1.0 and len(best.variables[0]) < length:
+            return False
+        self.waited += 1
+        return self.waited > self.grace_generations
+
+    def publish(self, best: CircuitSolution) -> None:
+        """
+        Records the length of the best solution of the island, when it is correct and the shortest yet (called once
+        per generation, and when the island stops).
+        """
+        if best.objectives[0] is None or best.objectives[0] <= 1.0:
+            return
+        length = len(best.variables[0])
+        if self.best_length.value and length >= self.best_length.value:
+            return
+        with self.best_length.get_lock():
+            if not self.best_length.value or length < self.best_length.value:
+                self.best_length.value = length
+
+
+def _run_island(index: int, settings: dict, inbox, outbox, results, stop, best_length) -> None:
+    """
+    Body of an island process: runs one ElitistGeneticAlgorithm generation by generation, migrating every
+    migration_interval generations, until its evaluation budget is spent, `stop` is set or it has not held a correct
+    circuit shorter than the shortest one held by any island within grace_generations (see _Rivalry). The best genome is put
+    in `results` as (index, genome, fitness, generations).
+    """
+    # Migrants left in the outbox when the next island has already stopped must not block the exit
+    outbox.cancel_join_thread()
+    random.seed(settings["seed"])
+    np.random.seed(settings["seed"] % 2**32)
+    util.rebuild_tables(base=settings["base"], num_qulines=settings["num_qudits"])
+    target = _target_fitness(settings["target_length"])
+
+    problem = QuantumCircuitProblem(settings["truth_table"], output_indices=settings["output_indices"])
+    algorithm = _build_algorithm(
+        problem,
+        pop_size=settings["pop_size"],
+        generations=settings["generations"],
+        mutation_rate=settings["mutation_rate"],
+        crossover_rate=settings["crossover_rate"],
+        elite_size=settings["elite_size"],
+        patience=settings["patience"],
+        time_limit=settings["time_limit"],
+        telemetry=Telemetry([PrintSink(prefix=f"[island {index}] ")]) if settings["verbose"] else None,
+    )
+    algorithm.start_computing_time = time.time()
+    algorithm.solutions = algorithm.evaluate(algorithm.create_initial_solutions())
+    algorithm.init_progress()
+    rivalry = _Rivalry(best_length, settings["grace_generations"], problem.min_genes)
+    generation = 0
+    best = _best(algorithm.solutions)
+    rivalry.publish(best)
+    while (best.objectives[0] < target and not stop.is_set() and not algorithm.stopping_condition_is_met()
+           and not rivalry.beaten(best)):
+        algorithm.step()
+        algorithm.update_progress()
+        generation += 1
+        if settings["migration_interval"] > 0 and generation % settings["migration_interval"] == 0:
+            _migrate(algorithm, outbox, inbox, settings["migrants"])
+        best = _best(algorithm.solutions)
+        rivalry.publish(best)
+    if best.objectives[0] >= target:
+        stop.set()
+    rivalry.publish(best)
+
+    results.put((index, best.variables[0], best.objectives[0], generation))
+
+
+def island_synthesize(
+    truth_table: TruthTable,
+    *,
+    base: int,
+    num_qudits: int,
+    output_indices: Iterable[int],
+    islands: int = 4,
+    migration_interval: int = 20,
+    migrants: int = 2,
+    target_length: Optional[int] = None,
+    pop_size: int = 100,
+    generations: int = 10000,
+    mutation_rates: Sequence[float] = (0.1, 0.2, 0.3, 0.4),
+    crossover_rate: float = 0.7,
+    elite_size: int = 10,
+    seed: Optional[int] = None,
+    grace_generations: Optional[int] = None,
+    patience: Optional[int] = None,
+    time_limit: Optional[float] = None,
+    restoring: bool = False,
+    return_ga: bool = False,
+    verbose: bool = False,
+):
+    """
+    Synthesize a circuit with an island-model genetic algorithm: several ElitistGeneticAlgorithm populations evolve
+    in separate processes, each with its own random seed and mutation rate, and every `migration_interval`
+    generations each island sends copies of its `migrants` best circuits to the next island on a ring, where they
+    replace the worst solutions they beat. All the islands stop as soon as one of them finds a correct circuit of
+    at most `target_length` gates.
+
+    With migration_interval=0 the islands are independent runs, as concurrent retries of genetic_synthesize. Then
+    grace_generations can cancel the runs that lag behind: as soon as a run holds a correct circuit of L gates,
+    every run stops once it cannot produce a shorter one (L is the minimum genome length), or when it has run
+    grace_generations more generations without any run holding a correct circuit shorter than L. The wall time is
+    then about that of the fastest successful run plus the grace period.
+
+    Args:
+        truth_table: A dictionary mapping complete input combinations (including target qudits initialized to 0) to
+            their expected output combinations, as for genetic_synthesize.
+        base: The base of the qudits (3 or 4).
+        num_qudits: The total number of qudits in the circuit.
+        output_indices: The indices of the wires compared with the expected outputs.
+        islands: The number of populations, one process each.
+        migration_interval: The number of generations between two migrations (0 for isolated islands). There is
+            no migration with a single island.
+        migrants: The number of circuits sent by an island at every migration.
+        target_length: The gate count at which a correct circuit stops all the islands. If None, the first correct
+            circuit of any length stops them.
+        pop_size: The size of the population of every island.
+        generations: The maximum number of generations of every island.
+        mutation_rates: The mutation rates of the islands, assigned in turn (island i gets
+            mutation_rates[i % len(mutation_rates)]).
+        crossover_rate: The crossover rate of all the islands.
+        elite_size: The number of elites kept by every island.
+        seed: Seed of the seeds of the islands (None for a random one).
+        grace_generations: The number of generations the runs may go on, after one of them first holds a correct
+            circuit (or a shorter one than before), without any of them holding a shorter correct circuit. If None
+            (default), runs are not cancelled.
+        patience: If given, an island also stops once its best circuit is correct and has not become shorter for
+            this many generations (see genetic_synthesize).
+        time_limit: If given, an island also stops after this many seconds.
+        restoring: Whether to make the resulting circuit restoring, as for genetic_synthesize.
+        return_ga: Whether to return the list of Gate tuples instead of a QuditCircuit.
+        verbose: Whether the islands print their progress (interleaved, see telemetry.PrintSink); by default they
+            report nothing.
+
+    Returns:
+        The best circuit found by the islands (the shortest correct one, or the most accurate), as a QuditCircuit or
+        a list of Gate tuples (return_ga).
+
+    Raises:
+        RuntimeError: If an island process exits without reporting its result.
+    """
+    islands = max(1, int(islands))
+    rates = list(mutation_rates) or [0.2]
+    rng = random.Random(seed)
+    context = multiprocessing.get_context()
+    stop = context.Event()
+    results = context.Queue()
+    best_length = context.Value("i", 0)
+    # Island i sends its migrants on rings[i] and receives the ones of island i - 1 on rings[i - 1]
+    rings = [context.Queue() for _ in range(islands)]
+
+    processes = []
+    for i in range(islands):
+        settings = {
+            "truth_table": truth_table,
+            "base": base,
+            "num_qudits": num_qudits,
+            "output_indices": list(output_indices),
+            "pop_size": pop_size,
+            "generations": generations,
+            "mutation_rate": rates[i % len(rates)],
+            "crossover_rate": crossover_rate,
+            "elite_size": elite_size,
+            # A single island would migrate to itself
+            "migration_interval": migration_interval if islands > 1 else 0,
+            "migrants": migrants,
+            "target_length": target_length,
+            "seed": rng.randrange(2**63),
+            "grace_generations": grace_generations,
+            "patience": patience,
+            "time_limit": time_limit,
+            "verbose": verbose,
+        }
+        process = context.Process(target=_run_island, args=(i, settings, rings[i - 1], rings[i], results, stop,
+                                                                    best_length),
+                                  daemon=True)
+        process.start()
+        processes.append(process)
+
+    reports = []
+    try:
+        while len(reports) < islands:
+            try:
+                reports.append(results.get(timeout=1.0))
+            except queue.Empty:
+                if any(process.is_alive() for process in processes):
+                    continue
+                with contextlib.suppress(queue.Empty):
+                    while len(reports) < islands:
+                        reports.append(results.get_nowait())
+                if len(reports) < islands:
+                    raise RuntimeError("An island process exited without reporting its result.")
+    finally:
+        stop.set()
+        for process in processes:
+            process.join(timeout=5.0)
+            if process.is_alive():
+                process.terminate()
+
+    _, genome, _, _ = max(reports, key=lambda report: report[2])
+    util.rebuild_tables(base=base, num_qulines=num_qudits)
+    return _finish_genome(genome, num_qudits=num_qudits, base=base, output_indices=output_indices,
+                          restoring=restoring, return_ga=return_ga)
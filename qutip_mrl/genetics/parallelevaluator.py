@@ -0,0 +1,134 @@
+# parallelevaluator.py
+from __future__ import annotations
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import List, Optional
+
+import numpy as np
+
+from . import util
+from .circuitsolution import CircuitSolution
+from .populationevaluator import PopulationEvaluator
+
+# State of a worker process, set once by _init_worker
+_worker = {}
+
+
+def _init_worker(name: str, rows: int, width: int, output_indices, base: int, num_qulines: int):
+    """Attaches the truth table in shared memory and builds the worker's evaluator."""
+    util.rebuild_tables(base=base, num_qulines=num_qulines)
+    block = shared_memory.SharedMemory(name=name)
+    table = np.ndarray((rows, width + len(output_indices)), dtype=np.uint8, buffer=block.buf)
+    _worker["block"] = block  # keeps the mapping alive
+    _worker["evaluator"] = util.TruthTableEvaluator.from_arrays(table[:, :width], table[:, width:], output_indices)
+
+
+def _fitness_chunk(genomes: np.ndarray, lengths: np.ndarray) -> List[float]:
+    """Fitness of the genomes concatenated in `genomes` (one (ctrl, tgt, opcode) row per gene)."""
+    circuits = np.split(genomes, np.cumsum(lengths)[:-1])
+    return _worker["evaluator"].fitness_batch(circuits)
+
+
+class ParallelEvaluator(PopulationEvaluator):
+    """
+    jMetal evaluator distributing the evaluation of a population over a pool of worker processes.
+
+    The truth table is copied once into a shared memory block, from which every worker builds its own
+    util.TruthTableEvaluator when the pool starts. The genomes still to be simulated (fitness cache misses, see
+    QuantumCircuitProblem.evaluate_batch) are dealt into one chunk per worker, longest first so that the chunks get
+    similar amounts of work, and every chunk is sent as a single uint8 array of genes plus the genome lengths.
+    Workers simulate whole circuits: the simulation checkpoints of the sequential evaluator are not used, so a pool
+    only pays off when the truth table is large enough for the simulation to outweigh the inter-process transfers.
+
+    The pool is started at the first evaluation and kept for the following ones; call close() (or use the evaluator
+    as a context manager) to stop it and free the shared memory.
+    """
+
+    def __init__(self, workers: Optional[int] = None, batch_size: int = 0):
+        """
+        Initializes the evaluator.
+        :param workers: Number of worker processes (None for os.cpu_count()). With a single worker the population is
+            evaluated in this process, as by PopulationEvaluator.
+        :param batch_size: See PopulationEvaluator.
+        """
+        super().__init__(batch_size)
+        self.workers = int(workers) if workers is not None else (os.cpu_count() or 1)
+        self._pool = None
+        self._block = None
+        self._evaluator = None
+
+    def evaluate(self, solution_list: List[CircuitSolution], problem) -> List[CircuitSolution]:
+        """
+        Evaluates the fitness of every solution and stores it in its objectives.
+        :param solution_list: The solutions to evaluate.
+        :param problem: The problem, a QuantumCircuitProblem.
+        :return: The same list, with the objectives updated.
+        """
+        evaluate_batch = getattr(problem, "evaluate_batch", None)
+        if self.workers <= 1 or evaluate_batch is None or not len(problem.evaluator):
+            return super().evaluate(solution_list, problem)
+        self._start(problem.evaluator)
+        evaluate_batch(solution_list, fitness_batch=self.fitness_batch)
+        return solution_list
+
+    def fitness_batch(self, genomes) -> List[float]:
+        """
+        Fitness of many genomes, computed by the workers.
+        :param genomes: The genomes (see util.Genome).
+        :return: The fitness of every genome, equal to TruthTableEvaluator.fitness(genome).
+        """
+        if not genomes:
+            return []
+        order = sorted(range(len(genomes)), key=lambda i: -len(genomes[i]))
+        chunks = [order[w::self.workers] for w in range(self.workers)]
+        futures = []
+        for chunk in chunks:
+            if not chunk:
+                continue
+            parts = [np.asarray(genomes[i], dtype=np.uint8).reshape(-1, 3) for i in chunk]
+            lengths = np.array([len(part) for part in parts], dtype=np.int64)
+            futures.append((chunk, self._pool.submit(_fitness_chunk, np.concatenate(parts), lengths)))
+        out = [0.0] * len(genomes)
+        for chunk, future in futures:
+            for i, fit in zip(chunk, future.result()):
+                out[i] = fit
+        return out
+
+    def _start(self, evaluator: util.TruthTableEvaluator):
+        # One pool per truth table: restart it if the problem changed
+        if self._pool is not None and self._evaluator is evaluator:
+            return
+        self.close()
+        table = np.concatenate([evaluator.inputs, evaluator.expected], axis=1)
+        self._block = shared_memory.SharedMemory(create=True, size=max(1, table.nbytes))
+        np.ndarray(table.shape, dtype=np.uint8, buffer=self._block.buf)[:] = table
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_init_worker,
+            initargs=(self._block.name, table.shape[0], evaluator.inputs.shape[1], evaluator.output_indices,
+                      util.QUBASE, util.NUM_QULINES),
+        )
+        self._evaluator = evaluator
+
+    def close(self):
+        """Stops the worker processes and frees the shared memory block."""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+        if self._block is not None:
+            self._block.close()
+            self._block.unlink()
+            self._block = None
+        self._evaluator = None
+
+    def __enter__(self) -> "ParallelEvaluator":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __del__(self):
+        if hasattr(self, "_pool"):
+            self.close()
@@ -0,0 +1,52 @@
+# populationevaluator.py
+from __future__ import annotations
+
+from typing import List
+
+from jmetal.util.evaluator import Evaluator
+
+from .circuitsolution import CircuitSolution
+
+
+class PopulationEvaluator(Evaluator):
+    """
+    jMetal evaluator scoring a whole population in one vectorized sweep.
+
+    Instead of calling problem.evaluate once per solution, the solutions are handed to the problem's evaluate_batch
+    (see QuantumCircuitProblem), which simulates every (circuit, truth table row) pair at once, one gene position at
+    a time, each circuit from its last valid checkpoint. Problems without evaluate_batch are evaluated one solution
+    at a time.
+    """
+
+    def __init__(self, batch_size: int = 0):
+        """
+        Initializes the evaluator.
+        :param batch_size: Maximum number of circuits evaluated together (0 for the whole population). Smaller batches
+            use less memory and pad short circuits less when lengths vary a lot.
+        """
+        self.batch_size = batch_size
+
+    def evaluate(self, solution_list: List[CircuitSolution], problem) -> List[CircuitSolution]:
+        """
+        Evaluates the fitness of every solution and stores it in its objectives.
+        :param solution_list: The solutions to evaluate.
+        :param problem: The problem, a QuantumCircuitProblem.
+        :return: The same list, with the objectives updated.
+        """
+        evaluate_batch = getattr(problem, "evaluate_batch", None)
+        if evaluate_batch is None:
+            for solution in solution_list:
+                Evaluator.evaluate_solution(solution, problem)
+            return solution_list
+
+        # Similar lengths in a batch keep the padding small
+        order = sorted(range(len(solution_list)), key=lambda i: self._remaining(solution_list[i]))
+        step = self.batch_size if self.batch_size > 0 else max(1, len(order))
+        for start in range(0, len(order), step):
+            evaluate_batch([solution_list[i] for i in order[start:start + step]])
+        return solution_list
+
+    @staticmethod
+    def _remaining(solution: CircuitSolution) -> int:
+        # Genes left to simulate, at most: the ones after the valid prefix of the checkpoints
+        return len(solution.variables[0]) - solution.attributes.get("valid_prefix", 0)
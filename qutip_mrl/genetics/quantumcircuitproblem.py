@@ -26,16 +26,26 @@ class QuantumCircuitProblem(Problem):
         output_indices: Optional[List[int]] = None,
         min_genes: Optional[int] = None,
         max_genes: Optional[int] = None,
+        checkpoint_every: int = 8,
+        cache_size: int = 100_000,
     ):
         """Initialize the QuantumCircuitProblem with a given truth table, output indices, and gene length constraints.
         :param truth_table: A dictionary mapping complete input combinations (including target qubits initialized to 0) to their expected output combinations, used internally for synthesis.
         :param output_indices: An optional list of indices indicating which wires are treated as outputs for fitness evaluation. If None, defaults to the last qubit.
         :param min_genes: The minimum number of gates in the circuit. If None, defaults to util.MIN_GENES or 1.
         :param max_genes: The maximum number of gates in the circuit. If None, defaults to util.MAX_GENES or 60.
+        :param checkpoint_every: Interval, in genes, of the truth table states kept with every evaluated solution, from
+            which its mutants are re-evaluated (0 to always simulate whole circuits).
+        :param cache_size: Maximum number of genomes whose accuracy is memoized in fitness_cache (0 to disable it).
         """
         super().__init__()
         self.truth_table = truth_table
         self.output_indices = output_indices
+        # Vectorized fitness on the whole truth table, built once for all the evaluations
+        self.evaluator = util.TruthTableEvaluator(truth_table, output_indices)
+        self.checkpoint_every = int(checkpoint_every)
+        # Shared with the mutation operator and the local search (see genetic_synthesize)
+        self.fitness_cache = util.FitnessCache(cache_size)
 
         # Use limits from util if available; otherwise fall back.
         self.min_genes = int(min_genes if min_genes is not None else getattr(util, "MIN_GENES", 1))
@@ -73,8 +83,8 @@ class QuantumCircuitProblem(Problem):
     def create_solution(self) -> CircuitSolution:
         """
         Create a new random solution for the quantum circuit problem. The solution consists of a randomly 
-            generated circuit (a list of gates) with a length between min_genes and max_genes. The fitness 
-            is initialized to 0.0.
+            generated circuit (an integer-coded genome, see util.encode_circuit) with a length between min_genes and
+            max_genes. The fitness is initialized to 0.0.
         :return: A new CircuitSolution instance with a random circuit and initialized fitness.
         """
         sol = CircuitSolution()
@@ -82,7 +92,7 @@ class QuantumCircuitProblem(Problem):
         if self.max_genes > 0:
             length = util.random.randint(self.min_genes, self.max_genes) if hasattr(util, "random") else __import__("random").randint(self.min_genes, self.max_genes)
         # Build circuit
-        circ = [util.random_gate() for _ in range(length)]
+        circ = util.random_genome(length)
         sol.variables = [circ]
         sol.objectives = [0.0]
         sol.constraints = []
@@ -92,19 +102,74 @@ class QuantumCircuitProblem(Problem):
     def evaluate(self, solution: CircuitSolution) -> CircuitSolution:
         """
         Evaluate the fitness of a given solution by computing how well the circuit matches the expected outputs 
-            defined in the truth table. The fitness is calculated using util.fitness and stored in the solution's objectives.
+            defined in the truth table. The fitness is calculated by the problem's util.TruthTableEvaluator (same value
+            as util.fitness) and stored in the solution's objectives.
         :param solution: The CircuitSolution instance to be evaluated, containing a quantum circuit and its
             fitness value.
         :return: The same CircuitSolution instance with its fitness value updated based on the evaluation.
         """
-        circuit = solution.variables[0]
-        try:
-            fit = util.fitness(circuit, self.truth_table, output_indices=self.output_indices)
-        except TypeError:
-            # Backward-compatible util.fitness signature
-            fit = util.fitness(circuit, self.truth_table)
-        solution.objectives[0] = float(fit)
+        self.evaluate_batch([solution])
         return solution
 
+    def evaluate_batch(self, solutions: List[CircuitSolution], fitness_batch=None) -> List[CircuitSolution]:
+        """
+        Evaluate the fitness of many solutions in one vectorized sweep (see util.TruthTableEvaluator.fitness_batch).
+
+        Every evaluated solution keeps, in its attributes, the truth table states after every checkpoint_every genes
+        ("checkpoints") and the number of leading genes they are valid for ("valid_prefix"). The mutation and
+        crossover operators pass them on to their offspring (see CircuitSolution.inherit_checkpoints) and lower
+        valid_prefix to the first gene they change, so that an offspring is only simulated from the last checkpoint
+        before that gene: a point mutation costs the suffix of the circuit instead of the whole circuit.
+        Genomes found in fitness_cache (see util.FitnessCache) are not simulated at all.
+        :param solutions: The CircuitSolution instances to evaluate.
+        :param fitness_batch: Optional function computing the fitness of a list of genomes in place of the local
+            sweep, e.g. ParallelEvaluator.fitness_batch. The circuits are then simulated whole, without checkpoints.
+        :return: The same list, with the fitness values updated.
+        """
+        cache = self.fitness_cache
+        pending, keys = [], []
+        cache_keys = cache.keys([s.variables[0] for s in solutions]) if cache.maxsize > 0 else [None] * len(solutions)
+        for solution, key in zip(solutions, cache_keys):
+            circuit = solution.variables[0]
+            acc = cache.get(key) if key is not None else None
+            if acc is None:
+                pending.append(solution)
+                keys.append(key)
+            else:
+                # Checkpoints inherited from the parent stay as they are, valid for the unchanged prefix
+                solution.objectives[0] = util.fitness_of(acc, len(circuit))
+        if not pending:
+            return solutions
+
+        if fitness_batch is not None:
+            fits = fitness_batch([s.variables[0] for s in pending])
+            for solution in pending:
+                solution.attributes.pop("checkpoints", None)
+                solution.attributes.pop("valid_prefix", None)
+        elif self.checkpoint_every <= 0:
+            fits = self.evaluator.fitness_batch([s.variables[0] for s in pending])
+        else:
+            prefixes = []
+            for solution in pending:
+                checkpoints = solution.attributes.get("checkpoints") or {}
+                valid = min(solution.attributes.get("valid_prefix", 0), len(solution.variables[0]))
+                start = max((p for p in checkpoints if p <= valid), default=0)
+                prefixes.append((start, checkpoints[start]) if start else None)
+            fits, recorded = self.evaluator.fitness_batch([s.variables[0] for s in pending], prefixes,
+                                                          checkpoint_every=self.checkpoint_every)
+            for solution, prefix, new in zip(pending, prefixes, recorded):
+                # The checkpoints dict may be shared with the parent: build a new one
+                if prefix is not None:
+                    kept = solution.attributes["checkpoints"]
+                    new.update((p, states) for p, states in kept.items() if p <= prefix[0])
+                solution.attributes["checkpoints"] = new
+                solution.attributes["valid_prefix"] = len(solution.variables[0])
+
+        for solution, key, fit in zip(pending, keys, fits):
+            solution.objectives[0] = float(fit)
+            if key is not None:
+                cache.put(key, min(float(fit), 1.0))
+        return solutions
+
     def get_name(self) -> str:
         return self.name
@@ -3,7 +3,7 @@ from __future__ import annotations
 
 import random
 from copy import deepcopy
-from typing import List
+import numpy as np
 from .config import *
 
 from jmetal.operator.mutation import Mutation
@@ -12,12 +12,12 @@ from .circuitsolution import CircuitSolution
 from . import util
 
 
-Gate = util.Gate
+Genome = util.Genome
 
 
 class CircuitMutation(Mutation):
     """
-    Implements a safe mutation operator for quantum circuits represented as lists of gates.
+    Implements a safe mutation operator for quantum circuits represented as integer-coded genomes (see util.Genome).
     The mutation adapts its behavior based on the current fitness of the solution, allowing for more aggressive 
     mutations when the fitness is low and more conservative changes as the solution improves.
     The operator supports various mutation types, including adding, removing, changing, swapping, splitting gates, 
@@ -26,17 +26,21 @@ class CircuitMutation(Mutation):
     constraints and can optionally optimize the circuit if it is already correct.
     """
 
-    def __init__(self, mutation_probability: float = 0.1, truth_table=None, output_indices=None):
+    def __init__(self, mutation_probability: float = 0.1, truth_table=None, output_indices=None, fitness_cache=None):
         """
         Initializes the CircuitMutation operator with a given mutation probability, truth table, and output indices.
         :param mutation_probability: The base probability of performing mutation. This will be adapted based on fitness.
         :param truth_table: An optional truth table used to evaluate the correctness of the circuit and enable optimization mutations.
         :param output_indices: The indices of the qulines that are considered outputs for fitness evaluation. Defaults to the last quline if not provided.  
+        :param fitness_cache: An optional util.FitnessCache of the same truth table (e.g. the problem's fitness_cache),
+            consulted before simulating a circuit.
         """        
         super().__init__(mutation_probability)
         self.mutation_probability = mutation_probability
         self.truth_table = truth_table
         self.output_indices = tuple(output_indices) if output_indices is not None else (util.NUM_QULINES - 1,)
+        self.evaluator = util.TruthTableEvaluator(truth_table, self.output_indices) if truth_table is not None else None
+        self.fitness_cache = fitness_cache
 
     def execute(self, solution):
         """
@@ -50,6 +54,8 @@ class CircuitMutation(Mutation):
         new_solution.objectives = [None]
         new_solution.constraints = []
         new_solution.attributes = {}
+        # Genes before the first mutated one are unchanged: their simulation checkpoints stay valid
+        new_solution.inherit_checkpoints(solution, len(solution.variables[0]))
 
         fitness_val = solution.objectives[0] if solution.objectives[0] is not None else 0.0
         adaptive_rate = self.mutation_probability * (1.0 - fitness_val * 0.5)
@@ -57,7 +63,7 @@ class CircuitMutation(Mutation):
         if random.random() >= adaptive_rate:
             return new_solution
 
-        circuit: List[Gate] = new_solution.variables[0]
+        circuit: Genome = new_solution.variables[0]
 
         mutation_types = []
         if len(circuit) < MAX_GENES:
@@ -76,29 +82,35 @@ class CircuitMutation(Mutation):
 
         if mtype == "add":
             pos = random.randint(0, len(circuit))
-            circuit.insert(pos, util.random_gate())
+            new_solution.variables[0] = np.insert(circuit, pos, util.random_gene(), axis=0)
+            new_solution.invalidate_from(pos)
 
         elif mtype == "remove":
             idx = random.randint(0, len(circuit) - 1)
-            del circuit[idx]
+            new_solution.variables[0] = np.delete(circuit, idx, axis=0)
+            new_solution.invalidate_from(idx)
 
         elif mtype == "change":
             idx = random.randint(0, len(circuit) - 1)
-            circuit[idx] = util.random_gate()
+            circuit[idx] = util.random_gene()
+            new_solution.invalidate_from(idx)
 
         elif mtype == "swap":
             if len(circuit) > 1:
                 i, j = random.sample(range(len(circuit)), 2)
-                circuit[i], circuit[j] = circuit[j], circuit[i]
+                circuit[[i, j]] = circuit[[j, i]]
+                new_solution.invalidate_from(min(i, j))
 
         elif mtype == "split":
             if len(circuit) > 2:
                 start = random.randint(0, len(circuit) - 2)
                 end = random.randint(start + 1, len(circuit) - 1)
-                new_solution.variables[0] = circuit[start:end]
+                new_solution.variables[0] = circuit[start:end].copy()
+                new_solution.invalidate_from(end if start == 0 else 0)
 
         elif mtype == "optimize":
-            new_solution.variables[0] = util.simplify_circuit(circuit)
+            new_solution.variables[0] = util.simplify_genome(circuit)
+            new_solution.invalidate_from(0)
 
         return new_solution
 
@@ -106,9 +118,17 @@ class CircuitMutation(Mutation):
         """Returns the name of the mutation operator."""
         return "CircuitMutation"
 
-    def is_circuit_correct(self, circuit: List[Gate]) -> bool:
+    def is_circuit_correct(self, circuit: Genome) -> bool:
         """Checks if the given circuit is correct based on the provided truth table and output indices."""
-        if self.truth_table is None:
+        if self.evaluator is None:
             return False
-        
-        return util.fitness(circuit, self.truth_table, output_indices=self.output_indices) >= 1.0
+
+        cache = self.fitness_cache
+        if cache is None or cache.maxsize <= 0:
+            return self.evaluator.accuracy(circuit) >= 1.0
+        key = cache.key(circuit)
+        acc = cache.get(key)
+        if acc is None:
+            acc = self.evaluator.accuracy(circuit)
+            cache.put(key, acc)
+        return acc >= 1.0
@@ -0,0 +1,142 @@
+# telemetry.py
+from __future__ import annotations
+
+import json
+from collections import deque
+from typing import Callable, Iterable, List, Optional
+
+
+class RingBufferSink:
+    """
+    Keeps the last `maxlen` telemetry records in memory.
+    """
+
+    def __init__(self, maxlen: int = 1000):
+        """
+        :param maxlen: The maximum number of records kept (the oldest ones are dropped first).
+        """
+        self.records = deque(maxlen=maxlen)
+
+    def __call__(self, record: dict) -> None:
+        self.records.append(record)
+
+    def __iter__(self):
+        return iter(self.records)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+
+class JsonlSink:
+    """
+    Appends every telemetry record to a file, one JSON object per line.
+    """
+
+    def __init__(self, path, flush: bool = False):
+        """
+        :param path: The file path (opened in append mode).
+        :param flush: If True, flush the file after every record, so that it can be followed while the run goes on.
+        """
+        self.file = open(path, "a", encoding="utf-8")
+        self.flush = flush
+
+    def __call__(self, record: dict) -> None:
+        self.file.write(json.dumps(record) + "\n")
+        if self.flush:
+            self.file.flush()
+
+    def close(self) -> None:
+        self.file.close()
+
+
+class CallbackSink:
+    """
+    Passes every telemetry record to a function.
+    """
+
+    def __init__(self, callback: Callable[[dict], None]):
+        """
+        :param callback: The function, called with the record dict.
+        """
+        self.callback = callback
+
+    def __call__(self, record: dict) -> None:
+        self.callback(record)
+
+
+class PrintSink:
+    """
+    Prints the progress of a run in human-readable form: new best fitness values, local search results, and the
+    generation statistics every `every` generations.
+    """
+
+    def __init__(self, every: int = 50, prefix: str = ""):
+        """
+        :param every: The interval, in generations, of the printed generation statistics.
+        :param prefix: Text printed at the start of every line (e.g. the name of an island).
+        """
+        self.every = every
+        self.prefix = prefix
+
+    def __call__(self, record: dict) -> None:
+        event = record["event"]
+        if event == "new_best":
+            print(f"{self.prefix}NEW BEST FITNESS: {record['best_fitness']:.6f} at generation {record['generation']}")
+        elif event == "local_search":
+            if record["improved"]:
+                print(f"{self.prefix}Local search improvement: {record['fitness']:.6f}")
+        elif event == "generation" and self.every > 0 and record["generation"] % self.every == 0:
+            print(f"{self.prefix}Gen {record['generation']:3d}: Best={record['best_fitness']:.4f}, "
+                  f"Avg={record['avg_fitness']:.4f}, Diversity={record['diversity']:.3f}, "
+                  f"Evals/s={record['evals_per_sec']:.0f}")
+
+
+class Telemetry:
+    """
+    Structured progress records of a GA run (see ElitistGeneticAlgorithm), passed to a list of sinks: any callable
+    taking the record dict, such as RingBufferSink, JsonlSink, CallbackSink or PrintSink.
+
+    Every record is a dict with an "event" key:
+    - "generation", every `interval` generations: generation, evaluations, evals_per_sec (since the previous
+      generation record), generation_time (seconds per generation since then), best_fitness, avg_fitness (of the
+      population), diversity, length_histogram ({genome length: count}), cache_hit_rate (None without a fitness
+      cache) and cache_size;
+    - "new_best": generation and best_fitness, when the best fitness improves;
+    - "local_search": generation, improved and fitness (the fitness after the local search);
+    - "diversity_injection": generation and injected (the number of new random solutions).
+    Without sinks nothing is computed, so a silent run costs nothing.
+    """
+
+    def __init__(self, sinks: Iterable[Callable[[dict], None]] = (), interval: int = 1):
+        """
+        :param sinks: The sinks receiving the records.
+        :param interval: The interval, in generations, of the "generation" records.
+        """
+        self.sinks: List[Callable[[dict], None]] = list(sinks)
+        self.interval = max(1, int(interval))
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.sinks)
+
+    def emit(self, event: str, **fields) -> None:
+        """Sends a record to all the sinks."""
+        if not self.sinks:
+            return
+        record = {"event": event, **fields}
+        for sink in self.sinks:
+            sink(record)
+
+    def close(self) -> None:
+        """Closes the sinks that hold resources (e.g. JsonlSink files)."""
+        for sink in self.sinks:
+            close = getattr(sink, "close", None)
+            if close is not None:
+                close()
+
+
+def as_telemetry(telemetry: Optional[Telemetry | Callable[[dict], None]]) -> Optional[Telemetry]:
+    """A Telemetry for a Telemetry, a single sink, or None."""
+    if telemetry is None or isinstance(telemetry, Telemetry):
+        return telemetry
+    return Telemetry([telemetry])
@@ -2,7 +2,9 @@
 from __future__ import annotations
 from .config import QUBASE, NUM_QULINES
 from typing import Dict, Tuple, List, Iterable, Optional
+from collections import OrderedDict
 import random
+import numpy as np
 
 
 CONTROL_VALUE: int = 2   # default control firing value (d-1)
@@ -12,6 +14,17 @@ GATE_TYPES: List[str] = []
 MERGE_PATTERNS: Dict[Tuple[str, str], str] = {}
 Gate = Tuple[int, int, str]
 
+# Integer-coded genes. A genome is a (K, 3) uint8 array with one (ctrl, tgt, opcode) row per gene, the opcode being
+# the index of the gate type in GATE_TYPES. The tables below are indexed by opcode and rebuilt by rebuild_tables().
+Genome = np.ndarray
+GENE_OPCODES: Dict[str, int] = {}  # gate type -> opcode
+GENE_KEYS: List[str] = []  # opcode -> QSG_TABLE key
+GENE_CONTROLLED = np.zeros(0, dtype=bool)  # opcode -> controlled gate
+GENE_PERMS = np.zeros((0, 0), dtype=np.uint8)  # opcode -> permutation of the target
+GENE_INVERSE = np.zeros(0, dtype=np.uint8)  # opcode -> opcode of the inverse gate
+GENE_COMPOSE = np.zeros((0, 0), dtype=np.int16)  # (first, second) -> opcode of the product, -1 for different families
+GENE_IDENTITY = np.zeros(0, dtype=bool)  # opcode -> identity gate
+
 
 def _gate_table_base3() -> Dict[str, List[int]]:
     """
@@ -68,8 +81,8 @@ def rebuild_tables(*, base: Optional[int] = None, num_qulines: Optional[int] = N
         base: The qudit base (e.g., 3 for qutrits, 4 for ququarts). If None, keeps the current base.
         num_qulines: The number of qudit lines in the circuit. If None, keeps the current number.
     """
-    global GATE_TYPES, QSG_TABLE
-    
+    global GATE_TYPES, QSG_TABLE, QUBASE, NUM_QULINES, CONTROL_VALUE, CONTROL_PREFIX, MERGE_PATTERNS
+
     if base is not None:
         if base not in (3, 4):
             raise ValueError(f"Unsupported base={base}. Only 3 or 4 are supported.")
@@ -94,6 +107,78 @@ def rebuild_tables(*, base: Optional[int] = None, num_qulines: Optional[int] = N
         GATE_TYPES.append(f"{CONTROL_PREFIX}{k}")
 
     MERGE_PATTERNS = _generate_merge_patterns()
+    _build_gene_tables()
+
+
+def _build_gene_tables() -> None:
+    """
+    Build the opcode tables of the integer-coded genes from GATE_TYPES and QSG_TABLE.
+    """
+    global GENE_OPCODES, GENE_KEYS, GENE_CONTROLLED, GENE_PERMS, GENE_INVERSE, GENE_COMPOSE, GENE_IDENTITY
+
+    GENE_OPCODES = {gtype: op for op, gtype in enumerate(GATE_TYPES)}
+    GENE_CONTROLLED = np.array([gtype.startswith(CONTROL_PREFIX) for gtype in GATE_TYPES], dtype=bool)
+    GENE_KEYS = [gtype[len(CONTROL_PREFIX):] if controlled else gtype[1:]
+                 for gtype, controlled in zip(GATE_TYPES, GENE_CONTROLLED)]
+    GENE_PERMS = np.array([QSG_TABLE[key] for key in GENE_KEYS], dtype=np.uint8).reshape(len(GATE_TYPES), QUBASE)
+    GENE_IDENTITY = np.all(GENE_PERMS == np.arange(QUBASE, dtype=np.uint8), axis=1)
+
+    # Same family and permutation -> opcode
+    opcode_of = {(bool(GENE_CONTROLLED[op]), tuple(GENE_PERMS[op].tolist())): op for op in range(len(GATE_TYPES))}
+    GENE_INVERSE = np.zeros(len(GATE_TYPES), dtype=np.uint8)
+    GENE_COMPOSE = np.full((len(GATE_TYPES), len(GATE_TYPES)), -1, dtype=np.int16)
+    for op, perm in enumerate(GENE_PERMS.tolist()):
+        family = bool(GENE_CONTROLLED[op])
+        inverse = [0] * QUBASE
+        for i, v in enumerate(perm):
+            inverse[v] = i
+        GENE_INVERSE[op] = opcode_of[(family, tuple(inverse))]
+        for op2, perm2 in enumerate(GENE_PERMS.tolist()):
+            if bool(GENE_CONTROLLED[op2]) == family:
+                GENE_COMPOSE[op, op2] = opcode_of[(family, tuple(perm2[v] for v in perm))]  # op then op2
+
+
+def random_gene() -> Tuple[int, int, int]:
+    """
+    Generate a random integer-coded gene (ctrl, tgt, opcode), drawn like random_gate().
+    """
+    op = random.randrange(len(GATE_TYPES))
+    if GENE_CONTROLLED[op]:
+        ctrl = random.randint(0, NUM_QULINES - 1)
+        tgt = random.choice([i for i in range(NUM_QULINES) if i != ctrl])
+        return (ctrl, tgt, op)
+    t = random.randint(0, NUM_QULINES - 1)
+    return (t, t, op)
+
+
+def random_genome(length: int) -> Genome:
+    """
+    Generate a random genome of the given number of genes.
+    """
+    return np.array([random_gene() for _ in range(length)], dtype=np.uint8).reshape(length, 3)
+
+
+def encode_circuit(circuit: List[Gate]) -> Genome:
+    """
+    Convert a circuit given as (ctrl, tgt, gtype) tuples into a genome.
+    :param circuit: A list of gates, whose gate types must be in GATE_TYPES.
+    :return: The (K, 3) uint8 array of the (ctrl, tgt, opcode) genes.
+    """
+    genome = np.empty((len(circuit), 3), dtype=np.uint8)
+    for i, (ctrl, tgt, gtype) in enumerate(circuit):
+        op = GENE_OPCODES.get(gtype)
+        if op is None:
+            raise ValueError(f"Unsupported gate type: {gtype}")
+        genome[i] = (ctrl, tgt, op)
+    return genome
+
+
+def decode_circuit(genome: Genome) -> List[Gate]:
+    """
+    Convert a genome into a list of (ctrl, tgt, gtype) tuples, the string form used outside of the GA.
+    """
+    return [(ctrl, tgt, GATE_TYPES[op]) for ctrl, tgt, op in np.asarray(genome).tolist()]
+
 
 def random_gate() -> Gate:
     """
@@ -103,13 +188,8 @@ def random_gate() -> Gate:
     - tgt: the target quline index (for controlled gates) or the same as ctrl for single-qudit gates
     - gtype: the type of gate, which can be a single-qudit gate (e.g., "Z+1") or a controlled gate (e.g., "C2Z+1")
     """    
-    gtype = random.choice(GATE_TYPES)
-    if gtype.startswith("C"):
-        ctrl = random.randint(0, NUM_QULINES - 1)
-        tgt = random.choice([i for i in range(NUM_QULINES) if i != ctrl])
-        return (ctrl, tgt, gtype)
-    t = random.randint(0, NUM_QULINES - 1)
-    return (t, t, gtype)
+    ctrl, tgt, op = random_gene()
+    return (ctrl, tgt, GATE_TYPES[op])
 
 
 def apply_gate(state: Tuple[int, ...], gate: Gate) -> Tuple[int, ...]:
@@ -178,35 +258,324 @@ def simulate_circuit(circuit: List[Gate], input_state: Tuple[int, ...]) -> Tuple
     return state
 
 
+class TruthTableEvaluator:
+    """
+    Vectorized fitness of circuits on a fixed truth table.
+
+    The inputs of the truth table are held as an (N, n) uint8 array (one row per input combination), and the
+    expected values of the output wires as an (N, len(output_indices)) array. A circuit is simulated on all the
+    rows at once: every gene is a lookup-table gather on its target column, restricted to the rows whose control
+    column holds the control value. The accuracy is then a single comparison of the output columns.
+
+    Circuits are either genomes (see encode_circuit) or lists of (ctrl, tgt, gtype) gates. The gate tables
+    (GATE_TYPES, QSG_TABLE, CONTROL_VALUE) are read when the evaluator is created, so it must be created after
+    rebuild_tables().
+    """
+
+    def __init__(self, truth_table: Dict[Tuple[int, ...], Tuple[int, ...]], output_indices: Optional[Iterable[int]] = None):
+        """
+        :param truth_table: A dictionary mapping input combinations to their expected output combinations.
+        :param output_indices: The indices of the wires compared with the expected outputs. Defaults to the last wire.
+        """
+        rows = list(truth_table.items())
+        width = len(rows[0][0]) if rows else 0
+        self.output_indices = tuple(output_indices) if output_indices is not None else (width - 1,)
+        self.inputs = np.array([inp for inp, _ in rows], dtype=np.uint8).reshape(len(rows), width)
+        self.expected = np.array([[expected[j] for j in self.output_indices] for _, expected in rows], dtype=np.uint8)
+        self.expected = self.expected.reshape(len(rows), len(self.output_indices))
+        self._build_tables()
+
+    @classmethod
+    def from_arrays(cls, inputs: np.ndarray, expected: np.ndarray, output_indices: Iterable[int]) -> "TruthTableEvaluator":
+        """
+        Evaluator of a truth table already held as arrays (e.g. in shared memory, see ParallelEvaluator).
+        :param inputs: The (N, n) uint8 array of the input rows.
+        :param expected: The (N, len(output_indices)) uint8 array of the expected values of the output wires.
+        :param output_indices: The indices of the wires compared with the expected outputs.
+        """
+        self = cls.__new__(cls)
+        self.output_indices = tuple(output_indices)
+        self.inputs = inputs
+        self.expected = expected
+        self._build_tables()
+        return self
+
+    def _build_tables(self):
+        # Simulation works on one contiguous array per wire
+        self._columns = np.ascontiguousarray(self.inputs.T)
+        # gtype -> (lookup table, control value or None), in opcode order so that genomes index it directly
+        self._genes = {}
+        for op, gtype in enumerate(GATE_TYPES):
+            self._genes[gtype] = (GENE_PERMS[op], CONTROL_VALUE if GENE_CONTROLLED[op] else None)
+        if QUBASE == 3:
+            # backward-compat labels, as in apply_gate
+            for key, perm in QSG_TABLE.items():
+                self._genes.setdefault(f"C2Z{key}", (GENE_PERMS[GENE_OPCODES[f"Z{key}"]], 2))
+                self._genes.setdefault(f"C3Z{key}", (GENE_PERMS[GENE_OPCODES[f"Z{key}"]], 3))
+        self._gene_list = list(self._genes.values())
+        # Opcode table of fitness_batch: transitions[op, c, t] is the new target value of gene `op` when its control
+        # holds c and its target t (flattened, indexed by (op * d + c) * d + t)
+        self._opcodes = {gtype: code for code, gtype in enumerate(self._genes)}
+        d = QUBASE
+        transitions = np.empty((len(self._genes), d, d), dtype=np.uint8)
+        for code, (lut, control_value) in enumerate(self._genes.values()):
+            transitions[code] = lut[np.newaxis, :]
+            if control_value is not None:
+                for c in range(d):
+                    if c != control_value:
+                        transitions[code, c] = np.arange(d)
+        self._transitions = transitions.reshape(-1)
+        self._controlled = np.array([value is not None for _, value in self._genes.values()])
+
+    def __len__(self) -> int:
+        return self.inputs.shape[0]
+
+    def _encode(self, circuit):
+        # (ctrls, tgts, opcodes) lists of a genome or of a list of gates
+        if isinstance(circuit, np.ndarray):
+            return circuit[:, 0].tolist(), circuit[:, 1].tolist(), circuit[:, 2].tolist()
+        try:
+            ops = [self._opcodes[gtype] for _, _, gtype in circuit]
+        except KeyError as error:
+            raise ValueError(f"Unsupported gate type: {error.args[0]}") from None
+        return [ctrl for ctrl, _, _ in circuit], [tgt for _, tgt, _ in circuit], ops
+
+    def simulate(self, circuit) -> np.ndarray:
+        """
+        Simulate a circuit on every input of the truth table.
+        :param circuit: A genome or a list of gates (ctrl, tgt, gtype).
+        :return: The (N, n) array of the output states, row i being the output of input row i.
+        """
+        return self._run(circuit).T
+
+    def _run(self, circuit) -> np.ndarray:
+        columns = self._columns.copy()
+        for ctrl, tgt, op in zip(*self._encode(circuit)):
+            lut, control_value = self._gene_list[op]
+            if control_value is None:
+                columns[tgt] = lut[columns[tgt]]
+            else:
+                columns[tgt] = np.where(columns[ctrl] == control_value, lut[columns[tgt]], columns[tgt])
+        return columns
+
+    def accuracy(self, circuit) -> float:
+        """Fraction of the truth table rows whose output wires match the expected values."""
+        if not len(self):
+            return 0.0
+        outputs = self._run(circuit)[list(self.output_indices)].T
+        return float(np.count_nonzero(np.all(outputs == self.expected, axis=1))) / len(self)
+
+    def fitness(self, circuit) -> float:
+        """
+        Same value as util.fitness: the accuracy, or 1 + 1/len(circuit) when the circuit is correct.
+        """
+        if not len(self):
+            return 0.0
+        acc = self.accuracy(circuit)
+        if acc < 1.0:
+            return acc
+        return 1.0 + (1.0 / max(1, len(circuit)))
+
+    __call__ = fitness
+
+    def fitness_batch(self, circuits, prefixes=None, checkpoint_every: int = 0):
+        """
+        Fitness of many circuits, evaluated together.
+
+        The circuits are packed into opcode, control and target arrays (one row per circuit, longest first), and the
+        (circuit, truth table row) states of all the circuits still running are advanced one gene position at a
+        time: every step is a single gather in a (gene, control value, target value) transition table.
+        A circuit whose first genes did not change since an earlier evaluation (e.g. after a point mutation) can
+        resume from a checkpoint of that evaluation: only its remaining genes are simulated.
+        :param circuits: The circuits, genomes or lists of gates (ctrl, tgt, gtype).
+        :param prefixes: Optional, one (position, states) pair per circuit (or None to start from the inputs): states
+            is the (wires, rows) array of the truth table row states after the first `position` genes of the circuit,
+            as recorded with checkpoint_every.
+        :param checkpoint_every: If > 0, the row states after every multiple of this many genes are recorded too.
+        :return: The fitness of every circuit, equal to fitness(circuit). If checkpoint_every > 0, (fitnesses,
+            checkpoints) where checkpoints[i] maps the gene positions after the starting one to the row states.
+        """
+        if not circuits:
+            return ([], []) if checkpoint_every > 0 else []
+        if not len(self):
+            out = [0.0] * len(circuits)
+            return (out, [{} for _ in circuits]) if checkpoint_every > 0 else out
+        d = QUBASE
+        width = self._columns.shape[0]
+        starts = [0] * len(circuits)
+        if prefixes is not None:
+            starts = [0 if prefix is None else prefix[0] for prefix in prefixes]
+        # Every circuit only runs its genes after its starting position: sort them by remaining length
+        order = sorted(range(len(circuits)), key=lambda i: starts[i] - len(circuits[i]))
+        lengths = [len(circuits[i]) - starts[i] for i in order]
+        size, longest = len(order), lengths[0]
+        ops = np.zeros((size, longest), dtype=np.intp)
+        ctrls = np.zeros((size, longest), dtype=np.intp)
+        tgts = np.zeros((size, longest), dtype=np.intp)
+        # States of all the circuits, one row of N values per (circuit, wire)
+        states = np.tile(self._columns, (size, 1))
+        for p, i in enumerate(order):
+            if starts[i]:
+                states[p * width:(p + 1) * width] = prefixes[i][1]
+            if not lengths[p]:
+                continue
+            circuit = circuits[i][starts[i]:]
+            if isinstance(circuit, np.ndarray):
+                ctrls[p, :len(circuit)], tgts[p, :len(circuit)], ops[p, :len(circuit)] = circuit.T
+            else:
+                ctrls[p, :len(circuit)], tgts[p, :len(circuit)], ops[p, :len(circuit)] = self._encode(circuit)
+        # The control of single-qudit genes is not read by their transitions, but it must be a valid wire
+        ctrls = np.where(self._controlled[ops], ctrls, tgts)
+        offsets = ops * (d * d)
+        wires = np.arange(size) * width
+        ctrls += wires[:, np.newaxis]
+        tgts += wires[:, np.newaxis]
+
+        checkpoints = [{} for _ in range(size)]
+        positions = np.array([starts[i] for i in order]) + 1  # gene positions reached after the first step
+        running = size
+        for k in range(longest):
+            while lengths[running - 1] <= k:
+                running -= 1
+            tgt = tgts[:running, k]
+            index = states[ctrls[:running, k]].astype(np.intp) * d
+            index += states[tgt]
+            index += offsets[:running, k, np.newaxis]
+            states[tgt] = self._transitions[index]
+            if checkpoint_every > 0:
+                for p in np.flatnonzero((positions[:running] + k) % checkpoint_every == 0):
+                    checkpoints[p][int(positions[p]) + k] = states[p * width:(p + 1) * width].copy()
+
+        outputs = states.reshape(size, width, -1)[:, list(self.output_indices)]
+        correct = np.count_nonzero(np.all(outputs == self.expected.T[np.newaxis], axis=1), axis=1)
+        out = [0.0] * size
+        recorded = [None] * size
+        for p, i in enumerate(order):
+            acc = float(correct[p]) / len(self)
+            out[i] = acc if acc < 1.0 else 1.0 + (1.0 / max(1, len(circuits[i])))
+            recorded[i] = checkpoints[p]
+        if checkpoint_every > 0:
+            return out, recorded
+        return out
+
+
+class FitnessCache:
+    """
+    Bounded memo of the accuracy of already evaluated genomes, shared by the problem, the mutation operator and the
+    local search of a GA run (elites survive across generations and local search revisits identical neighbors).
+
+    Genomes are keyed by a canonical form: single-wire genes get ctrl = tgt and identity genes are dropped, which
+    does not change the simulated function; with canonical=True the genomes are fully simplified (see
+    simplify_genome), which finds more hits but costs about as much as a batched evaluation. The accuracy is
+    stored rather than the fitness, which also depends on the length of the genome (see fitness_of).
+    The least recently used entries are evicted beyond maxsize.
+    """
+
+    def __init__(self, maxsize: int = 100_000, canonical: bool = False):
+        """
+        :param maxsize: Maximum number of genomes kept (0 disables the cache).
+        :param canonical: If True, key the genomes by their simplified form.
+        """
+        self.maxsize = int(maxsize)
+        self.canonical = canonical
+        self._entries: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def key(self, genome) -> bytes:
+        """Canonical key of a genome (or list of gates)."""
+        return self.keys([genome])[0]
+
+    def keys(self, genomes) -> List[bytes]:
+        """Canonical keys of many genomes (or lists of gates), computed together."""
+        genomes = [g if isinstance(g, np.ndarray) else encode_circuit(g) for g in genomes]
+        if self.canonical:
+            return [np.ascontiguousarray(simplify_genome(g), dtype=np.uint8).tobytes() for g in genomes]
+        if not genomes:
+            return []
+        flat = np.concatenate([np.asarray(g, dtype=np.uint8).reshape(-1, 3) for g in genomes])
+        keep = ~GENE_IDENTITY[flat[:, 2]]
+        free = ~GENE_CONTROLLED[flat[:, 2]]
+        flat[free, 0] = flat[free, 1]
+        # Genome boundaries in the flat array once the identity genes are dropped
+        kept = np.concatenate([[0], np.cumsum(keep)])
+        ends = kept[np.cumsum([len(g) for g in genomes])]
+        return [part.tobytes() for part in np.split(flat[keep], ends[:-1])]
+
+    def get(self, key: bytes) -> Optional[float]:
+        """Cached accuracy of a key, or None (counted as a miss)."""
+        acc = self._entries.get(key)
+        if acc is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return acc
+
+    def put(self, key: bytes, accuracy: float) -> None:
+        """Stores the accuracy of a key, evicting the least recently used entries beyond maxsize."""
+        if self.maxsize <= 0:
+            return
+        self._entries[key] = accuracy
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        """Drops all the entries and resets the counters."""
+        self._entries.clear()
+        self.hits = self.misses = self.evictions = 0
+
+    def items(self) -> List[Tuple[bytes, float]]:
+        """The (key, accuracy) entries, least recently used first."""
+        return list(self._entries.items())
+
+    def load(self, entries, hits: int = 0, misses: int = 0, evictions: int = 0) -> None:
+        """
+        Replaces the contents and the counters of the cache, e.g. with the items() of a saved cache.
+        :param entries: (key, accuracy) pairs, least recently used first (the last maxsize ones are kept).
+        :param hits: The number of hits.
+        :param misses: The number of misses.
+        :param evictions: The number of evictions.
+        """
+        self._entries.clear()
+        for key, accuracy in entries:
+            self.put(key, accuracy)
+        self.hits, self.misses, self.evictions = hits, misses, evictions
+
+    @property
+    def hit_rate(self) -> float:
+        """Fraction of the lookups answered from the cache."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self) -> Dict[str, float]:
+        """Counters of the cache: size, hits, misses, evictions and hit_rate."""
+        return {"size": len(self), "hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                "hit_rate": self.hit_rate}
+
+
+def fitness_of(accuracy: float, length: int) -> float:
+    """Fitness of a circuit of the given accuracy and length: the accuracy, or 1 + 1/length when it is correct."""
+    if accuracy < 1.0:
+        return accuracy
+    return 1.0 + (1.0 / max(1, length))
+
 def fitness(circuit: List[Gate], truth_table: Dict[Tuple[int, ...], Tuple[int, ...]], *, output_indices: Iterable[int]) -> float:
     """
     Accuracy-only fitness on specified output indices (do not-care: any missing inputs are ignored).
+    The circuit is simulated on all the rows of the truth table at once (see TruthTableEvaluator); to evaluate
+    many circuits on the same truth table, create the evaluator once instead.
     Returns:
       < 1.0 : accuracy
       >=1.0 : 1 + 1/len(circuit)  (bonus for shorter) when perfect
     """
-    correct = 0
-    total = 0
-    out_idx = tuple(output_indices)
-
-    for inp, expected in truth_table.items():
-        total += 1
-        out = simulate_circuit(circuit, inp)
-        ok = True
-        for j in out_idx:
-            if out[j] != expected[j]:
-                ok = False
-                break
-        if ok:
-            correct += 1
-
-    if total == 0:
-        return 0.0
-
-    acc = correct / total
-    if acc < 1.0:
-        return acc
-    return 1.0 + (1.0 / max(1, len(circuit)))
+    return TruthTableEvaluator(truth_table, output_indices).fitness(circuit)
 
 def normalize_gate(g: Gate) -> Gate:
     """
@@ -249,16 +618,11 @@ def _invert_gate(g: Gate) -> Gate:
     inverse permutation while keeping the control and target indices the same.
     """
     ctrl, tgt, gtype = g
-    if gtype.startswith("Z") and not gtype.startswith("C"):
-        inv_key = _inverse_perm_key(gtype[1:])
-        return (tgt, tgt, f"Z{inv_key}")
-    if gtype.startswith(CONTROL_PREFIX):
-        inv_key = _inverse_perm_key(gtype[len(CONTROL_PREFIX):])
-        return (ctrl, tgt, f"{CONTROL_PREFIX}{inv_key}")
-    if gtype.startswith("C2Z") and QUBASE == 3:
-        inv_key = _inverse_perm_key(gtype[3:])
-        return (ctrl, tgt, f"C2Z{inv_key}")
-    return g
+    op = GENE_OPCODES.get(gtype)
+    if op is None:
+        return g
+    inverse = int(GENE_INVERSE[op])
+    return (ctrl if GENE_CONTROLLED[op] else tgt, tgt, GATE_TYPES[inverse])
 
 
 def _generate_merge_patterns() -> Dict[Tuple[str, str], str]:
@@ -289,75 +653,99 @@ def _generate_merge_patterns() -> Dict[Tuple[str, str], str]:
     return patterns
 
 
-def simplify_circuit(circ: List[Gate]) -> List[Gate]:
+def simplify_genome(genome: Genome) -> Genome:
     """
-    Deterministic cleanup:
-      1) normalize single-wire Z gates to (t,t,'Z..')
-      2) repeatedly merge adjacent compatible gates on identical (ctrl,tgt) (Z or controlled) using MERGE_PATTERNS
-      3) cancel adjacent inverse pairs on identical (ctrl,tgt) within the same family (Z vs controlled)
-      4) drop identity gates (Z+0 / C..+0)
+    Deterministic cleanup of a genome, done on opcodes with the GENE_COMPOSE and GENE_IDENTITY tables:
+      1) normalize single-wire genes to (t, t, op)
+      2) repeatedly merge adjacent genes of the same family on identical (ctrl, tgt) into their product
+      3) drop identity genes (Z+0 / C..+0)
+    Adjacent inverse pairs merge into an identity gene, which is then dropped.
     """
-    circ = normalize_circuit(circ)
-
-    def is_identity_gtype(gtype: str) -> bool:
-        if gtype.startswith("Z") and not gtype.startswith("C"):
-            return gtype[1:] == "+0"
-        if gtype.startswith(CONTROL_PREFIX):
-            return gtype[len(CONTROL_PREFIX):] == "+0"
-        if gtype.startswith("C2Z") and QUBASE == 3:
-            return gtype[3:] == "+0"
-        return False
+    controlled = GENE_CONTROLLED.tolist()
+    identity = GENE_IDENTITY.tolist()
+    compose = GENE_COMPOSE.tolist()
+    genes = [(ctrl if controlled[op] else tgt, tgt, op) for ctrl, tgt, op in np.asarray(genome).tolist()]
 
     changed = True
     while changed:
         changed = False
-        out: List[Gate] = []
+        out: List[Tuple[int, int, int]] = []
         i = 0
-        while i < len(circ):
-            g = circ[i]
+        while i < len(genes):
+            g = genes[i]
 
             # identity drop
-            if is_identity_gtype(g[2]):
+            if identity[g[2]]:
                 changed = True
                 i += 1
                 continue
 
             # merge runs on same wires
-            if i + 1 < len(circ):
-                g2 = circ[i + 1]
-                if g[:2] == g2[:2]:
-                    key = (g[2], g2[2])
-                    if key in MERGE_PATTERNS:
-                        merged = (g[0], g[1], MERGE_PATTERNS[key])
-                        out.append(merged)
-                        changed = True
-                        i += 2
-                        continue
-
-                    # inverse cancel: if g2 == inverse(g)
-                    if _invert_gate(g) == g2:
-                        changed = True
-                        i += 2
-                        continue
+            if i + 1 < len(genes):
+                g2 = genes[i + 1]
+                if g[:2] == g2[:2] and compose[g[2]][g2[2]] >= 0:
+                    out.append((g[0], g[1], compose[g[2]][g2[2]]))
+                    changed = True
+                    i += 2
+                    continue
 
             out.append(g)
             i += 1
 
-        circ = out
+        genes = out
 
-    return circ
+    return np.array(genes, dtype=np.uint8).reshape(len(genes), 3)
+
+
+def simplify_circuit(circ: List[Gate]) -> List[Gate]:
+    """
+    Deterministic cleanup:
+      1) normalize single-wire Z gates to (t,t,'Z..')
+      2) repeatedly merge adjacent compatible gates on identical (ctrl,tgt) (Z or controlled) using MERGE_PATTERNS
+      3) cancel adjacent inverse pairs on identical (ctrl,tgt) within the same family (Z vs controlled)
+      4) drop identity gates (Z+0 / C..+0)
+    The work is done on the genome of the circuit (see simplify_genome). Gates whose type is not in GATE_TYPES
+    (e.g. the legacy base-3 "C3Z.." labels) are kept unchanged, in place, and nothing is merged across them.
+    """
+    out: List[Gate] = []
+    run: List[Gate] = []
+    for g in circ:
+        if g[2] in GENE_OPCODES:
+            run.append(g)
+            continue
+        out.extend(decode_circuit(simplify_genome(encode_circuit(run))))
+        out.append(g)
+        run = []
+    out.extend(decode_circuit(simplify_genome(encode_circuit(run))))
+    return out
+
+
+def make_restoring_genome(genome: Genome, *, protected_indices: Iterable[int]) -> Genome:
+    """
+    Compute-uncompute restore of a genome (see make_restoring_circuit).
+    """
+    protected = list(protected_indices)
+    genome = np.array(genome, dtype=np.uint8).reshape(-1, 3)
+    single = ~GENE_CONTROLLED[genome[:, 2]]
+    genome[single, 0] = genome[single, 1]
+    head = genome[~np.isin(genome[:, 1], protected)][::-1].copy()
+    head[:, 2] = GENE_INVERSE[head[:, 2]]
+    return np.concatenate([genome, head])
 
 
 def make_restoring_circuit(circ: List[Gate], *, protected_indices: Iterable[int]) -> List[Gate]:
     """
     Compute-uncompute restore: append inverses (reverse order) of gates that touched
     any index NOT in protected_indices. This restores variable wires while preserving targets.
+    Gates whose type is not in GATE_TYPES (e.g. the legacy base-3 "C3Z.." labels) are kept unchanged, and
+    appended unchanged as their own inverse, as _invert_gate does.
     """
+    if all(g[2] in GENE_OPCODES for g in circ):
+        return decode_circuit(make_restoring_genome(encode_circuit(circ), protected_indices=protected_indices))
     protected = set(protected_indices)
     base = normalize_circuit(circ)
-    head_ops = [g for g in base if g[1] not in protected]
-    inv_part = [_invert_gate(g) for g in reversed(head_ops)]
-    return base + inv_part
+    head = [g for g in base if g[1] not in protected]
+    return base + [_invert_gate(g) for g in reversed(head)]
 
 # Initialize defaults
 rebuild_tables(base=QUBASE, num_qulines=NUM_QULINES)
\ No newline at end of file
@@ -0,0 +1,210 @@
+# pass_manager.py
+import time
+
+
+def _gate_count(qc) -> int:
+    return sum(1 for instruction in qc.instructions if instruction[1] is not None)
+
+
+def _merge(qc, gate_dict=None, tol: float = 0.0, merge_only_names=None, fuse_name: str | None = None, **_):
+    return qc.merged_custom_copy(gate_dict=gate_dict, tol=tol, merge_only_names=merge_only_names, fuse_name=fuse_name)
+
+
+def _cancel(qc, gate_dict=None, tol: float = 0.0, **_):
+    from qutip_mrl.commutation import commutative_cancellation
+    # A window of one gate only looks at the previous gate on the same qudits: no commutation involved
+    return commutative_cancellation(qc, gate_dict=gate_dict, tol=tol, window=1)
+
+
+def _commute(qc, gate_dict=None, tol: float = 0.0, window: int | None = 64, **_):
+    from qutip_mrl.commutation import commutative_cancellation
+    return commutative_cancellation(qc, gate_dict=gate_dict, tol=tol, window=window)
+
+
+def _template(qc, library=None, template_window: int = 32, **_):
+    from qutip_mrl.templates import template_optimize
+    return template_optimize(qc, library=library, window=template_window)
+
+
+def _fuse(qc, gate_dict=None, tol: float = 0.0, window: int | None = 64, fuse_name: str = "F", **_):
+    from qutip_mrl.commutation import commutative_cancellation
+    return commutative_cancellation(qc, gate_dict=gate_dict, tol=tol, window=window, fuse_name=fuse_name)
+
+
+def _schedule(qc, tol: float = 0.0, window: int | None = 64, schedule_mode: str = "asap", **_):
+    from qutip_mrl.scheduling import schedule
+    return schedule(qc, mode=schedule_mode, tol=tol, window=window)
+
+
+# Built-in passes: name -> function(qc, **options) returning a new circuit
+PASSES = {
+    "merge": _merge,  # merged_custom_copy: merges runs of gates named in gate_dict
+    "cancel": _cancel,  # cancels/merges gates with the previous gate on the same qudits
+    "commute": _commute,  # cancels/merges gates across the gates they commute with
+    "template": _template,  # rewrites the matches of a template library
+    "fuse": _fuse,  # like commute, but also merges gates whose product has no name (named fuse_name + number)
+    "schedule": _schedule,  # reorders commuting gates into ASAP (or ALAP) layers of minimal depth
+}
+
+
+class PassReport:
+    """
+    Statistics of a PassManager run: one entry per executed pass, in execution order.
+
+    Each entry is a dict with keys "pass", "iteration", "time" (seconds), "gates_before", "gates_after",
+    "gates_removed", "depth_before", "depth_after" and "depth_change" (negative when the circuit got shallower).
+    Barriers are not counted as gates.
+    """
+
+    def __init__(self):
+        self.entries = []
+        self.iterations = 0
+
+    def add(self, entry: dict) -> None:
+        """Append the statistics of one pass execution."""
+        self.entries.append(entry)
+
+    @property
+    def total_time(self) -> float:
+        """Wall time of all the passes, in seconds."""
+        return sum(entry["time"] for entry in self.entries)
+
+    @property
+    def gates_removed(self) -> int:
+        """Number of gates removed by all the passes."""
+        return sum(entry["gates_removed"] for entry in self.entries)
+
+    def summary(self):
+        """
+        Statistics aggregated by pass name.
+
+        Returns:
+            dict: pass name -> {"runs", "time", "gates_removed", "depth_change"}.
+        """
+        out = {}
+        for entry in self.entries:
+            row = out.setdefault(entry["pass"], {"runs": 0, "time": 0.0, "gates_removed": 0, "depth_change": 0})
+            row["runs"] += 1
+            row["time"] += entry["time"]
+            row["gates_removed"] += entry["gates_removed"]
+            row["depth_change"] += entry["depth_change"]
+        return out
+
+    def __str__(self):
+        lines = [f"{'pass':<12}{'runs':>6}{'time [ms]':>12}{'gates removed':>16}{'depth change':>15}"]
+        for name, row in self.summary().items():
+            lines.append(f"{name:<12}{row['runs']:>6}{row['time'] * 1e3:>12.2f}{row['gates_removed']:>16}{row['depth_change']:>15}")
+        lines.append(f"{'total':<12}{len(self.entries):>6}{self.total_time * 1e3:>12.2f}{self.gates_removed:>16}")
+        return "\n".join(lines)
+
+
+class PassManager:
+    """
+    Optimization pipeline: a sequence of passes applied in order, optionally repeated until a fixpoint.
+
+    Passes are given by name (see PASSES: "merge", "cancel", "commute", "template", "fuse", "schedule") or as
+    functions taking a circuit and returning a new one. Every execution is timed and its gate count and depth change
+    are recorded in `report` (a PassReport).
+
+    Example:
+        pm = PassManager(["template", "commute", "merge"], fixpoint=True)
+        optimized = pm.run(qc)
+        print(pm.report)
+    """
+
+    def __init__(self, passes=("merge",), fixpoint: bool = False, max_iterations: int = 10, **options):
+        """
+        Args:
+            passes (Iterable): Pass names, callables, or (name or callable, options dict) pairs.
+            fixpoint (bool): If True, repeat the whole sequence until it no longer changes the circuit or no longer
+                reduces its gate count and depth.
+            max_iterations (int): Maximum number of repetitions of the sequence when fixpoint is True.
+            **options: Options shared by the built-in passes: gate_dict, tol, merge_only_names (merge), window
+                (commute, fuse, schedule), library and template_window (template), fuse_name (fuse, and merge when
+                given), schedule_mode (schedule: "asap" or "alap").
+
+        Raises:
+            ValueError: If a pass name is unknown.
+        """
+        self.passes = []
+        self.fixpoint = fixpoint
+        self.max_iterations = max_iterations
+        self.options = options
+        self.report = PassReport()
+        for spec in passes:
+            if isinstance(spec, tuple):
+                self.add(spec[0], **spec[1])
+            else:
+                self.add(spec)
+
+    def add(self, spec, name: str | None = None, **options) -> "PassManager":
+        """
+        Append a pass to the pipeline.
+
+        Args:
+            spec (str | Callable): Name of a built-in pass or function(qc) -> QuditCircuit.
+            name (str, optional): Name of the pass in the report. Defaults to the pass name or the function name.
+            **options: Options of this pass, overriding the ones given to the PassManager.
+
+        Returns:
+            PassManager: self, to chain calls.
+
+        Raises:
+            ValueError: If a pass name is unknown.
+        """
+        if isinstance(spec, str):
+            if spec not in PASSES:
+                raise ValueError(f"Unknown pass '{spec}', available passes: {', '.join(PASSES)}")
+            function = PASSES[spec]
+            name = spec if name is None else name
+            builtin = True
+        else:
+            function = spec
+            name = getattr(spec, "__name__", "pass") if name is None else name
+            builtin = False
+        self.passes.append((name, function, builtin, options))
+        return self
+
+    def run(self, qc):
+        """
+        Run the pipeline on a circuit. The statistics are stored in `report` (reset at every run).
+
+        Args:
+            qc (QuditCircuit): The circuit to optimize (not modified).
+
+        Returns:
+            QuditCircuit: The optimized circuit.
+        """
+        self.report = PassReport()
+        gates = _gate_count(qc)
+        depth = qc.dag().depth()
+        iterations = self.max_iterations if self.fixpoint else 1
+        for iteration in range(iterations):
+            start_fingerprint = qc.fingerprint()
+            start_cost = (gates, depth)
+            for name, function, builtin, options in self.passes:
+                start = time.perf_counter()
+                if builtin:
+                    qc = function(qc, **{**self.options, **options})
+                else:
+                    qc = function(qc, **options)
+                elapsed = time.perf_counter() - start
+                new_gates = _gate_count(qc)
+                new_depth = qc.dag().depth()
+                self.report.add({
+                    "pass": name,
+                    "iteration": iteration,
+                    "time": elapsed,
+                    "gates_before": gates,
+                    "gates_after": new_gates,
+                    "gates_removed": gates - new_gates,
+                    "depth_before": depth,
+                    "depth_after": new_depth,
+                    "depth_change": new_depth - depth,
+                })
+                gates, depth = new_gates, new_depth
+            self.report.iterations = iteration + 1
+            # Passes may reorder commuting gates without saving anything: stop as soon as the cost stalls
+            if qc.fingerprint() == start_fingerprint or (gates, depth) >= start_cost:
+                break
+        return qc
@@ -1,10 +1,273 @@
+from bisect import bisect_left
+from collections.abc import Sequence
 from math import ceil
+import hashlib
 import matplotlib.pyplot as plt
 import numpy as np
 import qutip as qt
 
 import qutip_mrl.qutrit_matrices as qutrit_matrices
 import qutip_mrl.ascii_gates as ascii_gates
+from qutip_mrl.circuit_dag import CircuitDAG
+
+# Rolling hash of the instruction stream: H_i = (H_{i-1} * _HASH_BASE + h_i) mod _HASH_MOD
+_HASH_MOD = (1 << 61) - 1
+_HASH_BASE = 0x5DEECE66D1F3A7B
+
+# Built-in qutrit gates: label -> (matrix, single-qudit method, controlled method)
+_QUTRIT_NATIVE_GATES = {
+    "I": (qutrit_matrices.Z_I, "id", None),
+    "+1": (qutrit_matrices.Z_PLUS_1, "plus1", "c_plus1"),
+    "+2": (qutrit_matrices.Z_PLUS_2, "plus2", "c_plus2"),
+    "12": (qutrit_matrices.Z_12, "one_two", "c_one_two"),
+    "01": (qutrit_matrices.Z_01, "zero_one", "c_zero_one"),
+    "02": (qutrit_matrices.Z_02, "zero_two", "c_zero_two"),
+}
+
+def _instruction_digest(instruction) -> int:
+    """64-bit content digest of an instruction table entry, matrices being hashed by value."""
+    name, gate, controls, values, target = instruction
+    h = hashlib.blake2b(digest_size=8)
+    h.update(f"{name}|{controls}|{values}|{target}|".encode())
+    if gate is not None:
+        h.update(np.ascontiguousarray(gate, dtype=np.complex128).tobytes())
+    return int.from_bytes(h.digest(), "little")
+
+
+class _ListWindow(Sequence):
+    """
+    Read-only window [start, stop) on a list, optionally preceded by a fixed head item.
+    Used by circuit views to share the gate storage of their circuit.
+    """
+
+    def __init__(self, base, start, stop, head=None):
+        self._base = base
+        self._start = start
+        self._stop = stop
+        self._head = [] if head is None else [head]
+
+    def __len__(self):
+        return len(self._head) + self._stop - self._start
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("window index out of range")
+        if index < len(self._head):
+            return self._head[index]
+        return self._base[self._start + index - len(self._head)]
+
+    def __iter__(self):
+        yield from self._head
+        for i in range(self._start, self._stop):
+            yield self._base[i]
+
+    def append(self, item):
+        raise TypeError("Circuit views are read-only, use copy() to get an editable circuit")
+
+    extend = append
+
+
+class _HashWindow(_ListWindow):
+    """Window on rolling-hash prefixes, rebased so that item j is the hash of the first j gates of the window."""
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return super().__getitem__(index)
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("window index out of range")
+        head = self._base[self._start]
+        return (self._base[self._start + index] - head * pow(_HASH_BASE, index, _HASH_MOD)) % _HASH_MOD
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+
+def _permutation_of(gate):
+    """Return the permutation p of a permutation matrix (gate[p[j], j] == 1), or None for other matrices."""
+    M = np.asarray(gate)
+    if M.ndim != 2 or M.shape[0] != M.shape[1]:
+        return None
+    perm = np.argmax(np.abs(M), axis=0)
+    P = np.zeros(M.shape)
+    P[perm, np.arange(M.shape[1])] = 1
+    if not np.array_equal(M, P):
+        return None
+    return tuple(int(v) for v in perm)
+
+
+def _inverse_matrix(gate, perm=None):
+    """
+    Inverse of a unitary gate matrix. Permutation matrices (whose permutation may be given) are inverted exactly, by
+    transposing the permutation.
+    """
+    M = np.asarray(gate)
+    if perm is None:
+        perm = _permutation_of(M)
+    if perm is None:
+        return M.conj().T.copy()
+    inverse = np.zeros_like(M)
+    inverse[np.arange(len(perm)), perm] = 1
+    return inverse
+
+
+def _inverse_name(name: str) -> str:
+    """
+    Name of the inverse of a gate without a meaningful inverse label: a trailing "'" is removed, otherwise the name
+    is cut to 3 characters and marked with "'" ("AB" -> "AB'", "CUST" -> "CUS'").
+    """
+    if name.endswith("'"):
+        return name[:-1]
+    return name[:3] + "'"
+
+
+def _base36(n: int) -> str:
+    """Digits of a non-negative integer in base 36 (0-9 then a-z)."""
+    digits = "0123456789abcdefghijklmnopqrstuvwxyz"
+    out = digits[n % 36]
+    while n >= 36:
+        n //= 36
+        out = digits[n % 36] + out
+    return out
+
+
+def _permutation_matrix(perm):
+    """Permutation matrix P with P[perm[j], j] == 1."""
+    P = np.zeros((len(perm), len(perm)), dtype=complex)
+    P[list(perm), np.arange(len(perm))] = 1
+    return P
+
+
+class _GateLookup:
+    """
+    Index of a gate dictionary (name -> matrix) answering "which name has this matrix" in O(1).
+
+    Permutation matrices are keyed by their permutation tuple, the other matrices by the bytes of the matrix
+    (tol == 0) or of the matrix rounded to a grid of step tol (tol > 0). A lookup returns the same name as a scan
+    of the dictionary in insertion order with np.array_equal (tol == 0) or np.allclose(atol=tol, rtol=0).
+    Permutations are also accepted in place of matrices, so that merges can be done by composing permutations.
+    """
+
+    def __init__(self, gate_dict, tol: float = 0.0):
+        self._tol = tol
+        self._matrices = {}
+        self._order = {}  # name -> insertion position
+        self._perm_of = {}  # name -> permutation tuple, or None
+        self._perms = {}  # permutation -> first name
+        self._keys = {}  # matrix key -> first name (non-permutation matrices)
+        self._others = []  # names of the non-permutation matrices, in insertion order
+        self._next_fused = {}  # prefix -> next number tried by add_fused
+        for name, matrix in gate_dict.items():
+            self.add(name, matrix)
+
+    def __key(self, M):
+        if self._tol == 0.0:
+            # + 0.0 turns -0.0 into 0.0, which array_equal considers equal
+            return M.shape, (M + 0.0).tobytes()
+        return M.shape, (np.round(M / self._tol) + 0.0).tobytes()
+
+    def add(self, name, matrix):
+        """Index a new entry. Names already present are ignored."""
+        if name in self._order:
+            return
+        M = np.asarray(matrix, dtype=complex)
+        self._matrices[name] = M
+        self._order[name] = len(self._order)
+        perm = _permutation_of(M)
+        self._perm_of[name] = perm
+        if perm is not None:
+            self._perms.setdefault(perm, name)
+        else:
+            self._keys.setdefault(self.__key(M), name)
+            self._others.append(name)
+
+    @staticmethod
+    def check_fuse_name(prefix):
+        """
+        Check that fused gate names prefix + counter fit the 4-character limit of gate names.
+
+        Raises:
+            ValueError: If the prefix is empty or longer than 3 characters.
+        """
+        if not isinstance(prefix, str) or not 1 <= len(prefix) <= 3:
+            raise ValueError("fuse_name must be a prefix of 1 to 3 chars (gate names are of max 4 chars)")
+
+    def add_fused(self, prefix, matrix):
+        """
+        Index a matrix under the first free name among prefix0, prefix1, ..., prefixz, prefix10, ... (a base-36
+        counter, for merged gates with no name), within the 4-character limit of gate names.
+
+        Returns:
+            str: The new name.
+
+        Raises:
+            ValueError: If the prefix is not valid (see check_fuse_name) or all its names are taken.
+        """
+        self.check_fuse_name(prefix)
+        limit = 36 ** (4 - len(prefix))
+        n = self._next_fused.get(prefix, 0)
+        while n < limit and f"{prefix}{_base36(n)}" in self._order:
+            n += 1
+        if n >= limit:
+            raise ValueError(f"No fused gate names left for prefix {prefix!r}")
+        self._next_fused[prefix] = n + 1
+        name = f"{prefix}{_base36(n)}"
+        self.add(name, matrix)
+        return name
+
+    def permutation(self, name):
+        """Permutation tuple of entry `name`, or None if its matrix is not a permutation."""
+        return self._perm_of[name]
+
+    def name_of(self, M):
+        """
+        Name of the first entry equal (within tol) to a matrix or permutation tuple.
+
+        Returns:
+            str | None: The name, or None if no entry matches.
+        """
+        if isinstance(M, tuple):
+            if self._tol == 0.0 or not self._others:
+                return self._perms.get(M)
+            M = _permutation_matrix(M)
+        M = np.asarray(M, dtype=complex)
+        tol = self._tol
+        if tol == 0.0:
+            perm = _permutation_of(M)
+            if perm is not None:
+                return self._perms.get(perm)
+            return self._keys.get(self.__key(M))
+        if tol >= 0.5:
+            # A matrix can be close to several permutations, keep the plain scan
+            for name, A in self._matrices.items():
+                if A.shape == M.shape and np.allclose(M, A, atol=tol, rtol=0.0):
+                    return name
+            return None
+
+        best = None
+        perm = tuple(int(v) for v in np.argmax(np.abs(M), axis=0)) if M.ndim == 2 else None
+        if perm is not None and perm in self._perms:
+            name = self._perms[perm]
+            if self._matrices[name].shape == M.shape and np.allclose(M, self._matrices[name], atol=tol, rtol=0.0):
+                best = name
+        name = self._keys.get(self.__key(M))
+        if name is not None and np.allclose(M, self._matrices[name], atol=tol, rtol=0.0):
+            if best is None or self._order[name] < self._order[best]:
+                best = name
+        # Matrices within tol can round to different keys, scan the entries that could still come first
+        for name in self._others:
+            if best is not None and self._order[name] >= self._order[best]:
+                break
+            A = self._matrices[name]
+            if A.shape == M.shape and np.allclose(M, A, atol=tol, rtol=0.0):
+                return name
+        return best
 
 
 class QuditCircuit:
@@ -35,12 +298,18 @@ class QuditCircuit:
         """    
         self.num_qudit = num_qudit
         self.num_states = num_states
-        # Structures for simulation and visualization
+        # Structures for simulation and visualization (the gate list is shared by all the simulators)
         self.__einsum_gates = []
-        self.__fullmatrix_gates = []
         self.__ascii_circuit_visualization_list = []
         self.__mpl_circuit_visualization_list = []
+        # Instruction table: one (name, matrix, controls, control_values, target) entry per inserted gate or barrier
+        self.__instructions = []
+        self.__dag = None  # built on first use by dag(), then kept up to date
+        self.__hash_prefix = [0]  # rolling hash of every instruction-table prefix, used by fingerprint()
+        self.__barrier_positions = []  # instruction indices of the barriers (they have no simulation entry)
         self.__gate_table = None
+        # instruction index -> (name, original name), of the gates renamed by inverse() (see inverse)
+        self.__inverted_names = {}
         self.__initial_ASCII_block()
 
     def set_gate_table(self, gate_table: dict):
@@ -55,6 +324,63 @@ class QuditCircuit:
             raise TypeError("gate_table must be a dict mapping labels to matrices")
         self.__gate_table = gate_table
 
+    @property
+    def gate_table(self):
+        """
+        The label->matrix dictionary registered with set_gate_table (None if there is none). Optimizations that fuse
+        gates into matrices with no name register them here (see merged_custom_copy).
+        """
+        return self.__gate_table
+
+    @property
+    def instructions(self):
+        """
+        Instruction table of the circuit, in insertion order.
+
+        Each entry is a tuple (name, matrix, controls, control_values, target); barriers are stored as
+        ("barrier", None, (), (), None). The list is shared with the circuit and must not be modified.
+        """
+        return self.__instructions
+
+    def __record(self, name, gate, controls=(), control_values=(), target=None):
+        # Keeps the instruction table (and the dependency graph, once built) in sync with the simulation/visualization structures.
+        # Qudit indices and control values are stored as plain ints, so that the fingerprint does not depend on their type
+        instruction = (name, gate, tuple(int(c) for c in controls), tuple(int(v) for v in control_values),
+                       None if target is None else int(target))
+        self.__instructions.append(instruction)
+        self.__hash_prefix.append((self.__hash_prefix[-1] * _HASH_BASE + _instruction_digest(instruction)) % _HASH_MOD)
+        if self.__dag is not None:
+            self.__dag.add(len(self.__instructions) - 1, instruction)
+
+    def dag(self):
+        """
+        Gate dependency graph of the circuit (see qutip_mrl.circuit_dag.CircuitDAG).
+
+        The graph is built in one pass the first time it is requested and is then updated incrementally
+        as gates are appended, so it can be shared by analyses, optimizers and renderers.
+
+        Returns:
+            CircuitDAG: The dependency graph, exposing layers(), depth(), critical_path() and qudit_chain().
+        """
+        if self.__dag is None:
+            self.__dag = CircuitDAG.from_instructions(self.num_qudit, self.__instructions)
+        return self.__dag
+
+    def fingerprint(self) -> str:
+        """
+        Content fingerprint of the circuit, suitable as a cache key for simulation results or drawings.
+
+        Two circuits have the same fingerprint when they have the same geometry and the same instruction stream
+        (names, matrices by content, controls, control values, targets and barriers). The underlying rolling hash
+        is updated in O(1) for every appended gate, so this call is O(1).
+
+        Returns:
+            str: A 32-character hexadecimal string.
+        """
+        n = len(self.__instructions)
+        key = f"{self.num_qudit}:{self.num_states}:{n}:{self.__hash_prefix[n]}"
+        return hashlib.blake2b(key.encode(), digest_size=16).hexdigest()
+
     # Functions called by the user to insert a gate in the circuit
     def id(self, target):
         """
@@ -70,7 +396,7 @@ class QuditCircuit:
          raise ValueError(f"Trying to insert a Qutrit gate in a >3-states qudit circuit")  
         # Appends the gate and the target in both the einsum and fullmatrix lists that will be used when circuit is simulated
         self.__einsum_gates.append((qutrit_matrices.Z_I,target))
-        self.__fullmatrix_gates.append((qt.Qobj(qutrit_matrices.Z_I), target))
+        self.__record("I", qutrit_matrices.Z_I, target=target)
         
         # Code used for the ASCII visual representation,
         self.__simple_gate_ASCII_block(ascii_gates.ID_ASCII, target)
@@ -92,7 +418,7 @@ class QuditCircuit:
         if self.num_states> 3:
          raise ValueError(f"Trying to insert a Qutrit gate in a >3 states qudit circuit")          
         self.__einsum_gates.append((qutrit_matrices.Z_PLUS_1,target))
-        self.__fullmatrix_gates.append((qt.Qobj(qutrit_matrices.Z_PLUS_1), target))
+        self.__record("+1", qutrit_matrices.Z_PLUS_1, target=target)
         
         self.__simple_gate_ASCII_block(ascii_gates.PLUS1_ASCII, target)
         gate_data = {'name': '+1', 'target': target, 'color': '#2a9d8f', 'column': len(self.__mpl_circuit_visualization_list)}
@@ -112,7 +438,7 @@ class QuditCircuit:
         if self.num_states> 3:
          raise ValueError(f"Trying to insert a Qutrit gate in a >3 states qudit circuit")      
         self.__einsum_gates.append((qutrit_matrices.Z_PLUS_2,target))
-        self.__fullmatrix_gates.append((qt.Qobj(qutrit_matrices.Z_PLUS_2), target))
+        self.__record("+2", qutrit_matrices.Z_PLUS_2, target=target)
         
         self.__simple_gate_ASCII_block(ascii_gates.PLUS2_ASCII, target)
         gate_data = {'name': '+2', 'target': target, 'color': '#0081a7', 'column': len(self.__mpl_circuit_visualization_list)}
@@ -132,7 +458,7 @@ class QuditCircuit:
         if self.num_states> 3:
          raise ValueError(f"Trying to insert a Qutrit gate in a >3 states qudit circuit")          
         self.__einsum_gates.append((qutrit_matrices.Z_12,target))
-        self.__fullmatrix_gates.append((qt.Qobj(qutrit_matrices.Z_12), target))
+        self.__record("12", qutrit_matrices.Z_12, target=target)
         
         self.__simple_gate_ASCII_block(ascii_gates.ONE_TWO_ASCII, target)
         gate_data = {'name': '12', 'target': target, 'color': '#e76f51', 'column': len(self.__mpl_circuit_visualization_list)}
@@ -152,7 +478,7 @@ class QuditCircuit:
         if self.num_states> 3:
          raise ValueError(f"Trying to insert a Qutrit gate in a >3 states qudit circuit")              
         self.__einsum_gates.append((qutrit_matrices.Z_01,target))
-        self.__fullmatrix_gates.append((qt.Qobj(qutrit_matrices.Z_01), target))
+        self.__record("01", qutrit_matrices.Z_01, target=target)
         
         self.__simple_gate_ASCII_block(ascii_gates.ZERO_ONE_ASCII, target)
         gate_data = {'name': '01', 'target': target, 'color': '#e9c46a', 'column': len(self.__mpl_circuit_visualization_list)}
@@ -172,7 +498,7 @@ class QuditCircuit:
         if self.num_states> 3:
          raise ValueError(f"Trying to insert a Qutrit gate in a >3 states qudit circuit")              
         self.__einsum_gates.append((qutrit_matrices.Z_02,target))
-        self.__fullmatrix_gates.append((qt.Qobj(qutrit_matrices.Z_02), target))
+        self.__record("02", qutrit_matrices.Z_02, target=target)
         
         self.__simple_gate_ASCII_block(ascii_gates.ZERO_TWO_ASCII, target)
         gate_data = {'name': '02', 'target': target, 'color': '#f4a261', 'column': len(self.__mpl_circuit_visualization_list)}
@@ -193,7 +519,7 @@ class QuditCircuit:
         if self.num_states> 3:
          raise ValueError(f"Trying to insert a Qutrit gate in a >3 states qudit circuit")              
         self.__einsum_gates.append((qutrit_matrices.Z_PLUS_1,control,target))
-        self.__fullmatrix_gates.append((qt.Qobj(qutrit_matrices.Z_PLUS_1), control, target))
+        self.__record("+1", qutrit_matrices.Z_PLUS_1, [control], [self.num_states - 1], target)
         
         self.__controlled_gate_ASCII_block(ascii_gates.PLUS1_ASCII, control, target)
         gate_data = {'name': '+1', 'control': control, 'target': target, 'color': '#2a9d8f', 'column': len(self.__mpl_circuit_visualization_list)}
@@ -213,7 +539,7 @@ class QuditCircuit:
         if self.num_states> 3:
          raise ValueError(f"Trying to insert a Qutrit gate in a >3 states qudit circuit")              
         self.__einsum_gates.append((qutrit_matrices.Z_PLUS_2,control,target))
-        self.__fullmatrix_gates.append((qt.Qobj(qutrit_matrices.Z_PLUS_2), control, target))
+        self.__record("+2", qutrit_matrices.Z_PLUS_2, [control], [self.num_states - 1], target)
         
         self.__controlled_gate_ASCII_block(ascii_gates.PLUS2_ASCII, control, target)
         gate_data = {'name': '+2', 'control': control, 'target': target, 'color': '#0081a7', 'column': len(self.__mpl_circuit_visualization_list)}
@@ -252,7 +578,7 @@ class QuditCircuit:
         if self.num_states> 3:
          raise ValueError(f"Trying to insert a Qutrit gate in a >3 states qudit circuit")              
         self.__einsum_gates.append((qutrit_matrices.Z_12,control,target))
-        self.__fullmatrix_gates.append((qt.Qobj(qutrit_matrices.Z_12), control, target))
+        self.__record("12", qutrit_matrices.Z_12, [control], [self.num_states - 1], target)
         
         self.__controlled_gate_ASCII_block(ascii_gates.ONE_TWO_ASCII, control, target)
         gate_data = {'name': '12', 'control': control, 'target': target, 'color': '#e76f51', 'column': len(self.__mpl_circuit_visualization_list)}
@@ -272,7 +598,7 @@ class QuditCircuit:
         if self.num_states> 3:
          raise ValueError(f"Trying to insert a Qutrit gate in a >3 states qudit circuit")              
         self.__einsum_gates.append((qutrit_matrices.Z_01,control,target))
-        self.__fullmatrix_gates.append((qt.Qobj(qutrit_matrices.Z_01), control, target))
+        self.__record("01", qutrit_matrices.Z_01, [control], [self.num_states - 1], target)
         
         self.__controlled_gate_ASCII_block(ascii_gates.ZERO_ONE_ASCII, control, target)
         gate_data = {'name': '01', 'control': control, 'target': target, 'color': '#e9c46a', 'column': len(self.__mpl_circuit_visualization_list)}
@@ -293,7 +619,7 @@ class QuditCircuit:
          raise ValueError(f"Trying to insert a Qutrit gate in a >3 states qudit circuit")         
         self.__einsum_gates.append((qutrit_matrices.Z_02,control,target))
         self.__controlled_gate_ASCII_block(ascii_gates.ZERO_TWO_ASCII, control, target)
-        self.__fullmatrix_gates.append((qt.Qobj(qutrit_matrices.Z_02), control, target))
+        self.__record("02", qutrit_matrices.Z_02, [control], [self.num_states - 1], target)
         
         gate_data = {'name': '02', 'control': control, 'target': target, 'color': '#f4a261', 'column': len(self.__mpl_circuit_visualization_list)}
         self.__mpl_circuit_visualization_list.append(gate_data) 
@@ -325,7 +651,7 @@ class QuditCircuit:
 
         v1, v2 = control_values
         self.__einsum_gates.append(("CCV", gate, control1, control2, target, (v1, v2)))
-        self.__fullmatrix_gates.append(("CCV", qt.Qobj(gate), control1, control2, target, (v1, v2)))
+        self.__record(name, gate, [control1, control2], [v1, v2], target)
         self.__multi_controlled_gate_ASCII_block(ascii_gates.custom_ascii(name), controls=[control1, control2], target=target, control_values=[v1, v2])
 
         gate_data = {
@@ -338,6 +664,59 @@ class QuditCircuit:
         }
         self.__mpl_circuit_visualization_list.append(gate_data)
 
+    def mc_custom_gate(self, gate, controls, target, name: str = "CUST", control_values=None):
+        """
+        Custom gate with any number of value controls.
+
+        The gate is applied iff every control qudit controls[i] is in state control_values[i].
+        One and two-control gates are inserted with c_custom_gate and cc_custom_gate.
+
+        Args:
+            gate (np.ndarray): Unitary matrix representing the gate.
+            controls (list/tuple): Indices of the control qudits (at least one).
+            target (int): Index of the target qudit.
+            name (str): Gate label (max 4 characters) for visualization.
+            control_values (list/tuple, optional): Values of the control qudits for which the gate is applied.
+                If None, all the controls are assumed to be |d-1⟩.
+
+        Raises:
+            ValueError: If name exceeds 4 characters, if controls is empty or repeats a qudit (or the target),
+                or if control_values has not one valid value per control.
+        """
+        if len(name) > 4:
+            raise ValueError("Name of the gate must be of max 4 chars")
+        controls = [int(c) for c in controls]
+        if not controls:
+            raise ValueError("At least one control is required")
+        if len(set(controls + [target])) != len(controls) + 1:
+            raise ValueError("Controls and target must be different qudits")
+        if control_values is None:
+            control_values = [self.num_states - 1] * len(controls)
+        values = [int(v) for v in control_values]
+        if len(values) != len(controls):
+            raise ValueError("control_values must have one value per control")
+        if any(not 0 <= v < self.num_states for v in values):
+            raise ValueError(f"control values must be in [0, {self.num_states - 1}]")
+
+        if len(controls) == 1:
+            return self.c_custom_gate(gate, control=controls[0], target=target, name=name, control_values=values)
+        if len(controls) == 2:
+            return self.cc_custom_gate(gate, control1=controls[0], control2=controls[1], target=target, name=name, control_values=values)
+
+        self.__einsum_gates.append(("MCV", gate, tuple(controls), target, tuple(values)))
+        self.__record(name, gate, controls, values, target)
+        self.__multi_controlled_gate_ASCII_block(ascii_gates.custom_ascii(name), controls=controls, target=target, control_values=values)
+
+        gate_data = {
+            "name": name,
+            "controls": controls,
+            "control_values": values,
+            "target": target,
+            "color": "#603F83",
+            "column": len(self.__mpl_circuit_visualization_list),
+        }
+        self.__mpl_circuit_visualization_list.append(gate_data)
+
     def toffoli(self, label: str, control1: int, control2: int, target: int, control_values=None, name: str | None = None):
         """
         Apply a Toffoli-like gate with a custom single-qudit operation.
@@ -387,6 +766,8 @@ class QuditCircuit:
         It can be inserted by the user in any point of the circuit.
         """
         self.__barrier_ASCII_block()
+        self.__record("barrier", None)
+        self.__barrier_positions.append(len(self.__instructions) - 1)
         barrier_data = {'name': 'barrier', 'column': len(self.__mpl_circuit_visualization_list)}
         self.__mpl_circuit_visualization_list.append(barrier_data)
             
@@ -410,7 +791,7 @@ class QuditCircuit:
          raise ValueError(f"Name of the gate must be of max 4 chars")  
             
         self.__einsum_gates.append((gate,target))
-        self.__fullmatrix_gates.append((qt.Qobj(gate), target))
+        self.__record(name, gate, target=target)
         
         self.__simple_gate_ASCII_block(ascii_gates.custom_ascii(name), target)
         gate_data = {'name': name, 'target': target, 'color': '#C7D3D4', 'column': len(self.__mpl_circuit_visualization_list)}
@@ -436,7 +817,6 @@ class QuditCircuit:
          raise ValueError(f"Name of the gate must be of max 4 chars")
          
         self.__einsum_gates.append((gate, control, target))
-        self.__fullmatrix_gates.append((qt.Qobj(gate), control, target))
         
         self.__controlled_gate_ASCII_block(ascii_gates.custom_ascii(name), control, target)
         gate_data = {'name': name, 'control': control, 'target': target, 'color': '#603F83', 'column': len(self.__mpl_circuit_visualization_list)}
@@ -476,7 +856,7 @@ class QuditCircuit:
             raise ValueError(f"control value v must be in [0, {self.num_states - 1}]")
 
         self.__einsum_gates.append(("CV", gate, control, target, v))
-        self.__fullmatrix_gates.append(("CV", qt.Qobj(gate), control, target, v))
+        self.__record(name, gate, [control], [v], target)
 
         self.__controlled_gate_ASCII_block(ascii_gates.custom_ascii(name), control, target)
 
@@ -522,32 +902,38 @@ class QuditCircuit:
             dims=[[self.num_states ** self.num_qudit], [1]],
         )
 
-        for gate in self.__fullmatrix_gates:
+        # Gates are stored as numpy matrices, they are converted to Qobj only here
+        for gate in self.__einsum_gates:
             if len(gate) == 2 and not isinstance(gate[0], str):
                 op_matrix, target_index = gate
-                full_op = self.__single_qudit_gate(op_matrix, target_index)
+                full_op = self.__single_qudit_gate(qt.Qobj(op_matrix), target_index)
 
             elif len(gate) == 3 and not isinstance(gate[0], str):
                 op_matrix, control_index, target_index = gate
-                full_op = self.__controlled_qudit_gate(op_matrix, control_index, target_index)
+                full_op = self.__controlled_qudit_gate(qt.Qobj(op_matrix), control_index, target_index)
 
             else:
                 if isinstance(gate[0], str) and gate[0] == "CV":
                     _, op_matrix, c1, target_index, v = gate
                     full_op = self.__value_multi_controlled_qudit_gate(
-                        op_matrix, controls=[c1], values=[v], target=target_index
+                        qt.Qobj(op_matrix), controls=[c1], values=[v], target=target_index
                     )
 
                 elif isinstance(gate[0], str) and gate[0] == "CCV":
                     _, op_matrix, c1, c2, target_index, control_values = gate
                     full_op = self.__value_multi_controlled_qudit_gate(
-                        op_matrix, controls=[c1, c2], values=list(control_values), target=target_index
+                        qt.Qobj(op_matrix), controls=[c1, c2], values=list(control_values), target=target_index
+                    )
+                elif isinstance(gate[0], str) and gate[0] == "MCV":
+                    _, op_matrix, controls, target_index, control_values = gate
+                    full_op = self.__value_multi_controlled_qudit_gate(
+                        qt.Qobj(op_matrix), controls=list(controls), values=list(control_values), target=target_index
                     )
                 else:
                     op_matrix = gate[0]
                     control_indices = gate[1:-1]
                     target_index = gate[-1]
-                    full_op = self.__multi_controlled_qudit_gate(op_matrix, list(control_indices), target_index)
+                    full_op = self.__multi_controlled_qudit_gate(qt.Qobj(op_matrix), list(control_indices), target_index)
 
             final_state = full_op * final_state
 
@@ -624,6 +1010,7 @@ class QuditCircuit:
           - legacy controlled gates on |d-1>
           - CV value-controlled 1-control custom gates
           - CCV value-controlled 2-control custom gates
+          - MCV value-controlled custom gates with more controls
 
         Args:
         input_state (list/tuple, optional): Initial state of the system as a list of integers representing the basis state of each qudit.
@@ -669,6 +1056,16 @@ class QuditCircuit:
                 state[tuple(sl)] = apply_1q_gate(sub, U, t)
                 continue
 
+            # MCV: ("MCV", U, (c1, ..., ck), t, (v1, ..., vk))
+            if isinstance(gate[0], str) and gate[0] == "MCV":
+                _, U, controls, t, values = gate
+                sl = [slice(None)] * n
+                for c, v in zip(controls, values):
+                    sl[c] = slice(v, v + 1)
+                sub = state[tuple(sl)]
+                state[tuple(sl)] = apply_1q_gate(sub, U, t)
+                continue
+
             # legacy multi-control on |d-1>: (U, c1, c2, ..., t)
             U = gate[0]
             controls = list(gate[1:-1])
@@ -724,6 +1121,10 @@ class QuditCircuit:
                     _, op_matrix, c1, c2, target_index, control_values = gate
                     control_indices = [c1, c2]
                     values = list(control_values)
+                elif isinstance(gate[0], str) and gate[0] == "MCV":
+                    _, op_matrix, control_indices, target_index, values = gate
+                    control_indices = list(control_indices)
+                    values = list(values)
                 else:
                     op_matrix = gate[0]
                     control_indices = list(gate[1:-1])
@@ -802,6 +1203,10 @@ class QuditCircuit:
                     _, op_matrix, c1, c2, target_index, control_values = gate
                     control_indices = [c1, c2]
                     values = list(control_values)
+                elif isinstance(gate[0], str) and gate[0] == "MCV":
+                    _, op_matrix, control_indices, target_index, values = gate
+                    control_indices = list(control_indices)
+                    values = list(values)
                 else:
                     op_matrix = gate[0]
                     control_indices = list(gate[1:-1])
@@ -877,17 +1282,27 @@ class QuditCircuit:
             target_state[self.num_states - 1] = 1  # |self.num_states-1⟩
             if not np.allclose(control_state, target_state):
                 continue  
-        elif len(gate) == 5:
-            _, op_matrix, c1, target_index, v = gate
-            control_indices = [c1]
-            values = [v]
-
-            # Retrieves the state of the control qudit
-            axes = tuple(j for j in range(self.num_qudit) if j != c1)
-            control_state = np.sum(np.abs(state) ** 2, axis=axes)
-            target_state = np.zeros(self.num_states)
-            target_state[v] = 1
-            if not np.allclose(control_state, target_state):
+        elif isinstance(gate[0], str): # Value-controlled gates: ("CV", U, c, t, v), ("CCV", U, c1, c2, t, (v1, v2)), ("MCV", U, controls, t, values)
+            if gate[0] == "CV":
+                _, op_matrix, c1, target_index, v = gate
+                control_indices, values = [c1], [v]
+            elif gate[0] == "CCV":
+                _, op_matrix, c1, c2, target_index, values = gate
+                control_indices = [c1, c2]
+            else:
+                _, op_matrix, control_indices, target_index, values = gate
+
+            # Retrieves the state of the control qudits, the gate is skipped unless all of them hold their value
+            skip = False
+            for control_index, v in zip(control_indices, values):
+                axes = tuple(j for j in range(self.num_qudit) if j != control_index)
+                control_state = np.sum(np.abs(state) ** 2, axis=axes)
+                target_state = np.zeros(self.num_states)
+                target_state[v] = 1
+                if not np.allclose(control_state, target_state):
+                    skip = True
+                    break
+            if skip:
                 continue
         else:
             print(gate)
@@ -943,50 +1358,36 @@ class QuditCircuit:
         self.__ascii_circuit_visualization_list.append(block)
         
     def __simple_gate_ASCII_block(self, GATE_ASCII, target): # Used for the visual representation of single qudit gates
-        block = []
-        for _ in range(target):
-            block.extend(ascii_gates.WIRE_ASCII) # Empty wires on qudits before the target qudit
+        block = ascii_gates.WIRE_ASCII * target # Empty wires on qudits before the target qudit
 
         block.extend(GATE_ASCII) # Visual representation of the gate on the target qudit 
 
-        for _ in range(self.num_qudit - target - 1): # Empty wires on qudits after the target qudit
-            block.extend(ascii_gates.WIRE_ASCII)
+        block.extend(ascii_gates.WIRE_ASCII * (self.num_qudit - target - 1)) # Empty wires on qudits after the target qudit
         self.__ascii_circuit_visualization_list.append(block)
         
     def __controlled_gate_ASCII_block(self, GATE_ASCII, control, target): # Used for the visual representation of a controlled gate
-        block = []
-        
         if target > control: # Based on the position of the target and the control we have 2 different codes
-            for _ in range(control):
-                block.extend(ascii_gates.WIRE_ASCII) # Empty wires before the control
+            block = ascii_gates.WIRE_ASCII * control # Empty wires before the control
             block.extend(ascii_gates.CONTROL_ASCII) # Visual representation of the control symbol on the control qudit
-            for _ in range(target - control - 1): # Line that connects control to the gate on target qudit 
-                block.extend(ascii_gates.LINE_ASCII)
+            block.extend(ascii_gates.LINE_ASCII * (target - control - 1)) # Line that connects control to the gate on target qudit 
 
             block.extend(GATE_ASCII) # Visual representation of the gate on the target qudit 
 
-            for _ in range(self.num_qudit - target - 1):
-                block.extend(ascii_gates.WIRE_ASCII)
+            block.extend(ascii_gates.WIRE_ASCII * (self.num_qudit - target - 1))
             self.__ascii_circuit_visualization_list.append(block)
             
         else: # Mirrored version of the previous 'if'
-            for _ in range(target):
-                block.extend(ascii_gates.WIRE_ASCII)
+            block = ascii_gates.WIRE_ASCII * target
             block.extend(GATE_ASCII)
-            for _ in range(control - target - 1):
-                block.extend(ascii_gates.LINE_ASCII)
+            block.extend(ascii_gates.LINE_ASCII * (control - target - 1))
 
             block.extend(ascii_gates.CONTROL_ASCII_REV)
 
-            for _ in range(self.num_qudit - control - 1):
-                block.extend(ascii_gates.WIRE_ASCII)
+            block.extend(ascii_gates.WIRE_ASCII * (self.num_qudit - control - 1))
             self.__ascii_circuit_visualization_list.append(block)
             
     def __barrier_ASCII_block(self): # Barrier lines
-        block = []
-        for _ in range(self.num_qudit): 
-            block.extend(ascii_gates.BARRIER_ASCII)
-        self.__ascii_circuit_visualization_list.append(block)
+        self.__ascii_circuit_visualization_list.append(ascii_gates.BARRIER_ASCII * self.num_qudit)
                 
             
     # Function used by the Class to create the graphic Matplotlib circuit
@@ -1011,12 +1412,9 @@ class QuditCircuit:
         for q in range(self.num_qudit):
             ax.plot([-0.5, max_gates - 0.5], [q, q], 'k', lw=2.5)
 
-        # Cycle to draw gates in the figure
-        for gate in self.__mpl_circuit_visualization_list:
-            
-            gate_position = gate['column'] # Takes the gate position from the gate info
-            if not (start_gate <= gate_position < end_gate):
-                continue  # Skips the gate if it is not beetween the gates range of the current figure
+        # Cycle to draw gates in the figure, only the ones in the gates range of the current figure
+        for gate_position in range(start_gate, min(end_gate, total_gates)):
+            gate = self.__mpl_circuit_visualization_list[gate_position] # Gate position is its index in the list (also valid for circuit views)
 
             relative_gate_position = gate_position - start_gate  # Brings the global position to a local position on the current figure
         
@@ -1141,16 +1539,348 @@ class QuditCircuit:
       full_operator = qt.qeye(d ** n) + P_full * T_full
       return full_operator
 
-    def optimize(self, gate_dict=None, tol: float = 0.0, merge_only_names=None):
+    def optimize(self, gate_dict=None, tol: float = 0.0, merge_only_names=None, passes=None, fuse_name: str | None = None):
         """
             Given a dictionary of gates and their corresponding unitary matrices, this method optimizes the quantum 
             circuit by merging consecutive gates into a single gate when possible.
+
+            If `fuse_name` is given (a prefix of 1 to 3 characters, e.g. "F"), merges whose matrix is not in
+            gate_dict are kept as new gates named F0, F1, ... (see merged_custom_copy) and registered in the gate table of the result, instead of raising ValueError.
+
+            If `passes` is given (e.g. ["template", "commute", "merge"]), the passes are run instead, repeated until
+            the circuit no longer changes (see qutip_mrl.pass_manager.PassManager, which also reports per-pass
+            timing and gate savings).
         """
+        if passes is not None:
+            from qutip_mrl.pass_manager import PassManager
+            options = {} if fuse_name is None else {"fuse_name": fuse_name}
+            manager = PassManager(passes, fixpoint=True, gate_dict=gate_dict, tol=tol, merge_only_names=merge_only_names,
+                                  **options)
+            return manager.run(self)
         return self.merged_custom_copy(
             gate_dict=gate_dict,
             tol=tol,
             merge_only_names=merge_only_names,
+            fuse_name=fuse_name,
         )
+
+    def _default_gate_dict(self):
+        """Gate dictionary used by the optimizers when none is given: identity ("0"), shifts ("+k") and swaps ("ab")."""
+        gate_dict = {"0": np.eye(self.num_states, dtype=complex)}
+        for k in range(1, self.num_states):
+            gate_dict[f"+{k}"] = self._label_to_matrix(f"+{k}")
+        for a in range(self.num_states):
+            for b in range(a + 1, self.num_states):
+                gate_dict[f"{a}{b}"] = self._label_to_matrix(f"{a}{b}")
+        return gate_dict
+
+    def commuted_copy(self, gate_dict=None, tol: float = 0.0, window: int | None = 64):
+        """
+        Return a NEW QuditCircuit where gates are cancelled and merged across the gates they commute with
+        (see qutip_mrl.commutation.commutative_cancellation).
+
+        Args:
+            gate_dict (dict, optional): Names of the matrices that merged gates may be given.
+            tol (float): Absolute tolerance of the matrix comparisons.
+            window (int | None): Maximum number of gates each gate is moved back through.
+
+        Returns:
+            QuditCircuit: The optimized circuit.
+        """
+        from qutip_mrl.commutation import commutative_cancellation
+        return commutative_cancellation(self, gate_dict=gate_dict, tol=tol, window=window)
+
+    def templated_copy(self, library=None, window: int = 32):
+        """
+        Return a NEW QuditCircuit where the occurrences of verified identities are replaced by cheaper ones
+        (see qutip_mrl.templates.template_optimize).
+
+        Args:
+            library (TemplateLibrary, optional): Templates to apply. Defaults to the ones shipped for the circuit base.
+            window (int): Maximum number of gates looked at to complete a match.
+
+        Returns:
+            QuditCircuit: The rewritten circuit.
+        """
+        from qutip_mrl.templates import template_optimize
+        return template_optimize(self, library=library, window=window)
+
+    def scheduled_copy(self, mode: str = "asap", tol: float = 0.0, window: int | None = 64, return_layers: bool = False):
+        """
+        Return a NEW QuditCircuit where commuting gates are reordered into ASAP or ALAP layers of minimal depth
+        (see qutip_mrl.scheduling.schedule).
+
+        Args:
+            mode (str): "asap" or "alap".
+            tol (float): Absolute tolerance of the commutation checks (0 for exact comparisons).
+            window (int | None): Maximum number of earlier gates per qudit checked for commutation.
+            return_layers (bool): If True, also return the layers (lists of instruction indices of the new circuit).
+
+        Returns:
+            QuditCircuit | tuple: The rescheduled circuit, or (circuit, layers).
+        """
+        from qutip_mrl.scheduling import schedule
+        return schedule(self, mode=mode, tol=tol, window=window, return_layers=return_layers)
+
+    def _append_instruction(self, instruction):
+        """
+        Insert a gate described by an instruction table entry, going through the public gate methods.
+        Built-in qutrit gates are re-inserted with their native helpers so that drawings are preserved.
+
+        Args:
+            instruction (tuple): (name, matrix, controls, control_values, target) as stored in `instructions`.
+        """
+        name, gate, controls, values, target = instruction
+        if name == "barrier":
+            return self.barrier()
+        # e.g. NumPy integers after compose/remap with an array qudit_map
+        controls, values, target = [int(c) for c in controls], [int(v) for v in values], int(target)
+
+        native = _QUTRIT_NATIVE_GATES.get(name) if self.num_states == 3 else None
+        if native is not None and len(controls) <= 1 and np.array_equal(gate, native[0]):
+            if not controls:
+                return getattr(self, native[1])(target)
+            if native[2] is not None and values[0] == self.num_states - 1:
+                return getattr(self, native[2])(controls[0], target)
+
+        if not controls:
+            return self.custom_gate(gate, target=target, name=name)
+        if len(controls) == 1:
+            return self.c_custom_gate(gate, control=controls[0], target=target, name=name, control_values=[values[0]])
+        return self.mc_custom_gate(gate, controls, target, name=name, control_values=list(values))
+
+    def __len__(self):
+        return len(self.__instructions)
+
+    def __getitem__(self, key):
+        """
+        qc[i] returns the i-th instruction table entry; qc[a:b] returns a read-only view of gates [a, b).
+
+        Views share the gate storage of the circuit (nothing is copied) and can be simulated, drawn, optimized,
+        fingerprinted and composed like any circuit. Use copy() on a view to get an editable circuit.
+
+        Raises:
+            ValueError: For slices with a step other than 1.
+        """
+        if not isinstance(key, slice):
+            return self.__instructions[key]
+        start, stop, step = key.indices(len(self.__instructions))
+        if step != 1:
+            raise ValueError("Circuit slices must be contiguous (step 1)")
+        stop = max(start, stop)
+
+        view = QuditCircuit.__new__(QuditCircuit)
+        view.num_qudit = self.num_qudit
+        view.num_states = self.num_states
+        lo = bisect_left(self.__barrier_positions, start)
+        hi = bisect_left(self.__barrier_positions, stop)
+        view.__einsum_gates = _ListWindow(self.__einsum_gates, start - lo, stop - hi)
+        view.__ascii_circuit_visualization_list = _ListWindow(
+            self.__ascii_circuit_visualization_list, start + 1, stop + 1, head=self.__ascii_circuit_visualization_list[0]
+        )
+        view.__mpl_circuit_visualization_list = _ListWindow(self.__mpl_circuit_visualization_list, start, stop)
+        view.__instructions = _ListWindow(self.__instructions, start, stop)
+        view.__dag = None
+        view.__hash_prefix = _HashWindow(self.__hash_prefix, start, stop + 1)
+        view.__barrier_positions = [p - start for p in self.__barrier_positions[lo:hi]]
+        view.__gate_table = self.__gate_table
+        view.__inverted_names = {i - start: names for i, names in self.__inverted_names.items() if start <= i < stop}
+        return view
+
+    def copy(self):
+        """
+        Return an independent copy of the circuit (gate matrices are shared, they are never modified).
+
+        Returns:
+            QuditCircuit: The copy.
+        """
+        out = QuditCircuit(self.num_qudit, self.num_states)
+        out.__gate_table = self.__gate_table
+        out.__inverted_names = dict(self.__inverted_names)
+        out.__extend(self)
+        return out
+
+    def __extend(self, other):
+        # Appends all the gates of a circuit with the same geometry by concatenating the internal structures,
+        # without going through the gate methods.
+        offset = len(self.__mpl_circuit_visualization_list)
+        self.__einsum_gates.extend(other.__einsum_gates)
+        self.__ascii_circuit_visualization_list.extend(other.__ascii_circuit_visualization_list[1:])
+        self.__mpl_circuit_visualization_list.extend(
+            dict(g, column=g["column"] + offset) for g in other.__mpl_circuit_visualization_list
+        )
+        self.__barrier_positions.extend(p + len(self.__instructions) for p in other.__barrier_positions)
+        self.__instructions.extend(other.__instructions)
+
+        # Rolling hash of the concatenation: H(a + b[:i]) = H(a) * BASE^i + H(b[:i])
+        head = self.__hash_prefix[-1]
+        scale = 1
+        for h in other.__hash_prefix[1:]:
+            scale = scale * _HASH_BASE % _HASH_MOD
+            self.__hash_prefix.append((head * scale + h) % _HASH_MOD)
+
+        if self.__dag is not None:
+            start = len(self.__instructions) - len(other.__instructions)
+            for index in range(start, len(self.__instructions)):
+                self.__dag.add(index, self.__instructions[index])
+
+    def compose(self, other, qudit_map=None):
+        """
+        Return a new circuit applying this circuit and then `other`.
+
+        When the two circuits have the same qudits and no map is given, the instruction tables are simply
+        concatenated; otherwise the gates of `other` are re-inserted on the mapped qudits.
+
+        Args:
+            other (QuditCircuit): The circuit to append, with the same number of basis states.
+            qudit_map (list/tuple, optional): qudit_map[i] is the qudit of this circuit on which qudit i of
+                `other` acts. Defaults to the identity (other must not have more qudits than this circuit).
+
+        Raises:
+            ValueError: If the circuits have different basis states or the map is not valid.
+
+        Returns:
+            QuditCircuit: The composed circuit.
+
+        Example:
+            adder = half_adder.compose(half_adder, qudit_map=[2, 3, 4])
+        """
+        if other.num_states != self.num_states:
+            raise ValueError("Cannot compose circuits with a different number of basis states")
+        if qudit_map is None:
+            if other.num_qudit > self.num_qudit:
+                raise ValueError("qudit_map is required when composing a wider circuit")
+            qudit_map = list(range(other.num_qudit))
+        qudit_map = [int(q) for q in qudit_map]
+        if len(qudit_map) != other.num_qudit:
+            raise ValueError(f"qudit_map must have {other.num_qudit} entries")
+        if len(set(qudit_map)) != len(qudit_map) or not all(0 <= q < self.num_qudit for q in qudit_map):
+            raise ValueError(f"qudit_map must contain distinct qudits in [0, {self.num_qudit - 1}]")
+
+        out = self.copy()
+        if other.num_qudit == self.num_qudit and qudit_map == list(range(self.num_qudit)):
+            out.__extend(other)
+            return out
+
+        for name, gate, controls, values, target in other.__instructions:
+            if gate is None:
+                out.barrier()
+                continue
+            out._append_instruction((name, gate, tuple(qudit_map[c] for c in controls), values, qudit_map[target]))
+        return out
+
+    def remap(self, perm):
+        """
+        Return a copy of the circuit with its qudits relabeled: qudit i becomes qudit perm[i].
+
+        Args:
+            perm (list/tuple): A permutation of range(num_qudit).
+
+        Returns:
+            QuditCircuit: The relabeled circuit.
+        """
+        return QuditCircuit(self.num_qudit, self.num_states).compose(self, qudit_map=perm)
+
+    def inverse(self):
+        """
+        Return the inverse circuit: gates in reverse order, each one replaced by its inverse.
+
+        Permutation gates keep a meaningful name: self-inverse gates keep their own, shift labels "+k" become
+        "+(d-k)", swap labels (bases up to 10) stay unchanged and gate-table labels become the label of the inverse
+        permutation when there is one. Other names are cut to 3 characters and marked with "'" ("CUST" -> "CUS'");
+        the inverse circuit remembers the original names, so that inverting it again gives them back.
+
+        Returns:
+            QuditCircuit: The inverse circuit.
+        """
+        d = self.num_states
+        out = QuditCircuit(self.num_qudit, d)
+        out.__gate_table = self.__gate_table
+        labels = {}
+        candidates = [f"+{k}" for k in range(d)]
+        if d <= 10:
+            # Swap labels are made of two single-digit state indices
+            candidates += [f"{a}{b}" for a in range(d) for b in range(a + 1, d)]
+        for label in candidates:
+            labels[label] = _permutation_of(self._label_to_matrix(label))
+        for label, matrix in (self.__gate_table or {}).items():
+            perm = _permutation_of(np.asarray(matrix, dtype=complex))
+            if perm is not None:
+                labels.setdefault(label, perm)
+        perm_to_label = {perm: label for label, perm in reversed(list(labels.items()))}
+        # Inverses of the permutations met in this circuit: permutation -> (inverse matrix, label of the inverse)
+        inverses = {}
+
+        for index in range(len(self.__instructions) - 1, -1, -1):
+            name, gate, controls, values, target = self.__instructions[index]
+            if gate is None:
+                out.barrier()
+                continue
+            perm = _permutation_of(gate)
+            if perm is None:
+                inverse, label = _inverse_matrix(gate, perm), None
+            else:
+                if perm not in inverses:
+                    inverse = _inverse_matrix(gate, perm)
+                    inverses[perm] = inverse, perm_to_label.get(_permutation_of(inverse))
+                inverse, label = inverses[perm]
+            renamed = self.__inverted_names.get(index)
+            if renamed is not None and renamed[0] == name:
+                inverse_name = renamed[1]
+            elif np.array_equal(inverse, gate):
+                inverse_name = name
+            elif name in labels and perm == labels[name] and label is not None:
+                inverse_name = label
+            else:
+                inverse_name = _inverse_name(name)
+                if len(name) > 3 and not name.endswith("'"):
+                    # "CUST" -> "CUS'" loses a character: remember the original name
+                    out.__inverted_names[len(out.__instructions)] = inverse_name, name
+            out._append_instruction((inverse_name, inverse, controls, values, target))
+        return out
+
+    def power(self, k: int):
+        """
+        Return the circuit repeated k times (k < 0 repeats the inverse, k == 0 gives an empty circuit).
+
+        Args:
+            k (int): Number of repetitions.
+
+        Returns:
+            QuditCircuit: The repeated circuit.
+        """
+        if k < 0:
+            return self.inverse().power(-k)
+        out = QuditCircuit(self.num_qudit, self.num_states)
+        out.__gate_table = self.__gate_table
+        for _ in range(k):
+            out.__extend(self)
+        return out
+
+    def save(self, path):
+        """
+        Save the circuit to a compact binary file (see qutip_mrl.circuit_io).
+
+        Args:
+            path (str): Destination file path.
+        """
+        from qutip_mrl.circuit_io import save_circuit
+        save_circuit(self, path)
+
+    @classmethod
+    def load(cls, path, mmap: bool = False):
+        """
+        Load a circuit previously stored with save().
+
+        Args:
+            path (str): Source file path.
+            mmap (bool): If True, the gate matrices are memory-mapped from the file instead of being read in memory.
+
+        Returns:
+            QuditCircuit: The loaded circuit.
+        """
+        from qutip_mrl.circuit_io import load_circuit
+        return load_circuit(path, mmap=mmap)
     
     def _label_to_matrix(self, label: str):
         """
@@ -1176,7 +1906,7 @@ class QuditCircuit:
         label = label.strip()
 
         # If a gate table is registered, allow arbitrary labels from it.
-        if getattr(self, "__gate_table", None) is not None and label in self.__gate_table:
+        if self.__gate_table is not None and label in self.__gate_table:
             return np.asarray(self.__gate_table[label], dtype=complex)
 
         # "+k" cyclic shift
@@ -1331,8 +2061,8 @@ class QuditCircuit:
             bot = "".join(bot)
             return [top, mid, bot]
 
-        block = []
-        for q in range(self.num_qudit):
+        block = ascii_gates.WIRE_ASCII * min_idx
+        for q in range(min_idx, max_idx + 1):
             if q == target:
                 block.extend(GATE_ASCII)
             elif q in control_map:
@@ -1343,10 +2073,9 @@ class QuditCircuit:
                         connect_down=(q < max_idx),
                     )
                 )
-            elif min_idx < q < max_idx:
-                block.extend(ascii_gates.LINE_ASCII)
             else:
-                block.extend(ascii_gates.WIRE_ASCII)
+                block.extend(ascii_gates.LINE_ASCII)
+        block.extend(ascii_gates.WIRE_ASCII * (self.num_qudit - max_idx - 1))
 
         self.__ascii_circuit_visualization_list.append(block)
 
@@ -1385,7 +2114,7 @@ class QuditCircuit:
         full_operator = qt.qeye(d ** n) + P_full * T_full
         return full_operator
 
-    def merged_custom_copy(self, gate_dict=None, tol: float = 0.0, merge_only_names=None):
+    def merged_custom_copy(self, gate_dict=None, tol: float = 0.0, merge_only_names=None, fuse_name: str | None = None):
             """Return a NEW QuditCircuit with MERGE-ONLY optimization (matrix-based).
     
             Supported merges:
@@ -1393,41 +2122,59 @@ class QuditCircuit:
                  These are merged on the SAME target. They may be separated by gates that DO NOT touch
                  that target qudit (i.e., gates acting only on other qudits commute with them).
     
-              2) Single-control custom gates added via c_custom_gate(...), if their name is in gate_dict.
-                 These are merged when they have the SAME (control, target) and the (implicit) control_value
-                 equals (num_states - 1). They may be separated by gates that do NOT touch either the control
-                 or the target qudit.
+              2) Controlled gates with any number of controls and any control values (c_custom_gate,
+                 cc_custom_gate, mc_custom_gate, ...), if their name is in gate_dict. These are merged when they
+                 have the SAME (controls, control values, target), whatever the order the controls were given in.
+                 They may be separated by gates that do NOT touch any of their qudits.
     
             Merge rule: for a sequence U1 then U2, merged operator is U2 @ U1.
+
+            The labels of the circuit gate table (see set_gate_table) that are not in gate_dict, fused gates of an
+            earlier optimization included, are known to the merge as well, with or without fuse_name: a merge whose
+            product is such a label gets its name (e.g. the base-4 genetic circuit [Z123, Z01] becomes one gate
+            "0231") where it used to raise ValueError.
+
+            A merged matrix that is not in gate_dict raises ValueError, unless `fuse_name` is given: the merge is
+            then kept as a new gate named fuse_name + base-36 number (F0, ..., F9, Fa, ... for "F"; equal matrices
+            share the name), and registered in the gate table of the new circuit. The prefix must have 1 to 3
+            characters, since gate names have at most 4.
             """
             import numpy as np
 
+            if fuse_name is not None:
+                _GateLookup.check_fuse_name(fuse_name)
             if gate_dict is None:
-                gate_dict = {"0": np.eye(self.num_states, dtype=complex)}
-                for k in range(1, self.num_states):
-                    gate_dict[f"+{k}"] = self._label_to_matrix(f"+{k}")
-                for a in range(self.num_states):
-                    for b in range(a + 1, self.num_states):
-                        gate_dict[f"{a}{b}"] = self._label_to_matrix(f"{a}{b}")
+                gate_dict = self._default_gate_dict()
+            table = dict(self.__gate_table or {})
+            gate_dict = {**gate_dict, **{k: np.asarray(v, dtype=complex) for k, v in table.items() if k not in gate_dict}}
     
-            src = list(self.__mpl_circuit_visualization_list)
+            src = self.__mpl_circuit_visualization_list
             out = QuditCircuit(num_qudit=self.num_qudit, num_states=self.num_states)
     
             allowed = set(gate_dict.keys()) if merge_only_names is None else set(merge_only_names)
             control_value_required = self.num_states - 1
     
+            # Pending merges of permutation gates are kept as permutation tuples, composed without matmuls
+            lookup = _GateLookup(gate_dict, tol)
+
             def matrix_to_name(M):
-                for name, A in gate_dict.items():
-                    if tol == 0.0:
-                        if np.array_equal(M, A):
-                            return name
-                    else:
-                        if np.allclose(M, A, atol=tol, rtol=0.0):
-                            return name
-                return None
-    
+                return lookup.name_of(M)
+
+            def merge(name, pending):
+                # gate `name` applied after `pending` (None if nothing is pending)
+                perm = lookup.permutation(name)
+                if pending is None:
+                    return perm if perm is not None else np.array(gate_dict[name], copy=True)
+                if perm is not None and isinstance(pending, tuple):
+                    return tuple(perm[j] for j in pending)
+                return gate_dict[name] @ as_matrix(pending)
+
+            def as_matrix(M):
+                return _permutation_matrix(M) if isinstance(M, tuple) else M
 
             def is_identity(M):
+                if isinstance(M, tuple):
+                    return M == tuple(range(len(M)))
                 M = np.asarray(M)
                 if M.ndim != 2 or M.shape[0] != M.shape[1]:
                     return False
@@ -1447,226 +2194,106 @@ class QuditCircuit:
                     qs.update(list(g.get("controls")))
                 return qs
     
-            # Pending single-qudit merges: target -> matrix
-            pending_single = {}  # t -> M
-            # Pending controlled merges:
-            #   single-control: (c,t,val) -> M
-            #   double-control: (c1,c2,t,v1,v2) -> M
-            pending_ctrl = {}
-    
-            def flush_all():
-                # flush controlled first, then single (either order is fine because they shouldn't overlap)
-                for key in list(pending_ctrl.keys()):
-                    M = pending_ctrl.pop(key)
-                    if is_identity(M):
-                        continue
-                    name = matrix_to_name(M)
-                    if name is not None and name in ("0", "I"):
-                        continue
-                    if name is None:
-                        raise ValueError("Merged controlled matrix not found in gate_dict.")
-                    if len(key) == 3:
-                        c, t, v = key
-                        out.c_custom_gate(M, control=c, target=t, name=name, control_values=[v])
-                    elif len(key) == 5:
-                        c1, c2, t, v1, v2 = key
-                        out.cc_custom_gate(M, control1=c1, control2=c2, target=t, name=name, control_values=[v1, v2])
-                    else:
-                        raise ValueError("Unsupported pending controlled key format.")
-                for t in list(pending_single.keys()):
-                    M = pending_single.pop(t)
-                    if is_identity(M):
-                        continue
-                    name = matrix_to_name(M)
-                    if name is not None and name in ("0", "I"):
-                        continue
-                    if name is None:
-                        raise ValueError("Merged single-qudit matrix not found in gate_dict.")
-                    out.custom_gate(M, target=t, name=name)
-    
+            def control_key(g):
+                # (controls, values, target) of a gate; controls are sorted with their values, so that the key
+                # does not depend on the order they were given in. Single-qudit gates have no controls.
+                if "controls" in g:
+                    ctrls = list(g["controls"])
+                    vals = list(g.get("control_values", [control_value_required] * len(ctrls)))
+                elif "control" in g:
+                    ctrls, vals = [g["control"]], [control_value_required]
+                else:
+                    ctrls, vals = [], []
+                pairs = sorted(zip(ctrls, vals))
+                return tuple(c for c, _ in pairs), tuple(v for _, v in pairs), g["target"]
+
+            def emit(key, M):
+                # Append a merged gate, skipping identities
+                if is_identity(M):
+                    return
+                name = matrix_to_name(M)
+                if name is not None and name in ("0", "I"):
+                    return
+                controls, values, t = key
+                if name is None and fuse_name is not None:
+                    name = lookup.add_fused(fuse_name, as_matrix(M))
+                    gate_dict[name] = table[name] = as_matrix(M)
+                if name is None:
+                    kind = "controlled" if controls else "single-qudit"
+                    raise ValueError(f"Merged {kind} matrix not found in gate_dict.")
+                if controls:
+                    out.mc_custom_gate(as_matrix(M), controls, t, name=name, control_values=values)
+                else:
+                    out.custom_gate(as_matrix(M), target=t, name=name)
+
             def replay_gate(g):
                 name = g.get("name")
-                if name == "barrier":
-                    out.barrier()
+                if name in ("0", "I"):
                     return
-    
+
                 # legacy single-control visualization: {'name':..., 'control':c, 'target':t}
                 if "control" in g and "target" in g and "controls" not in g:
-                    c = g["control"]; t = g["target"]
-                    if name in ("0", "I"):
-                        return
                     if name not in gate_dict:
                         raise ValueError(f"Controlled gate '{name}' not in gate_dict; cannot replay.")
-                    out.c_custom_gate(gate_dict[name], control=c, target=t, name=name)
+                    out.c_custom_gate(gate_dict[name], control=g["control"], target=g["target"], name=name)
                     return
-    
+
                 # value-controlled (newer) visualization: {'name':..., 'controls':[...], 'control_values':[...], 'target':t}
                 if "controls" in g and "target" in g:
                     ctrls = list(g["controls"])
                     vals = list(g.get("control_values", [control_value_required] * len(ctrls)))
                     t = g["target"]
-                    if name in ("0", "I"):
-                        return
                     if name == "F" and len(ctrls) == 1:
                         out.feynman(ctrls[0], t)
                         return
                     if name not in gate_dict:
                         raise ValueError(f"Controlled gate '{name}' not in gate_dict; cannot replay.")
-                    if len(ctrls) == 1:
-                        out.c_custom_gate(gate_dict[name], control=ctrls[0], target=t, name=name, control_values=[vals[0]])
-                        return
-                    if len(ctrls) == 2:
-                        out.cc_custom_gate(gate_dict[name], control1=ctrls[0], control2=ctrls[1], target=t, name=name, control_values=[vals[0], vals[1]])
-                        return
-                    raise ValueError("merged_custom_copy replay supports up to 2 controls.")
-    
+                    out.mc_custom_gate(gate_dict[name], ctrls, t, name=name, control_values=vals)
+                    return
+
                 # single-qudit
                 if "target" in g:
-                    t = g["target"]
-                    if name in ("0", "I"):
-                        return
                     if name not in gate_dict:
                         raise ValueError(f"Single-qudit gate '{name}' not in gate_dict; cannot replay.")
-                    out.custom_gate(gate_dict[name], target=t, name=name)
+                    out.custom_gate(gate_dict[name], target=g["target"], name=name)
                     return
-    
+
                 raise ValueError(f"Unknown gate format: {g}")
-    
+
+            # Pending merges: (controls, values, target) -> merged matrix (or permutation). Entries never share
+            # a qudit, since a gate touching a pending entry flushes it unless it has the same key.
+            pending = {}
+
+            def flush(touched=None, keep=None):
+                for key in list(pending.keys()):
+                    if key == keep:
+                        continue
+                    if touched is not None and touched.isdisjoint(key[0]) and key[2] not in touched:
+                        continue
+                    emit(key, pending.pop(key))
+
             for g in src:
                 name = g.get("name")
 
                 if name == "barrier":
-                    flush_all()
+                    flush()
                     out.barrier()
                     continue
 
-                # Identify whether THIS gate is mergeable, so we don't flush the very pending entry
-                # we intend to extend.
-                mergeable_single_target = None
-                mergeable_ctrl_key = None
-
-                # Single-qudit merge candidate?
-                if ("target" in g and "control" not in g and "controls" not in g
-                    and name in allowed and name in gate_dict):
-                    mergeable_single_target = g["target"]
-
-                # Single-control controlled merge candidate? (legacy form)
-                if ("control" in g and "target" in g and "controls" not in g
-                    and name in allowed and name in gate_dict):
-                    c = g["control"]; t = g["target"]
-                    mergeable_ctrl_key = (c, t, control_value_required)
-
-                # Controlled merge candidate? (value-controlled form)
-                if (mergeable_ctrl_key is None and "controls" in g and "target" in g
-                    and name in allowed and name in gate_dict):
-                    ctrls = list(g["controls"])
-                    vals = list(g.get("control_values", [control_value_required] * len(ctrls)))
-                    if len(ctrls) == 1 and vals[0] == control_value_required:
-                        mergeable_ctrl_key = (ctrls[0], g["target"], control_value_required)
-                    elif len(ctrls) == 2:
-                        mergeable_ctrl_key = (ctrls[0], ctrls[1], g["target"], vals[0], vals[1])
+                mergeable = "target" in g and name in allowed and name in gate_dict
+                key = control_key(g) if mergeable else None
 
+                # Flush pending merges that must stay BEFORE this gate, but not the one it is merged into
                 touched = gate_qudits(g)
-                # Flush pending merges that must stay BEFORE this gate.
-                # But do NOT flush the exact pending entry we are about to merge into.
                 if touched:
-                    # flush controlled
-                    for key in list(pending_ctrl.keys()):
-                        if key == mergeable_ctrl_key:
-                            continue
-                        if len(key) == 3:
-                            c, t, v = key
-                            touches = (c in touched or t in touched)
-                        elif len(key) == 5:
-                            c1, c2, t, v1, v2 = key
-                            touches = (c1 in touched or c2 in touched or t in touched)
-                        else:
-                            raise ValueError("Unsupported pending controlled key format.")
-                        if touches:
-                            M = pending_ctrl.pop(key)
-                            if is_identity(M):
-                                continue
-                            nm = matrix_to_name(M)
-                            if nm is not None and nm in ("0", "I"):
-                                continue
-                            if nm is None:
-                                raise ValueError("Merged controlled matrix not found in gate_dict.")
-                            if len(key) == 3:
-                                c, t, v = key
-                                out.c_custom_gate(M, control=c, target=t, name=nm, control_values=[v])
-                            else:
-                                c1, c2, t, v1, v2 = key
-                                out.cc_custom_gate(M, control1=c1, control2=c2, target=t, name=nm, control_values=[v1, v2])
-
-                    # flush single-qudit
-                    for t in list(pending_single.keys()):
-                        if t == mergeable_single_target:
-                            continue
-                        if t in touched:
-                            M = pending_single.pop(t)
-                            if is_identity(M):
-                                continue
-                            nm = matrix_to_name(M)
-                            if nm is not None and nm in ("0", "I"):
-                                continue
-                            if nm is None:
-                                raise ValueError("Merged single-qudit matrix not found in gate_dict.")
-                            out.custom_gate(M, target=t, name=nm)
-
-                # Try to absorb into pending merges (single or controlled) if mergeable.
-                # --- Single-qudit merge candidate ---
-                if ("target" in g and "control" not in g and "controls" not in g
-                    and name in allowed and name in gate_dict):
-                    t = g["target"]
-                    M = gate_dict[name]
-                    if t in pending_single:
-                        pending_single[t] = M @ pending_single[t]
-                    else:
-                        pending_single[t] = M.copy()
-                    continue
-    
-                # --- Single-control controlled merge candidate ---
-                # Case A: legacy form with 'control' and 'target'
-                if ("control" in g and "target" in g and "controls" not in g
-                    and name in allowed and name in gate_dict):
-                    c = g["control"]; t = g["target"]
-                    key = (c, t, control_value_required)
-                    M = gate_dict[name]
-                    if key in pending_ctrl:
-                        pending_ctrl[key] = M @ pending_ctrl[key]
-                    else:
-                        pending_ctrl[key] = M.copy()
-                    continue
-    
-                # Case B: value-controlled form with controls / control_values
-                if ("controls" in g and "target" in g and name in allowed and name in gate_dict):
-                    ctrls = list(g["controls"])
-                    vals = list(g.get("control_values", [control_value_required] * len(ctrls)))
-                    if len(ctrls) == 1 and vals[0] == control_value_required:
-                        c = ctrls[0]; t = g["target"]
-                        key = (c, t, control_value_required)
-                        M = gate_dict[name]
-                        if key in pending_ctrl:
-                            pending_ctrl[key] = M @ pending_ctrl[key]
-                        else:
-                            pending_ctrl[key] = M.copy()
-                        continue
-                    if len(ctrls) == 2:
-                        c1, c2 = ctrls
-                        v1, v2 = vals
-                        key = (c1, c2, g["target"], v1, v2)
-                        M = gate_dict[name]
-                        if key in pending_ctrl:
-                            pending_ctrl[key] = M @ pending_ctrl[key]
-                        else:
-                            pending_ctrl[key] = M.copy()
-                        continue
-                    # if not mergeable, just replay after flushing above
+                    flush(touched, keep=key)
+
+                if mergeable:
+                    pending[key] = merge(name, pending.get(key))
+                else:
                     replay_gate(g)
-                    continue
-    
-                # Not mergeable -> replay
-                replay_gate(g)
-    
-            flush_all()
+
+            flush()
+            if table:
+                out.set_gate_table(table)
             return out
\ No newline at end of file
@@ -0,0 +1,102 @@
+# scheduling.py
+from qutip_mrl.commutation import _Gate, _commutes
+from qutip_mrl.qudit_circuit import QuditCircuit
+
+
+def _asap_layers(gates, num_qudit: int, tol: float, window):
+    """
+    ASAP layer of every gate of a barrier-free sequence: one more than the highest layer of the earlier gates it
+    does not commute with. Gates further back than `window` on a qudit are assumed not to commute.
+    """
+    layers = []
+    chains = [[] for _ in range(num_qudit)]  # per qudit: positions in `gates` of the gates acting on it
+    prefix_max = [[] for _ in range(num_qudit)]  # per qudit: highest layer of chains[q][:k + 1]
+    for gate in gates:
+        layer = 0
+        for q in gate.qudits:
+            chain, highest = chains[q], prefix_max[q]
+            p = len(chain) - 1
+            examined = 0
+            # Stop as soon as no earlier gate on the qudit can raise the layer
+            while p >= 0 and highest[p] + 1 > layer:
+                if window is not None and examined >= window:
+                    layer = highest[p] + 1
+                    break
+                other = gates[chain[p]]
+                if layers[chain[p]] + 1 > layer and not _commutes(other, gate, tol):
+                    layer = layers[chain[p]] + 1
+                examined += 1
+                p -= 1
+        position = len(layers)
+        layers.append(layer)
+        for q in gate.qudits:
+            chains[q].append(position)
+            prefix_max[q].append(max(prefix_max[q][-1], layer) if prefix_max[q] else layer)
+    return layers
+
+
+def schedule(qc, mode: str = "asap", tol: float = 0.0, window: int | None = 64, return_layers: bool = False):
+    """
+    Reorder the gates of a circuit into layers of minimal depth.
+
+    Every gate must stay after the earlier gates it does not commute with (see commutation.commutes()); this is
+    finer than the dependency graph of QuditCircuit.dag(), which only lets controls and diagonal gates commute.
+    With mode "asap" every gate is placed in the earliest layer allowed, with mode "alap" in the latest one; both
+    give the minimal depth under these dependencies. Gates in the same layer pairwise commute, so they can be
+    applied in one sweep in any order. Since dag() would rebuild coarser layers from the new circuit, the layers can be
+    returned as well. Barriers are kept: the gates between two barriers are scheduled on their own.
+
+    Args:
+        qc (QuditCircuit): The circuit to schedule (not modified).
+        mode (str): "asap" (default) or "alap".
+        tol (float): Absolute tolerance of the matrix comparisons of the commutation rules.
+        window (int | None): Maximum number of earlier gates per qudit checked for commutation; the ones further
+            back are assumed not to commute (None for no limit).
+        return_layers (bool): If True, also return the layers.
+
+    Returns:
+        QuditCircuit | tuple: The circuit, with the gates emitted layer by layer (in circuit order inside a layer),
+            or (circuit, layers) where layers is a list with one list of instruction indices of the new circuit
+            per layer.
+
+    Raises:
+        ValueError: If mode is not "asap" or "alap".
+    """
+    if mode not in ("asap", "alap"):
+        raise ValueError(f"Unknown scheduling mode '{mode}', use 'asap' or 'alap'")
+
+    out = QuditCircuit(qc.num_qudit, qc.num_states)
+    if qc.gate_table is not None:
+        out.set_gate_table(qc.gate_table)
+    layers = []
+    segment = []
+
+    def flush():
+        gates = [_Gate(*instruction) for instruction in segment]
+        if mode == "asap":
+            layer_of = _asap_layers(gates, qc.num_qudit, tol, window)
+        else:
+            # ALAP layers are the ASAP layers of the reversed sequence, counted from the end
+            reverse = _asap_layers(gates[::-1], qc.num_qudit, tol, window)
+            depth = max(reverse, default=-1) + 1
+            layer_of = [depth - 1 - layer for layer in reversed(reverse)]
+        buckets = [[] for _ in range(max(layer_of, default=-1) + 1)]
+        for position, layer in enumerate(layer_of):
+            buckets[layer].append(position)
+        for bucket in buckets:
+            layers.append(list(range(len(out), len(out) + len(bucket))))
+            for position in bucket:
+                out._append_instruction(segment[position])
+        segment.clear()
+
+    for instruction in qc.instructions:
+        if instruction[1] is None:
+            flush()
+            out._append_instruction(instruction)
+        else:
+            segment.append(instruction)
+    flush()
+
+    if return_layers:
+        return out, layers
+    return out
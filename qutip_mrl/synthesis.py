@@ -3,9 +3,8 @@ from __future__ import annotations
 
 from typing import Dict, Tuple, Optional, Union, Iterable, Any, List
 import logging
-import io
-import contextlib
-from .genetics.genetic_synthesis import synthesize_ops_from_truth_table, ops_to_qudit_circuit, Op
+from .genetics.genetic_synthesis import synthesize_ops_from_truth_table, ops_to_qudit_circuit, ga_to_shift_ms_ops, Op
+from .genetics.telemetry import PrintSink, Telemetry, as_telemetry
 from .qudit_circuit import QuditCircuit
 
 """
@@ -138,6 +137,16 @@ def synth_qc(
     retries: int = 1,
     gate_list: bool = False,
     as_calls: bool = True,
+    workers: int = 1,
+    parallel_retries: bool = False,
+    grace_generations: Optional[int] = 1000,
+    patience: Optional[int] = None,
+    time_limit: Optional[float] = None,
+    target_length: Optional[int] = None,
+    checkpoint_file: Optional[str] = None,
+    checkpoint_interval: int = 100,
+    resume: bool = False,
+    telemetry: Optional[Telemetry] = None,
 ) -> Union[QuditCircuit, Tuple[QuditCircuit, str]]:
     """
     Synthesize a reversible multi-valued circuit from a partial truth table.
@@ -152,6 +161,25 @@ def synth_qc(
       num_variables: number of input variable wires
       num_targets: number of target/output wires (initialized to 0)
       output_on: "last" or "first" (where the target wires are located)
+      workers: number of processes evaluating the GA offspring (None for one per CPU); the truth table is
+        shared with them once per run, so this pays off for large truth tables
+      parallel_retries: run the retries at the same time, one process each (see island_synthesize), instead of one
+        after the other; once a run holds a perfect circuit, all the runs stop when none of them has found a
+        shorter one within grace_generations more generations (None: they run to the end); workers is then
+        not used
+      patience: stop a run once its best circuit is perfect and has not become shorter for this many generations
+      time_limit: stop a run after this many seconds
+      target_length: stop a run (all the runs, with parallel_retries) as soon as a perfect circuit of at most this
+        many gates is found
+      The criteria are combined: a run ends at the first one met, and after `generations` generations at the latest.
+      checkpoint_file: save the state of the GA to this file every checkpoint_interval generations and at the end
+        of the run; with several retries, retry i uses checkpoint_file + f".{i}" (not with parallel_retries)
+      resume: continue the runs saved in the checkpoint files instead of starting new ones; call synth_qc with the
+        same arguments as the interrupted call. Finished retries give back their result without running again.
+      quiet: whether the GA runs stay silent; otherwise they print their progress (see genetics.telemetry.PrintSink)
+      telemetry: a genetics.telemetry.Telemetry (or a single sink) receiving the progress records of every run,
+        e.g. Telemetry([RingBufferSink()]) or Telemetry([JsonlSink(path)]); not used with parallel_retries, whose
+        runs can only print their progress (quiet=False)
     """
     if base not in (3, 4):
         raise ValueError("Circuit synthesis is supported only for base 3 or 4")
@@ -161,6 +189,10 @@ def synth_qc(
 
     if quiet:
         logging.getLogger("jmetal").setLevel(logging.ERROR)
+    telemetry = as_telemetry(telemetry)
+    if not quiet:
+        telemetry = Telemetry([*(telemetry.sinks if telemetry else ()), PrintSink()],
+                              interval=telemetry.interval if telemetry else 1)
 
     tt = _build_truth_table(
         truth_table,
@@ -174,21 +206,34 @@ def synth_qc(
     best_ops: Optional[List[Op]] = None
     best_len = 10**9
 
-    for _ in range(max(1, retries)):
-        if quiet:
-            buf = io.StringIO()
-            with contextlib.redirect_stdout(buf), contextlib.redirect_stderr(buf):
-                ops = synthesize_ops_from_truth_table(
-                    tt,
-                    base=base,
-                    num_qudits=num_qudits,
-                    output_indices=outs,
-                    pop_size=pop_size,
-                    generations=generations,
-                    restoring=restoring,
-                )
-        else:
-            ops = synthesize_ops_from_truth_table(
+    if parallel_retries and retries > 1 and checkpoint_file is not None:
+        raise ValueError("Checkpoints are not supported with parallel_retries")
+
+    if parallel_retries and retries > 1:
+        from .genetics.islandmodel import island_synthesize
+        # Independent runs, without migration; a one-gate circuit, which no run can beat, always stops them all
+        ga_circuit = island_synthesize(
+            tt,
+            base=base,
+            num_qudits=num_qudits,
+            output_indices=outs,
+            islands=retries,
+            migration_interval=0,
+            target_length=target_length or 1,
+            pop_size=pop_size,
+            generations=generations,
+            mutation_rates=(0.2,),
+            grace_generations=grace_generations,
+            patience=patience,
+            time_limit=time_limit,
+            restoring=restoring,
+            return_ga=True,
+            verbose=not quiet,
+        )
+        candidates = [ga_to_shift_ms_ops(ga_circuit, base=base)]
+    else:
+        candidates = (
+            synthesize_ops_from_truth_table(
                 tt,
                 base=base,
                 num_qudits=num_qudits,
@@ -196,8 +241,19 @@ def synth_qc(
                 pop_size=pop_size,
                 generations=generations,
                 restoring=restoring,
+                workers=workers,
+                patience=patience,
+                time_limit=time_limit,
+                target_length=target_length,
+                checkpoint_file=checkpoint_file if checkpoint_file is None or retries <= 1 else f"{checkpoint_file}.{i}",
+                checkpoint_interval=checkpoint_interval,
+                resume=resume,
+                telemetry=telemetry,
             )
+            for i in range(max(1, retries))
+        )
 
+    for ops in candidates:
         qc = ops_to_qudit_circuit(ops, num_qudits=num_qudits, base=base)
 
         bad = 0
@@ -0,0 +1,389 @@
+# templates.py
+import numpy as np
+
+from qutip_mrl.qudit_circuit import QuditCircuit, _permutation_of
+
+# Pattern matrix matching any single-qudit gate; the matched gate is reused where the replacement says WILDCARD
+WILDCARD = "U"
+
+
+def matrix_key(matrix):
+    """
+    Hashable key of a gate matrix: its permutation tuple for permutation matrices, its bytes otherwise.
+
+    Args:
+        matrix (np.ndarray): The matrix.
+
+    Returns:
+        tuple: The key.
+    """
+    M = np.asarray(matrix, dtype=complex)
+    perm = _permutation_of(M)
+    if perm is not None:
+        return perm
+    return M.shape, (M + 0.0).tobytes()
+
+
+class _TemplateGate:
+    __slots__ = ("matrix", "key", "name", "controls", "values", "target")
+
+    def __init__(self, spec, labels):
+        if len(spec) == 4:
+            gate, controls, values, target = spec
+            name = None
+        else:
+            gate, controls, values, target, name = spec
+        self.controls = tuple(int(c) for c in controls)
+        self.values = tuple(int(v) for v in values)
+        self.target = int(target)
+        if len(self.controls) != len(self.values):
+            raise ValueError("controls and control values must have the same length")
+        if isinstance(gate, str) and gate == WILDCARD:
+            self.matrix = None
+            self.key = WILDCARD
+            self.name = None
+        elif isinstance(gate, str):
+            self.matrix = labels._label_to_matrix(gate)
+            self.key = matrix_key(self.matrix)
+            self.name = name if name is not None else gate[:4]
+        else:
+            self.matrix = np.asarray(gate, dtype=complex)
+            d = labels.num_states
+            if self.matrix.shape != (d, d):
+                raise ValueError(f"Template matrices must be {d}x{d}")
+            self.key = matrix_key(self.matrix)
+            self.name = name if name is not None else "CUST"
+
+    @property
+    def qudits(self):
+        return self.controls + (self.target,)
+
+
+def _unitary(gates, num_qudit, d, wildcard):
+    """Unitary of a list of template gates on num_qudit qudits (qudit 0 is the most significant digit)."""
+    N = d ** num_qudit
+    digits = np.array([[(i // d ** (num_qudit - 1 - q)) % d for q in range(num_qudit)] for i in range(N)])
+    U = np.eye(N, dtype=complex)
+    for g in gates:
+        M = wildcard if g.matrix is None else g.matrix
+        G = np.zeros((N, N), dtype=complex)
+        for i in range(N):
+            if all(digits[i, c] == v for c, v in zip(g.controls, g.values)):
+                for r in range(d):
+                    j = i + (r - digits[i, g.target]) * d ** (num_qudit - 1 - g.target)
+                    G[j, i] += M[r, digits[i, g.target]]
+            else:
+                G[i, i] = 1
+        U = G @ U
+    return U
+
+
+class Template:
+    """
+    A verified circuit identity: a sequence of gates (pattern) equal to a shorter one (replacement).
+
+    Gates are given as (gate, controls, control_values, target[, name]) tuples, where the qudits are indices
+    local to the template (0, 1, ...), bound to circuit qudits when the pattern is matched, and gate is
+    - a label of QuditCircuit.shift ("+k", "ab", "0"/"I"),
+    - a matrix (np.ndarray), or
+    - WILDCARD, matching any single-qudit gate (all the WILDCARD gates of a pattern must be the same gate,
+      which is reused by the WILDCARD gates of the replacement).
+
+    Example:
+        # Conjugating a control by +1/+2 shifts changes its control value
+        Template([("+1", (), (), 0), (WILDCARD, (0,), (2,), 1), ("+2", (), (), 0)],
+                 [(WILDCARD, (0,), (1,), 1)], base=3)
+    """
+
+    def __init__(self, pattern, replacement, base: int, name: str | None = None, verify: bool = True):
+        """
+        Args:
+            pattern (list): Gates of the pattern, at least one.
+            replacement (list): Gates of the replacement, fewer than the pattern ones.
+            base (int): Number of basis states of the qudits.
+            name (str, optional): Name of the template, used in reports.
+            verify (bool): If True (default), check that pattern and replacement are the same unitary.
+
+        Raises:
+            ValueError: If the template is malformed or is not an identity.
+        """
+        self.base = base
+        labels = QuditCircuit(1, base)  # resolves labels as QuditCircuit.shift does
+        self.pattern = [_TemplateGate(spec, labels) for spec in pattern]
+        self.replacement = [_TemplateGate(spec, labels) for spec in replacement]
+        self.name = name
+        if not self.pattern:
+            raise ValueError("A template needs at least one pattern gate")
+        if len(self.replacement) >= len(self.pattern):
+            raise ValueError("The replacement of a template must have fewer gates than the pattern")
+        qudits = [q for g in self.pattern + self.replacement for q in g.qudits]
+        self.num_qudit = max(qudits) + 1
+        if set(q for g in self.replacement for q in g.qudits) - set(q for g in self.pattern for q in g.qudits):
+            raise ValueError("The replacement can only act on qudits of the pattern")
+        for g in self.pattern + self.replacement:
+            if len(set(g.qudits)) != len(g.qudits):
+                raise ValueError("Controls and target of a gate must be different qudits")
+        self.has_wildcard = any(g.matrix is None for g in self.pattern)
+        if any(g.matrix is None for g in self.replacement) and not self.has_wildcard:
+            raise ValueError("WILDCARD in the replacement but not in the pattern")
+        if verify:
+            self.verify()
+
+    @property
+    def signature(self):
+        """Signature (matrix key, control values) of the first pattern gate, used to index the template."""
+        first = self.pattern[0]
+        return first.key, first.values
+
+    def verify(self) -> None:
+        """
+        Check that pattern and replacement are the same unitary. Templates with WILDCARD gates are checked
+        with a random unitary, a random permutation and a random diagonal gate in place of the wildcard.
+
+        Raises:
+            ValueError: If they differ.
+        """
+        d = self.base
+        if self.has_wildcard:
+            rng = np.random.default_rng(0)
+            Q, _ = np.linalg.qr(rng.normal(size=(d, d)) + 1j * rng.normal(size=(d, d)))
+            P = np.eye(d, dtype=complex)[:, rng.permutation(d)]
+            D = np.diag(np.exp(2j * np.pi * rng.random(d)))
+            candidates = [Q, P, D]
+        else:
+            candidates = [None]
+        for W in candidates:
+            left = _unitary(self.pattern, self.num_qudit, d, W)
+            right = _unitary(self.replacement, self.num_qudit, d, W)
+            if not np.allclose(left, right, atol=1e-9):
+                label = f"Template {self.name!r}" if self.name else "Template"
+                raise ValueError(f"{label} is not an identity")
+
+    def __len__(self):
+        return len(self.pattern)
+
+    def __repr__(self):
+        return f"Template({self.name or 'unnamed'}, {len(self.pattern)} -> {len(self.replacement)} gates, base {self.base})"
+
+
+class TemplateLibrary:
+    """
+    Collection of templates of one base, indexed by the signature of their first pattern gate, so that only the
+    templates that can start at a gate are tried on it.
+    """
+
+    def __init__(self, base: int, templates=()):
+        """
+        Args:
+            base (int): Number of basis states of the qudits.
+            templates (Iterable[Template]): Initial templates.
+        """
+        self.base = base
+        self.templates = []
+        self.max_length = 0
+        self.__index = {}
+        for template in templates:
+            self.add(template)
+
+    @classmethod
+    def default(cls, base: int = 3):
+        """
+        Library of the identities shipped with QuTiP-MRL (generated for any base, checked for base 3 and 4):
+        - ladders: d times (ms("+k", c, t, [v]); shift("+1", c)) == shift("+k", t), as in examples/18;
+        - a gate controlled on every value of a qudit is not controlled: ms(L, c, t, [0]) ... ms(L, c, t, [d-1])
+          == shift(L, t), for every shift and swap label L;
+        - a control conjugated by a shift: shift("+k", c); U controlled on v; shift("+(d-k)", c) == U controlled
+          on v-k;
+        - a control conjugated by a swap: shift("ab", c); U controlled on a; shift("ab", c) == U controlled on b.
+
+        Args:
+            base (int): Number of basis states of the qudits.
+
+        Returns:
+            TemplateLibrary: The library.
+        """
+        d = base
+        library = cls(d)
+        labels = [f"+{k}" for k in range(1, d)] + [f"{a}{b}" for a in range(d) for b in range(a + 1, d)]
+        for k in range(1, d):
+            for v in range(d):
+                pattern = [(f"+{k}", (0,), (v,), 1), ("+1", (), (), 0)] * d
+                library.add(Template(pattern, [(f"+{k}", (), (), 1)], d, name=f"ladder+{k}/{v}"))
+        for label in labels:
+            pattern = [(label, (0,), (v,), 1) for v in range(d)]
+            library.add(Template(pattern, [(label, (), (), 1)], d, name=f"all-values {label}"))
+        for k in range(1, d):
+            for v in range(d):
+                pattern = [(f"+{k}", (), (), 0), (WILDCARD, (0,), (v,), 1), (f"+{d - k}", (), (), 0)]
+                library.add(Template(pattern, [(WILDCARD, (0,), ((v - k) % d,), 1)], d, name=f"shift-conj+{k}/{v}"))
+        for a in range(d):
+            for b in range(a + 1, d):
+                for v, w in ((a, b), (b, a)):
+                    pattern = [(f"{a}{b}", (), (), 0), (WILDCARD, (0,), (v,), 1), (f"{a}{b}", (), (), 0)]
+                    library.add(Template(pattern, [(WILDCARD, (0,), (w,), 1)], d, name=f"swap-conj{a}{b}/{v}"))
+        return library
+
+    def add(self, template: Template) -> None:
+        """
+        Add a template to the library.
+
+        Raises:
+            ValueError: If the template has a different base.
+        """
+        if template.base != self.base:
+            raise ValueError(f"Template of base {template.base} in a library of base {self.base}")
+        self.templates.append(template)
+        self.__index.setdefault(template.signature, []).append(template)
+        self.max_length = max(self.max_length, len(template))
+
+    def candidates(self, key, values):
+        """Templates whose first gate can match a gate with the given matrix key and control values."""
+        return self.__index.get((key, values), []) + self.__index.get((WILDCARD, values), [])
+
+    def __len__(self):
+        return len(self.templates)
+
+
+class _Entry:
+    __slots__ = ("instruction", "key", "qudits")
+
+    def __init__(self, instruction):
+        self.instruction = instruction
+        _, matrix, controls, _, target = instruction
+        if matrix is None:
+            self.key = None
+            self.qudits = None
+        else:
+            self.key = matrix_key(matrix)
+            self.qudits = tuple(controls) + (target,)
+
+
+def _bind(pattern_gate, entry, binding, used, wildcard):
+    """Extend a match with one gate. Returns the (possibly new) wildcard binding, or False on mismatch."""
+    name, matrix, controls, values, target = entry.instruction
+    if tuple(values) != pattern_gate.values or len(controls) != len(pattern_gate.controls):
+        return False
+    if pattern_gate.matrix is None:
+        if wildcard is None:
+            wildcard = (entry.key, name, matrix)
+        elif wildcard[0] != entry.key:
+            return False
+    elif pattern_gate.key != entry.key:
+        return False
+    for var, q in zip(pattern_gate.qudits, entry.qudits):
+        if var in binding:
+            if binding[var] != q:
+                return False
+        elif q in used:
+            return False
+        else:
+            binding[var] = q
+            used.add(q)
+    return wildcard
+
+
+def _match(template, first, todo, window):
+    """
+    Match a template starting at gate `first`, looking ahead in `todo` (next gate last). Gates acting on other
+    qudits than the template ones may be interleaved. Returns (positions in todo, binding, wildcard) or None.
+    """
+    binding, used = {}, set()
+    wildcard = _bind(template.pattern[0], first, binding, used, None)
+    if wildcard is False:
+        return None
+    taken = []
+    skipped = set()
+    pos = len(todo) - 1
+    examined = 0
+    for pattern_gate in template.pattern[1:]:
+        while True:
+            if pos < 0 or examined >= window:
+                return None
+            entry = todo[pos]
+            pos -= 1
+            examined += 1
+            if entry.key is None:
+                return None
+            if used.isdisjoint(entry.qudits):
+                skipped.update(entry.qudits)
+                continue
+            wildcard = _bind(pattern_gate, entry, binding, used, wildcard)
+            if wildcard is False:
+                return None
+            taken.append(pos + 1)
+            break
+    # Skipped gates must not act on qudits bound after they were skipped
+    if not skipped.isdisjoint(used):
+        return None
+    return taken, binding, wildcard
+
+
+def _emit(template, binding, wildcard):
+    out = []
+    for g in template.replacement:
+        controls = tuple(binding[c] for c in g.controls)
+        target = binding[g.target]
+        if g.matrix is None:
+            _, name, matrix = wildcard
+        else:
+            name, matrix = g.name, g.matrix
+        out.append((name, matrix, controls, g.values, target))
+    return out
+
+
+def template_optimize(qc, library=None, window: int = 32, stats=None):
+    """
+    Rewrite the occurrences of the templates of a library in a circuit, in a single scan.
+
+    Every gate is tried as the first gate of the templates indexed by its signature; a pattern matches the next
+    gates on its qudits, gates on other qudits being allowed in between (up to `window` gates are looked at). A
+    match is replaced by the template replacement, and the scan steps back by the length of the longest template
+    so that the new gates can complete matches with the previous ones. Since replacements are shorter than
+    patterns, the scan always ends.
+
+    Args:
+        qc (QuditCircuit): The circuit to optimize (not modified).
+        library (TemplateLibrary, optional): Templates to apply. Defaults to TemplateLibrary.default(qc.num_states).
+        window (int): Maximum number of gates looked at after the first gate of a match.
+        stats (dict, optional): If given, filled with the number of rewrites per template name.
+
+    Returns:
+        QuditCircuit: The rewritten circuit.
+
+    Raises:
+        ValueError: If the library base differs from the circuit one.
+    """
+    if library is None:
+        library = TemplateLibrary.default(qc.num_states)
+    if library.base != qc.num_states:
+        raise ValueError(f"Template library of base {library.base} for a circuit of base {qc.num_states}")
+
+    todo = [_Entry(instruction) for instruction in reversed(qc.instructions)]
+    done = []
+    back = max(library.max_length - 1, 0)
+    while todo:
+        entry = todo.pop()
+        if entry.key is None:
+            done.append(entry)
+            continue
+        values = tuple(entry.instruction[3])
+        for template in library.candidates(entry.key, values):
+            found = _match(template, entry, todo, window)
+            if found is None:
+                continue
+            taken, binding, wildcard = found
+            for pos in sorted(taken, reverse=True):
+                del todo[pos]
+            todo.extend(_Entry(instruction) for instruction in reversed(_emit(template, binding, wildcard)))
+            for _ in range(min(back, len(done))):
+                todo.append(done.pop())
+            if stats is not None:
+                stats[template.name] = stats.get(template.name, 0) + 1
+            break
+        else:
+            done.append(entry)
+
+    out = QuditCircuit(qc.num_qudit, qc.num_states)
+    for entry in done:
+        out._append_instruction(entry.instruction)
+    return out